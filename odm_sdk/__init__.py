@@ -10,7 +10,9 @@ from .exceptions import (GenestackAuthenticationException, GenestackBaseExceptio
                                   GenestackConnectionFailure, GenestackException,
                                   GenestackResponseError, GenestackServerException,
                                   GenestackVersionException)
+from .retry import RetryPolicy
 from .connection import Connection, Application
+from .async_connection import AsyncConnection, AsyncApplication
 from .file_types import FileTypes
 from .file_permissions import Permissions
 from .metainfo_scalar_values import *
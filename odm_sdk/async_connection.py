@@ -0,0 +1,241 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from odm_sdk.connection import Application, Connection
+
+DEFAULT_MAX_CONNECTIONS = 10
+
+
+class AsyncConnection(object):
+    """
+    An :py:mod:`asyncio` counterpart of :py:class:`~odm_sdk.Connection`.
+
+    Requests are sent by a bounded pool of worker threads which share one keep-alive
+    HTTP session, so up to ``max_connections`` calls can be in flight at the same time
+    while the caller awaits them from a single event loop.
+    As with :py:class:`~odm_sdk.Connection`, you need to call one of the login coroutines
+    before invoking applications::
+
+        async with AsyncConnection(server_url) as connection:
+            await connection.login_by_token(token)
+            files_util = connection.application(application_class=FilesUtil)
+            files = await asyncio.gather(*(files_util.find_file_by_name(n) for n in names))
+    """
+
+    def __init__(self, server_url, debug=False, show_logs=False,
+                 max_connections=DEFAULT_MAX_CONNECTIONS, **kwargs):
+        """
+        :param server_url: server url
+        :type server_url: str
+        :param debug:  will print additional traceback from application
+        :type debug: bool
+        :param show_logs: will print application logs (received from server)
+        :type show_logs: bool
+        :param max_connections: maximum number of requests in flight
+                                (and of pooled keep-alive connections)
+        :type max_connections: int
+        :param kwargs: other parameters of :py:class:`~odm_sdk.Connection`
+        """
+        kwargs.setdefault('pool_maxsize', max_connections)
+        self.connection = Connection(server_url, debug=debug, show_logs=show_logs, **kwargs)
+        self.max_connections = max_connections
+        self._executor = ThreadPoolExecutor(max_workers=max_connections,
+                                            thread_name_prefix='odm-sdk-async')
+
+    @property
+    def server_url(self):
+        return self.connection.server_url
+
+    @property
+    def debug(self):
+        return self.connection.debug
+
+    @property
+    def show_logs(self):
+        return self.connection.show_logs
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Run a blocking callable in the connection worker pool and await its result.
+
+        This can be used to call any method of a synchronous application which shares
+        the underlying :py:attr:`connection`.
+
+        :param func: callable to run
+        :return: result of the callable
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def whoami(self):
+        """
+        Return user email.
+
+        :return: email
+        :rtype: str
+        """
+        return await self.run(self.connection.whoami)
+
+    async def login(self, email, password):
+        """
+        Attempt a login on the connection with the specified credentials.
+        See :py:meth:`~odm_sdk.Connection.login`.
+
+        :param email: email
+        :type email: str
+        :param password: password
+        :type password: str
+        :rtype: None
+        :raises: :py:class:`~odm_sdk.GenestackAuthenticationException` if login failed
+        """
+        await self.run(self.connection.login, email, password)
+
+    async def login_by_token(self, token):
+        """
+        Attempt a login on the connection with the specified token.
+        See :py:meth:`~odm_sdk.Connection.login_by_token`.
+
+        :param token: token
+        :rtype: None
+        :raises: :py:class:`~odm_sdk.GenestackAuthenticationException` if login failed
+        """
+        await self.run(self.connection.login_by_token, token)
+
+    async def login_by_access_token(self, access_token):
+        """
+        Attempt a login on the connection with the specified access token.
+        See :py:meth:`~odm_sdk.Connection.login_by_access_token`.
+
+        :param access_token: OAuth access token
+        :type access_token: str
+        :rtype: None
+        :raises: :py:class:`~odm_sdk.GenestackAuthenticationException` if login failed
+        """
+        await self.run(self.connection.login_by_access_token, access_token)
+
+    async def logout(self):
+        """
+        Logout from server.
+
+        :rtype: None
+        """
+        await self.run(self.connection.logout)
+
+    async def perform_request(self, path, data='', follow=True, headers=None):
+        """
+        Perform an HTTP request to Genestack server.
+        See :py:meth:`~odm_sdk.Connection.perform_request`.
+
+        :return: response from server
+        :rtype: odm_sdk.connection.Response
+        """
+        return await self.run(self.connection.perform_request, path, data=data,
+                              follow=follow, headers=headers)
+
+    def application(self, application_id=None, application_class=Application):
+        """
+        Returns an asynchronous handler for the application with the specified ID
+        or for an application class (e.g. :py:class:`~odm_sdk.FilesUtil`).
+
+        :param application_id: Application ID.
+        :type application_id: str
+        :param application_class: class of the wrapped application
+        :type application_class: type
+        :return: application handler
+        :rtype: AsyncApplication
+        """
+        return AsyncApplication(self, application_id, application_class=application_class)
+
+    def close(self):
+        """
+        Stop the worker pool. Requests which are already running are completed.
+
+        :rtype: None
+        """
+        self._executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self):
+        return 'AsyncConnection("%s")' % self.server_url
+
+
+class AsyncApplication(object):
+    """
+    An :py:mod:`asyncio` counterpart of :py:class:`~odm_sdk.Application`.
+
+    Besides :py:meth:`invoke` and :py:meth:`get_response`, every public method of the
+    wrapped application class is available as a coroutine function,
+    e.g. ``await files_util.find_file_by_name(name)`` for a wrapped
+    :py:class:`~odm_sdk.FilesUtil`.
+    """
+
+    def __init__(self, connection, application_id=None, application_class=Application):
+        """
+        :param connection: asynchronous connection
+        :type connection: AsyncConnection
+        :param application_id: Application ID, may be omitted if
+                               ``application_class`` defines ``APPLICATION_ID``
+        :type application_id: str
+        :param application_class: class of the wrapped application
+        :type application_class: type
+        """
+        self.connection = connection
+        if application_id:
+            self.application = application_class(connection.connection, application_id)
+        else:
+            self.application = application_class(connection.connection)
+
+    @property
+    def application_id(self):
+        return self.application.application_id
+
+    async def get_response(self, method, params=None, trace=True):
+        """
+        Invoke one of the application's public Java methods and return Response object.
+        See :py:meth:`~odm_sdk.Application.get_response`.
+
+        :param method: name of the public Java method
+        :type method: str
+        :param params: arguments that will be passed to the Java method.
+                       Arguments must be JSON-serializable.
+        :type params: tuple
+        :param trace: request trace from server
+        :type trace: bool
+        :return: Response object
+        :rtype: odm_sdk.connection.Response
+        """
+        return await self.connection.run(self.application.get_response, method, params, trace=trace)
+
+    async def invoke(self, method, *params):
+        """
+        Invoke one of the application's public Java methods.
+        See :py:meth:`~odm_sdk.Application.invoke`.
+
+        :param method: name of the public Java method
+        :type method: str
+        :param params: arguments that will be passed to the Java method.
+                       Arguments must be JSON-serializable.
+        :return: JSON-deserialized response
+        """
+        return await self.connection.run(self.application.invoke, method, *params)
+
+    def __getattr__(self, name):
+        if name == 'application':
+            raise AttributeError(name)
+        attribute = getattr(self.application, name)
+        if name.startswith('_') or not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        async def wrapper(*args, **kwargs):
+            return await self.connection.run(attribute, *args, **kwargs)
+        return wrapper
+
+    def __repr__(self):
+        return 'AsyncApplication("%s")' % self.application_id
@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from odm_sdk import GenestackException
+
+DEFAULT_MAX_IN_FLIGHT = 8
+
+
+class Batch(object):
+    """
+    Performs many application calls concurrently over one connection.
+
+    Calls are scheduled with :py:meth:`invoke` or :py:meth:`submit` and start as soon as
+    one of ``max_in_flight`` workers is free; every call returns a
+    :py:class:`concurrent.futures.Future`. Errors are isolated per call: a failed call
+    raises its own exception (e.g. :py:class:`~odm_sdk.GenestackServerException`)
+    from :py:meth:`~concurrent.futures.Future.result` and does not affect other calls.
+    Leaving the ``with`` block waits for all scheduled calls::
+
+        with connection.batch(max_in_flight=16) as batch:
+            futures = [batch.invoke('genestack/usersadmin-api', 'setUserDomainPermissions',
+                                    email, permissions)
+                       for email, permissions in users]
+        results = [future.result() for future in futures]
+
+    Use :py:meth:`~odm_sdk.Connection.batch` to create a batch. Keep ``max_in_flight``
+    within ``pool_maxsize`` of the connection, otherwise extra connections are not reused.
+    """
+
+    def __init__(self, connection, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        """
+        :param connection: logged in connection
+        :type connection: odm_sdk.Connection
+        :param max_in_flight: maximum number of concurrent requests
+        :type max_in_flight: int
+        """
+        if max_in_flight <= 0:
+            raise GenestackException('Number of requests in flight should be positive')
+        self.connection = connection
+        self.max_in_flight = max_in_flight
+        self.futures = []
+        self.__executor = None
+
+    def __enter__(self):
+        self.__executor = ThreadPoolExecutor(max_workers=self.max_in_flight,
+                                             thread_name_prefix='odm-sdk-batch')
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        executor, self.__executor = self.__executor, None
+        # do not start scheduled calls if the block has been interrupted
+        executor.shutdown(wait=True, cancel_futures=exc_type is not None)
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Schedule an arbitrary call, e.g. a method of an application wrapper
+        like :py:meth:`~odm_sdk.FilesUtil.link_file`.
+
+        :param func: callable to be called
+        :return: future of the call result
+        :rtype: concurrent.futures.Future
+        """
+        if self.__executor is None:
+            raise GenestackException('Batch should be used as a context manager')
+        future = self.__executor.submit(func, *args, **kwargs)
+        self.futures.append(future)
+        return future
+
+    def invoke(self, application_id, method, *params):
+        """
+        Schedule invocation of an application method.
+        See :py:meth:`~odm_sdk.Application.invoke`.
+
+        :param application_id: Application ID
+        :type application_id: str
+        :param method: name of the public Java method
+        :type method: str
+        :param params: arguments that will be passed to the Java method.
+                       Arguments must be JSON-serializable.
+        :return: future of the JSON-deserialized response
+        :rtype: concurrent.futures.Future
+        """
+        return self.submit(self.connection.application(application_id).invoke, method, *params)
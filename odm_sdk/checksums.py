@@ -0,0 +1,225 @@
+import hashlib
+import zlib
+
+from odm_sdk import GenestackException
+
+READ_SIZE = 1024 * 1024
+
+
+class Md5Checksum(object):
+    """
+    MD5 digest, the checksum used by Genestack for files in storage
+    (see :py:meth:`~odm_sdk.FilesUtil.add_checksums`).
+    """
+
+    name = 'md5'
+    # length of hexadecimal digest
+    hex_length = 32
+
+    def new(self):
+        """
+        Return a new hash object with ``update(data)`` and ``hexdigest()`` methods.
+        """
+        return hashlib.md5()
+
+    def __repr__(self):
+        return '%s()' % self.__class__.__name__
+
+
+class _Crc32Hash(object):
+
+    def __init__(self, function):
+        self.__function = function
+        self.value = 0
+
+    def update(self, data):
+        self.value = self.__function(data, self.value)
+
+    def hexdigest(self):
+        return '%08x' % self.value
+
+
+class Crc32Checksum(Md5Checksum):
+    """
+    CRC-32 (as in zlib and gzip). Checksums of consecutive chunks can be combined into
+    the checksum of the whole file with :py:func:`crc32_combine`.
+    """
+
+    name = 'crc32'
+    hex_length = 8
+
+    def new(self):
+        return _Crc32Hash(zlib.crc32)
+
+
+class Crc32cChecksum(Md5Checksum):
+    """
+    CRC-32C (Castagnoli), hardware accelerated by
+    `crc32c <https://pypi.org/project/crc32c/>`_ package.
+    """
+
+    name = 'crc32c'
+    hex_length = 8
+
+    def __init__(self):
+        import crc32c
+        self.__crc32c = crc32c
+
+    def new(self):
+        return _Crc32Hash(self.__crc32c.crc32c)
+
+
+class XxhashChecksum(Md5Checksum):
+    """
+    64-bit xxHash, the fastest option, requires `xxhash <https://pypi.org/project/xxhash/>`_
+    package.
+    """
+
+    name = 'xxh64'
+    hex_length = 16
+
+    def __init__(self):
+        import xxhash
+        self.__xxhash = xxhash
+
+    def new(self):
+        return self.__xxhash.xxh64()
+
+
+_CHECKSUMS = (Md5Checksum, Crc32Checksum, Crc32cChecksum, XxhashChecksum)
+
+
+def get_checksum(name):
+    """
+    Return checksum algorithm by name: ``'md5'``, ``'crc32'``, ``'crc32c'`` or ``'xxh64'``.
+
+    :param name: algorithm name
+    :type name: str
+    :rtype: Md5Checksum
+    """
+    for checksum_class in _CHECKSUMS:
+        if checksum_class.name == name:
+            try:
+                return checksum_class()
+            except ImportError:
+                raise GenestackException('Checksum "%s" is not installed' % name)
+    raise GenestackException('Unknown checksum "%s", expect one of: %s' % (
+        name, ', '.join(checksum_class.name for checksum_class in _CHECKSUMS)))
+
+
+def compute_file_checksum(path, name='md5'):
+    """
+    Compute checksum of a file, e.g. to pass it to
+    :py:meth:`~odm_sdk.FilesUtil.add_checksums`.
+
+    :param path: path to the file
+    :type path: str
+    :param name: algorithm name, see :py:func:`get_checksum`
+    :type name: str
+    :return: hexadecimal digest
+    :rtype: str
+    """
+    digest = get_checksum(name).new()
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(READ_SIZE), b''):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+class HashingReader(object):
+    """
+    Sized file-like object computing a checksum of the data while it is being read.
+    Rewinding to the beginning resets the checksum.
+    """
+
+    def __init__(self, fileobj, checksum):
+        """
+        :param fileobj: sized file-like object, e.g. :py:class:`~odm_sdk.multipart.FileRange`
+        :param checksum: algorithm
+        :type checksum: Md5Checksum
+        """
+        self.fileobj = fileobj
+        self.checksum = checksum
+        self.__hash = checksum.new()
+
+    def __len__(self):
+        return len(self.fileobj)
+
+    def tell(self):
+        return self.fileobj.tell()
+
+    def seek(self, position, whence=0):
+        if position != 0 or whence != 0:
+            raise ValueError('Hashed data can only be rewound to the beginning')
+        self.__hash = self.checksum.new()
+        return self.fileobj.seek(0)
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.__hash.update(data)
+        return data
+
+    @property
+    def complete(self):
+        return self.fileobj.tell() == len(self.fileobj)
+
+    def hexdigest(self):
+        """
+        Return the checksum of the data read.
+
+        :raises GenestackException: if the data has not been read completely
+        """
+        if not self.complete:
+            raise GenestackException('Checksum is requested before all data is read')
+        return self.__hash.hexdigest()
+
+
+def _gf2_matrix_times(matrix, vector):
+    result = 0
+    i = 0
+    while vector:
+        if vector & 1:
+            result ^= matrix[i]
+        vector >>= 1
+        i += 1
+    return result
+
+
+def _gf2_matrix_square(matrix):
+    return [_gf2_matrix_times(matrix, matrix[n]) for n in range(32)]
+
+
+def crc32_combine(crc1, crc2, length2):
+    """
+    Return CRC-32 of concatenation of two pieces of data by their CRC-32 values,
+    as ``crc32_combine`` of zlib, which is not available in :py:mod:`zlib` module.
+
+    :param crc1: CRC-32 of the first piece
+    :type crc1: int
+    :param crc2: CRC-32 of the second piece
+    :type crc2: int
+    :param length2: length of the second piece
+    :type length2: int
+    :rtype: int
+    """
+    if length2 <= 0:
+        return crc1
+    # operator for one zero bit
+    odd = [0xedb88320] + [1 << n for n in range(31)]
+    even = _gf2_matrix_square(odd)  # two zero bits
+    odd = _gf2_matrix_square(even)  # four zero bits
+    # apply length2 zero bytes to crc1
+    while True:
+        even = _gf2_matrix_square(odd)
+        if length2 & 1:
+            crc1 = _gf2_matrix_times(even, crc1)
+        length2 >>= 1
+        if not length2:
+            break
+        odd = _gf2_matrix_square(even)
+        if length2 & 1:
+            crc1 = _gf2_matrix_times(odd, crc1)
+        length2 >>= 1
+        if not length2:
+            break
+    return crc1 ^ crc2
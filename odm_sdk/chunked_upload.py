@@ -3,21 +3,29 @@ import os
 import re
 import sys
 import time
-from datetime import datetime
-from io import BytesIO
-from threading import Condition, Lock, Thread
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import Condition, Event, Lock, Thread
 
 from OpenSSL.SSL import SysCallError
 from requests.exceptions import RequestException
 
 from odm_sdk import GenestackException
+from odm_sdk.checksums import (READ_SIZE, Crc32Checksum, HashingReader, crc32_combine,
+                               get_checksum)
+from odm_sdk.multipart import DeferredValue, MultipartEncoder
+from odm_sdk.rate_limit import ThrottledReader, get_bucket
+from odm_sdk.upload_journal import UploadJournal
+from odm_sdk.upload_sources import LocalFileSource, get_upload_source
 from odm_sdk.utils import isatty
 
-RETRY_ATTEMPTS = 5
-RETRY_INTERVAL = 2  # seconds
 NUM_THREADS = 5
 CHUNK_SIZE = 1024 * 1024 * 5  # 5mb
 
+# bounds of adaptive mode
+MAX_THREADS = 32
+MAX_CHUNK_SIZE = 1024 * 1024 * 64  # 64mb
+TARGET_CHUNK_COUNT = 1000
+
 
 class Chunk(object):
     def __init__(self, number, start, size, chunk_size, total_size, token, filename, path, chunk_count, launch_time):
@@ -36,18 +44,45 @@ class Chunk(object):
 
         self.start = start
         self.size = size
+        self.reader = None
+        # data read in advance from a sequential source
+        self.content = None
 
     def __str__(self):
         return "Chunk %s %s bytes for %s" % (self.data['resumableChunkNumber'], self.size,
                                              self.data['resumableRelativePath'])
 
-    def get_file(self):
-        container = BytesIO()
-        with open(self.data['resumableRelativePath'], 'rb') as f:
-            f.seek(self.start)
-            container.write(f.read(self.size))
-        container.seek(0)
-        return container
+    @property
+    def number(self):
+        return self.data['resumableChunkNumber']
+
+    def get_body(self, source, checksum=None, bucket=None):
+        """
+        Return multipart request body streaming chunk data directly from the source.
+
+        If checksum algorithm is specified, the checksum is computed while the data
+        is being sent, and it is sent after the data in ``resumableChunkChecksum`` field;
+        it is available in :py:attr:`reader` when the body has been sent.
+
+        :param source: data of the uploaded file
+        :type source: odm_sdk.upload_sources.UploadSource
+        :param checksum: checksum algorithm
+        :type checksum: odm_sdk.checksums.Md5Checksum
+        :param bucket: rate limit of the upload in addition to the global one
+        :type bucket: odm_sdk.rate_limit.TokenBucket
+        :rtype: MultipartEncoder
+        """
+        content = self.content
+        if content is None:
+            content = source.get_range(self.start, self.size)
+        file_range = ThrottledReader(content, bucket)
+        if checksum is None:
+            return MultipartEncoder(self.data, {'file': file_range})
+        self.reader = HashingReader(file_range, checksum)
+        fields = dict(self.data, resumableChecksumAlgorithm=checksum.name)
+        trailer = {'resumableChunkChecksum': DeferredValue(checksum.hex_length,
+                                                           self.reader.hexdigest)}
+        return MultipartEncoder(fields, {'file': self.reader}, trailer=trailer)
 
 
 class PermanentError(GenestackException):
@@ -57,47 +92,252 @@ class PermanentError(GenestackException):
     pass
 
 
-def with_lock(method):
+def choose_chunk_size(total_size, min_chunk_size=CHUNK_SIZE, max_chunk_size=MAX_CHUNK_SIZE,
+                      target_chunk_count=TARGET_CHUNK_COUNT):
     """
-    Execute method with lock. Instance should have lock object in lock attribute.
+    Choose chunk size for a file, so that large files are uploaded in about
+    ``target_chunk_count`` chunks and per-request overhead does not limit throughput.
+
+    The size depends only on the file size: chunks of an upload cannot change their size,
+    and an interrupted upload should get the same chunks when it is resumed.
+
+    :param total_size: file size
+    :type total_size: int
+    :return: chunk size, a multiple of a megabyte between the bounds
+    :rtype: int
     """
-    def wrapper(self, *args):
-        with self.lock:
-            return method(self, *args)
-    return wrapper
+    megabyte = 1024 * 1024
+    chunk_size = -(-total_size // target_chunk_count)
+    chunk_size = -(-chunk_size // megabyte) * megabyte
+    return min(max(chunk_size, min_chunk_size), max_chunk_size)
 
 
-class ChunkedUpload(object):
-    def __init__(self, application, path, chunk_size=None):
-        if chunk_size is None:
-            chunk_size = CHUNK_SIZE
-        if chunk_size <= 0:
-            raise GenestackException("Chunk size should be positive")
+class ConcurrencyLimit(object):
+    """
+    Limits the number of chunks uploaded at the same time.
+    """
 
-        self.chunk_upload_url = '/application/uploadChunked/%s/unusedToken' % application.application_id
-        self.connection = application.connection
+    def __init__(self, limit):
+        self.limit = limit
+        self.maximum = limit
+        self.active = 0
+        self._condition = Condition()
+
+    def __enter__(self):
+        with self._condition:
+            while self.active >= self.limit:
+                self._condition.wait()
+            self.active += 1
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+    def on_success(self, size, elapsed):
+        """
+        Called when a chunk has been uploaded.
+
+        :param size: chunk size in bytes
+        :type size: int
+        :param elapsed: upload time in seconds
+        :type elapsed: float
+        """
+
+    def on_failure(self):
+        """
+        Called when an attempt to upload a chunk has failed with a transient error.
+        """
+
+
+class AimdConcurrency(ConcurrencyLimit):
+    """
+    Adjusts the number of concurrent chunk uploads in AIMD (additive increase,
+    multiplicative decrease) manner.
+
+    After every round of successful uploads (as many chunks as the current limit)
+    the limit grows by one while it makes aggregate throughput higher.
+    A failed attempt or a chunk uploaded much slower than usual halves the limit,
+    so a flaky or congested link gets less load instead of timeouts.
+    """
 
-        self.lock = Lock()
-        self.__iterator_lock = Lock()
-        self.__output_lock = Lock()
+    # relative throughput gain which is worth one more concurrent upload
+    MIN_GAIN = 0.05
+    # weight of the last chunk in the average upload time
+    SMOOTHING = 0.2
+
+    def __init__(self, initial=NUM_THREADS, minimum=1, maximum=MAX_THREADS, slow_factor=4.0):
+        """
+        :param initial: initial limit
+        :type initial: int
+        :param minimum: minimal limit
+        :type minimum: int
+        :param maximum: maximal limit
+        :type maximum: int
+        :param slow_factor: a chunk uploaded this many times slower (per byte) than
+                            the average is considered a sign of congestion
+        :type slow_factor: float
+        """
+        super(AimdConcurrency, self).__init__(min(max(initial, minimum), maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.slow_factor = slow_factor
+        self.best_throughput = 0.0
+        self.seconds_per_byte = None
+        self.__reset_window()
+
+    def __reset_window(self):
+        self.__window_chunks = 0
+        self.__window_bytes = 0
+        self.__window_start = time.perf_counter()
+
+    def __decrease(self):
+        self.limit = max(self.minimum, self.limit // 2)
+        self.best_throughput = 0.0
+        self.__reset_window()
+
+    def on_success(self, size, elapsed):
+        with self._condition:
+            seconds_per_byte = elapsed / max(size, 1)
+            average = self.seconds_per_byte
+            self.seconds_per_byte = seconds_per_byte if average is None else (
+                (1 - self.SMOOTHING) * average + self.SMOOTHING * seconds_per_byte)
+            if average is not None and seconds_per_byte > self.slow_factor * average:
+                self.__decrease()
+                return
+            self.__window_chunks += 1
+            self.__window_bytes += size
+            if self.__window_chunks < self.limit:
+                return
+            throughput = self.__window_bytes / max(time.perf_counter() - self.__window_start, 1e-6)
+            if throughput > self.best_throughput * (1 + self.MIN_GAIN):
+                self.best_throughput = throughput
+                if self.limit < self.maximum:
+                    self.limit += 1
+                    self._condition.notify()
+            else:
+                # throughput does not grow; forget it slowly to probe again later
+                self.best_throughput *= 1 - self.MIN_GAIN
+            self.__reset_window()
+
+    def on_failure(self):
+        with self._condition:
+            self.__decrease()
+
+
+class ChunkResult(object):
+    """
+    Outcome of an attempt to upload a chunk. It is produced by a worker
+    and applied to the state of the upload by :py:meth:`ChunkedUpload.handle_result`.
+
+    :ivar chunk: the chunk
+    :ivar uploaded: the chunk is on the server
+    :ivar response: response of the server to the upload of the chunk
+    :ivar checksum: checksum of the chunk data
+    :ivar data: parsed response of the server to the upload of the chunk
+    :ivar error: error message if the chunk has not been uploaded,
+                 ``None`` if it has been skipped because the upload has been stopped
+    """
+
+    def __init__(self, chunk, uploaded=False, response=None, checksum=None, data=None,
+                 error=None):
+        self.chunk = chunk
+        self.uploaded = uploaded
+        self.response = response
+        self.checksum = checksum
+        self.data = data or {}
+        self.error = error
+
+    @property
+    def last(self):
+        return self.data.get('lastChunkUploaded', False)
+
+    @property
+    def skipped(self):
+        return not self.uploaded and self.error is None
 
-        self.__application_result = None
-        self.__has_application_result = False
-        self.__finished = False
-        self.__error = None
-        self.thread_counter = 0
 
-        self.condition = Condition()
+class ChunkedUpload(object):
+    """
+    Upload of a file by chunks with the protocol of
+    `resumable.js <https://github.com/23/resumable.js>`_.
 
-        modified = datetime.fromtimestamp(os.path.getmtime(path))
-        total_size = os.path.getsize(path)
+    Chunks are sent by a pool of workers, which do not share any state but the
+    concurrency limit: outcomes of chunks are applied to the state of the upload
+    by one thread (:py:meth:`upload` or :py:class:`~odm_sdk.upload_manager.UploadManager`),
+    which also reports progress and writes the journal.
+    """
 
-        # TODO change according to javascript token
-        token = '{total_size}-{name}-{date}'.format(total_size=total_size,
-                                                    name=re.sub('[^A-z0-9_-]', '_', os.path.basename(path)),
-                                                    date=modified.strftime('%a_%b_%d_%Y_%H_%M_%S'))
+    def __init__(self, application, path, chunk_size=None, retry_policy=None, adaptive=False,
+                 max_threads=MAX_THREADS, journal=None, checksum=None, rate_limit=None,
+                 name=None, size=None):
+        """
+        :param application: application receiving the file
+        :type application: odm_sdk.Application
+        :param path: path to the file or another source of data: URL, file-like object
+                     or iterable of bytes (see :py:func:`~odm_sdk.upload_sources.get_upload_source`)
+        :type path: str|odm_sdk.upload_sources.UploadSource
+        :param chunk_size: chunk size, chosen by the file size in adaptive mode
+                           (see :py:func:`choose_chunk_size`), ``CHUNK_SIZE`` otherwise
+        :type chunk_size: int
+        :param retry_policy: policy of retrying chunks, the one of the connection by default
+        :type retry_policy: odm_sdk.RetryPolicy
+        :param adaptive: adjust the number of concurrent uploads to the link
+                         (see :py:class:`AimdConcurrency`), instead of ``NUM_THREADS``
+        :type adaptive: bool
+        :param max_threads: maximum number of concurrent uploads in adaptive mode
+        :type max_threads: int
+        :param journal: journal of uploaded chunks to resume interrupted uploads without
+                        checking every chunk on the server, ``True`` for the default one
+        :type journal: bool|odm_sdk.upload_journal.UploadJournal
+        :param checksum: name of checksum algorithm (see :py:func:`~odm_sdk.checksums.get_checksum`)
+                         to send checksums of chunks and verify them against the ones
+                         reported by the server (a warning is shown if it reports none);
+                         the checksum of the whole file is available in
+                         :py:attr:`file_checksum` for ``'crc32'``
+        :type checksum: str
+        :param rate_limit: maximum upload rate in bytes per second, or a bucket shared with
+                           other uploads; the global limit
+                           (see :py:func:`~odm_sdk.rate_limit.set_global_rate_limit`)
+                           applies too
+        :type rate_limit: float|odm_sdk.rate_limit.TokenBucket
+        :param name: file name for a source without a name, e.g. an iterable
+        :type name: str
+        :param size: data size for a source without a known size, e.g. an iterable
+        :type size: int
+        """
+        self.connection = application.connection
+        self.retry_policy = retry_policy or self.connection.retry_policy
+        self.source = source = get_upload_source(path, name=name, size=size,
+                                                 retry_policy=self.retry_policy)
+        total_size = source.size
+        if chunk_size is None:
+            chunk_size = choose_chunk_size(total_size) if adaptive else CHUNK_SIZE
+        if chunk_size <= 0:
+            raise GenestackException("Chunk size should be positive")
+
+        self.chunk_upload_url = '/application/uploadChunked/%s/unusedToken' % application.application_id
+        self.checksum = get_checksum(checksum) if checksum is not None else None
+        self.__chunk_checksums = {}
+        # the server has not reported the checksum of a chunk, the warning is shown once
+        self.__unverified = False
+        self.__unverified_lock = Lock()
+        self.bucket = get_bucket(rate_limit)
+
+        self.application_result = None
+        self.has_application_result = False
+        # set by the aggregating thread
+        self.finished = False
+        self.error = None
+        # set by a worker which has got the final outcome, other workers stop
+        self.__stopped = Event()
+
+        token = '{total_size}-{name}-{version}'.format(total_size=total_size,
+                                                       name=re.sub('[^A-z0-9_-]', '_', source.name),
+                                                       version=source.version)
         self.token = token
-        self.path = path
+        path = source.path
         # Last chunk can be larger than CHUNK_SIZE but less then two chunks.
         # Example: CHUNK_SIZE = 2
         # file size 2 > 1 chunk
@@ -105,17 +345,43 @@ class ChunkedUpload(object):
         # file size 4 > 2 chunk
         # file size 5 > 2 chunk
 
-        if total_size < chunk_size * 2:
-            chunk_count = 1
-        else:
-            chunk_count = total_size / chunk_size
+        chunk_count = max(1, total_size // chunk_size)
 
+        self.chunk_size = chunk_size
         self.total_size = total_size
-        self.filename = os.path.basename(path)
+        self.filename = source.name
         self.path = path
         self.chunk_count = chunk_count
+        if adaptive:
+            self.concurrency = AimdConcurrency(maximum=min(max_threads, chunk_count))
+        else:
+            self.concurrency = ConcurrencyLimit(NUM_THREADS)
         launch_time = int(time.time() * 1000)
 
+        # a journal created here is closed when the upload finishes
+        self.__owns_journal = journal is True
+        if journal is True:
+            journal = UploadJournal()
+        self.journal = journal or None
+        self.journal_upload = None
+        completed_chunks = {}
+        if self.journal is not None:
+            self.journal_upload = self.journal.start(
+                self.connection.server_url, self.chunk_upload_url, token,
+                os.path.abspath(path) if isinstance(source, LocalFileSource) else path,
+                total_size, chunk_size, chunk_count, launch_time)
+            # the server should recognize chunks of the interrupted session
+            launch_time = self.journal_upload.launch_time
+            # all chunks without the result of the upload: the state is unknown, check them
+            if len(self.journal_upload.completed_chunks) < chunk_count:
+                completed_chunks = self.journal_upload.completed_chunks
+                if self.checksum is not None:
+                    prefix = self.checksum.name + ':'
+                    for number, value in self.journal_upload.checksums.items():
+                        if value.startswith(prefix):
+                            self.__chunk_checksums[number] = value[len(prefix):]
+        self.completed_size = sum(completed_chunks.values())
+
         # import from here to avoid circular imports
         # TODO move progress functions to other module.
         if isatty():
@@ -133,170 +399,357 @@ class ChunkedUpload(object):
                     current_chunk_size = self.total_size - start
                 else:
                     current_chunk_size = chunk_size
-                yield Chunk(x, start, current_chunk_size, *info)
+                if x not in completed_chunks:
+                    chunk = Chunk(x, start, current_chunk_size, *info)
+                    if not source.random_access:
+                        chunk.content = source.get_range(start, current_chunk_size)
+                    yield chunk
+                elif not source.random_access:
+                    source.get_range(start, current_chunk_size)
                 start += current_chunk_size
 
         self.iterator = _iterator()
 
-    @property
-    @with_lock
-    def application_result(self):
-        return self.__application_result
-
-    @application_result.setter
-    @with_lock
-    def application_result(self, value):
-        self.__application_result = value
-
-    @property
-    @with_lock
-    def has_application_result(self):
-        return self.__has_application_result
+    def __update_progress(self, update_size):
+        self.progress(self.filename, update_size, self.total_size)
 
-    @has_application_result.setter
-    @with_lock
-    def has_application_result(self, value):
-        self.__has_application_result = value
+    def __record_chunk(self, chunk, response=None, checksum=None):
+        if checksum is not None:
+            self.__chunk_checksums[chunk.number] = checksum
+        if self.journal is not None:
+            if checksum is not None:
+                checksum = '%s:%s' % (self.checksum.name, checksum)
+            self.journal.record_chunk(self.journal_upload.id, chunk.number,
+                                      chunk.size, checksum=checksum, response=response)
 
     @property
-    @with_lock
-    def finished(self):
-        return self.__finished
-
-    @finished.setter
-    @with_lock
-    def finished(self, value):
-        self.__finished = value
+    def file_checksum(self):
+        """
+        CRC-32 of the whole file combined from the checksums of the uploaded chunks,
+        so the file is not read once more. Chunks uploaded by another session are read
+        to compute their checksums, if the source supports random access; reading them
+        may raise :py:class:`OSError` or :py:class:`requests.RequestException`.
 
-    @property
-    @with_lock
-    def error(self):
-        return self.__error
+        It is available only for ``'crc32'`` algorithm after a successful upload;
+        checksums of other algorithms cannot be combined, compute them with
+        :py:func:`~odm_sdk.checksums.compute_file_checksum`.
 
-    @error.setter
-    def error(self, value):
-        self.__error = value
+        :return: hexadecimal digest or ``None``
+        :rtype: str
+        """
+        if not isinstance(self.checksum, Crc32Checksum) or not self.has_application_result:
+            return None
+        chunk_checksums = self.__chunk_checksums
+        if len(chunk_checksums) < self.chunk_count and not self.source.random_access:
+            return None
+        value = 0
+        start = 0
+        self.open()
+        try:
+            for number in range(1, self.chunk_count + 1):
+                size = (self.chunk_size if number < self.chunk_count
+                        else self.total_size - start)
+                if number in chunk_checksums:
+                    chunk_value = int(chunk_checksums[number], 16)
+                else:
+                    content = self.source.get_range(start, size)
+                    digest = self.checksum.new()
+                    for data in iter(lambda: content.read(READ_SIZE), b''):
+                        digest.update(data)
+                    chunk_value = digest.value
+                value = crc32_combine(value, chunk_value, size)
+                start += size
+        finally:
+            self.close()
+        return '%08x' % value
+
+    def open(self):
+        """
+        Open the source for reading chunks (e.g. the local file), if it is not open yet.
+        """
+        self.source.open()
 
-    def __update_progress(self, update_size):
-        with self.__output_lock:
-            self.progress(self.filename, update_size, self.total_size)
+    def close(self):
+        """
+        Close the source opened by :py:meth:`open`.
+        """
+        self.source.close()
 
-    def __process_chunk(self, chunk):
+    def send_chunk(self, chunk):
         """
         Try to upload a chunk of data in several attempts.
-        :param chunk:
-        :return:
+        Uploading of a chunk is idempotent, so it is retried on any transient error.
+        The file should be opened with :py:meth:`open`.
+
+        This method is run by workers: it does not change the state of the upload,
+        the outcome should be passed to :py:meth:`handle_result`.
+
+        :param chunk: chunk from :py:attr:`iterator`
+        :type chunk: Chunk
+        :rtype: ChunkResult
         """
-        file_cache = None
+        try:
+            result = self.__send_chunk(chunk)
+        except Exception as e:
+            result = ChunkResult(chunk, error=str(e))
+        if result.error is not None or result.last:
+            self.__stopped.set()
+        return result
+
+    def __send_chunk_with_limit(self, chunk):
+        with self.concurrency:
+            return self.send_chunk(chunk)
+
+    def __send_chunk(self, chunk):
+        body = None
         upload_checked = False
         error = None
+        retry_policy = self.retry_policy
+
+        for attempt in range(1, retry_policy.max_attempts + 1):
+            # the upload has failed, completed or has been cancelled
+            if self.__stopped.is_set():
+                return ChunkResult(chunk)
 
-        for attempt in range(RETRY_ATTEMPTS):
             # Check if chunk is already uploaded
             if not upload_checked:
                 try:
-                    response = self.connection.get_request(self.chunk_upload_url, params=chunk.data, follow=False)
+                    response = self.connection.get_request(self.chunk_upload_url, params=chunk.data,
+                                                           follow=False, retry=False)
                 except RequestException as e:
                     error = str(e)
-                    time.sleep(RETRY_INTERVAL)
+                    self.__stopped.wait(retry_policy.get_delay(attempt))
                     continue
 
                 if response.status_code == 200:
-                    self.__update_progress(chunk.size)
-                    return
+                    return ChunkResult(chunk, uploaded=True)
                 else:
                     upload_checked = True
 
             # try to upload chunk
-            if file_cache is None:
-                file_cache = chunk.get_file()
+            if body is None:
+                body = chunk.get_body(self.source, self.checksum, self.bucket)
 
-            file_cache.seek(0)
+            body.seek(0)
+            started = time.perf_counter()
             try:
-                response = self.connection.post_multipart(self.chunk_upload_url,
-                                                          data=chunk.data,
-                                                          files={'file': file_cache},
-                                                          follow=False)
+                response = self.connection.post_multipart(
+                    self.chunk_upload_url, data=body,
+                    headers={'Content-Type': body.content_type}, follow=False)
             except (RequestException, SysCallError) as e:
                 # check that any type of connection error occurred and retry.
-                time.sleep(RETRY_INTERVAL)
+                self.concurrency.on_failure()
                 error = str(e)
                 if self.connection.debug:
                     sys.stderr.write('%s/%s attempt to upload %s failed. Connection error: %s\n' %
-                                     (attempt + 1, RETRY_ATTEMPTS, chunk, error))
+                                     (attempt, retry_policy.max_attempts, chunk, error))
+                self.__stopped.wait(retry_policy.get_delay(attempt))
                 continue
             # done without errors
             if response.status_code == 200:
-                self.__update_progress(chunk.size)
                 data = json.loads(response.text)
-
-                if data.get('lastChunkUploaded', False):
-                    self.application_result = data['result']
-                    self.has_application_result = True
-                    self.finished = True
-                return
+                checksum = None
+                if self.checksum is not None:
+                    checksum = chunk.reader.hexdigest()
+                    server_checksum = data.get('chunkChecksum')
+                    if server_checksum is None:
+                        self.__warn_unverified()
+                    elif server_checksum.lower() != checksum:
+                        error = 'Checksum mismatch for %s: sent %s, received by server %s' % (
+                            chunk, checksum, server_checksum)
+                        # the server has already assembled the file from the corrupted data
+                        if data.get('lastChunkUploaded', False):
+                            return ChunkResult(chunk, error=error)
+                        # the data has been corrupted on the way, send it again
+                        self.concurrency.on_failure()
+                        if self.connection.debug:
+                            sys.stderr.write('%s/%s attempt to upload %s failed. %s\n' % (
+                                attempt, retry_policy.max_attempts, chunk, error))
+                        self.__stopped.wait(retry_policy.get_delay(attempt))
+                        continue
+                self.concurrency.on_success(chunk.size, time.perf_counter() - started)
+                return ChunkResult(chunk, uploaded=True, response=response.text,
+                                   checksum=checksum, data=data)
 
             error = "Got response with status code: %s" % response.status_code
+            # transient errors (e.g. 503 from an overloaded server), try again
+            if response.status_code in retry_policy.retry_statuses:
+                self.concurrency.on_failure()
+                if self.connection.debug:
+                    sys.stderr.write('%s/%s attempt to upload %s failed. %s\n' %
+                                     (attempt, retry_policy.max_attempts, chunk, error))
+                self.__stopped.wait(retry_policy.get_delay(attempt, response))
+                continue
             # permanent errors
             if 400 <= response.status_code < 600:
-                self.finished = True
                 try:
                     data = json.loads(response.text)
                     if isinstance(data, dict) and 'error' in data:
                         error = data['error']
                 except ValueError:
                     pass
-                self.error = error
-                return
+                return ChunkResult(chunk, error=error)
             # other network errors, try again
-            time.sleep(RETRY_INTERVAL)
+            self.__stopped.wait(retry_policy.get_delay(attempt, response))
             continue
 
-        self.error = error
-        self.finished = True
+        return ChunkResult(chunk, error=error)
+
+    def __warn_unverified(self):
+        with self.__unverified_lock:
+            if self.__unverified:
+                return
+            self.__unverified = True
+        sys.stderr.write('Server has not reported checksums of chunks of %s, '
+                         'they are not verified\n' % self.path)
+
+    def handle_result(self, result):
+        """
+        Apply the outcome of a chunk to the state of the upload.
+        It is called by one thread: the chunk that completes the file sets
+        :py:attr:`application_result`, the first permanent error or exhausted attempts
+        set :py:attr:`error`; both set :py:attr:`finished`.
+
+        :param result: result of :py:meth:`send_chunk`
+        :type result: ChunkResult
+        :rtype: None
+        """
+        if result.skipped:
+            return
+        if not result.uploaded:
+            if not self.finished:
+                self.error = result.error
+                self.finished = True
+            return
+        chunk = result.chunk
+        # chunks can be reported after the last one, they are on the server anyway
+        self.__update_progress(chunk.size)
+        if self.has_application_result:
+            return
+        if result.last:
+            if result.checksum is not None:
+                self.__chunk_checksums[chunk.number] = result.checksum
+            self.application_result = result.data['result']
+            self.has_application_result = True
+            self.finished = True
+            if self.journal is not None:
+                self.journal.finish(self.journal_upload.id)
+        else:
+            self.__record_chunk(chunk, result.response, result.checksum)
+
+    def next_chunk(self):
+        """
+        Return the next chunk to upload, or ``None`` if there are no more chunks.
+        Data of sequential sources is read here: if the source fails, the upload fails.
+
+        :rtype: Chunk
+        """
+        if self.finished:
+            return None
+        try:
+            return next(self.iterator, None)
+        except Exception as e:
+            self.cancel('Fail to read %s: %s' % (self.path, e))
+            return None
+
+    def cancel(self, error='Interrupted by user'):
+        """
+        Stop the upload: workers do not start new attempts.
+
+        :param error: reason
+        :type error: str
+        """
+        self.__stopped.set()
+        if not self.finished:
+            self.error = error
+            self.finished = True
 
     def upload(self):
-        def do_stuff():
-            """
-            The daemon will look for uploads.
-            The daemon will quit if one of the following conditions is met:
-                - all chunks have been processed
-                - someone set self.finished to True
-                - the server said that the file upload was complete
-                - a permanent error was raised (4xx, 5xx)
-                - the number of RETRY_ATTEMPTS was exceeded for a single chunk
-            """
-            with self.condition:
-                self.thread_counter += 1
-            try:
-                while not self.finished:  # daemon working cycle
-                    try:
-                        with self.__iterator_lock:
-                            chunk = next(self.iterator)
-                    except StopIteration:
-                        return
-                    self.__process_chunk(chunk)
-            except Exception as e:
-                self.error = str(e)
-            finally:
-                with self.condition:
-                    self.thread_counter -= 1
-                    self.condition.notify()
-
-        threads = [Thread(target=do_stuff) for _ in range(min(NUM_THREADS, self.chunk_count))]
-        [thread.setDaemon(True) for thread in threads]
-        [thread.start() for thread in threads]
-
-        with self.condition:
-            while True:
-                try:
-                    self.condition.wait()
-                except (KeyboardInterrupt, SystemExit):
-                    self.error = 'Interrupted by user'
-                    self.finished = True
-                    break
-                if not self.thread_counter:
+        """
+        Upload the file. Chunks are sent by a pool of workers, and their outcomes
+        are handled by the calling thread.
+
+        The pool stops when one of the following conditions is met:
+            - all chunks have been processed
+            - the server said that the file upload was complete
+            - a permanent error was raised (4xx, 5xx)
+            - the number of attempts of the retry policy was exceeded for a single chunk
+            - the upload was interrupted (e.g. by Ctrl-C)
+
+        :return: result of the application for the uploaded file
+        :raises GenestackException: if the upload has failed
+        """
+        try:
+            return self.__upload()
+        finally:
+            # the journal is written only by this thread
+            if self.__owns_journal:
+                self.journal.close()
+
+    def __upload(self):
+        if self.completed_size:
+            sys.stderr.write('Resuming upload of %s: %s of %s bytes remaining\n' % (
+                self.filename, self.total_size - self.completed_size, self.total_size))
+            self.__update_progress(self.completed_size)
+
+        self.open()
+        # the number of workers is the upper bound, the concurrency limit may be lower
+        workers = min(self.concurrency.maximum, self.chunk_count)
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='odm-sdk-upload')
+        futures = set()
+        try:
+            while not self.finished:
+                # chunks are scheduled as workers become free, so that chunks
+                # of sequential sources are not read into memory in advance
+                while len(futures) < self.__scheduling_limit(workers):
+                    chunk = self.next_chunk()
+                    if chunk is None:
+                        break
+                    futures.add(executor.submit(self.__send_chunk_with_limit, chunk))
+                if not futures:
                     break
+                # wait with a timeout to handle KeyboardInterrupt promptly
+                done, futures = wait(futures, timeout=1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.handle_result(future.result())
+        except BaseException as e:
+            interrupted = isinstance(e, (KeyboardInterrupt, SystemExit))
+            if interrupted:
+                self.cancel()
+            else:
+                self.cancel(str(e))
+            executor.shutdown(wait=False, cancel_futures=True)
+            # workers may still be sending data, they stop after their current request
+            running = [future for future in futures if not future.done()]
+            Thread(target=self.__close_after, args=(running,), daemon=True).start()
+            if not interrupted:
+                raise
+        else:
+            # the remaining chunks are not started, the running ones finish quickly
+            executor.shutdown(wait=True, cancel_futures=True)
+            self.close()
+            for future in futures:
+                if not future.cancelled():
+                    self.handle_result(future.result())
+        return self.get_result()
+
+    def __close_after(self, futures):
+        wait(futures)
+        self.close()
+
+    def __scheduling_limit(self, workers):
+        # chunks of sequential sources are read into memory when they are scheduled,
+        # so only as many of them are scheduled as can be sent at once
+        if self.source.random_access:
+            return 2 * workers
+        return self.concurrency.limit
+
+    def get_result(self):
+        """
+        Return the result of the application for the uploaded file.
+
+        :raises GenestackException: if the upload has failed
+        """
         if self.has_application_result:
             return self.application_result
         else:
@@ -304,5 +757,8 @@ class ChunkedUpload(object):
             raise GenestackException('Fail to upload %s: %s' % (self.path, error_message))
 
 
-def upload_by_chunks(application, path, chunk_size=None):
-    return ChunkedUpload(application, path, chunk_size=chunk_size).upload()
+def upload_by_chunks(application, path, chunk_size=None, retry_policy=None, adaptive=False,
+                     journal=None, checksum=None, rate_limit=None, name=None, size=None):
+    return ChunkedUpload(application, path, chunk_size=chunk_size, retry_policy=retry_policy,
+                         adaptive=adaptive, journal=journal, checksum=checksum,
+                         rate_limit=rate_limit, name=name, size=size).upload()
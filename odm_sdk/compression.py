@@ -0,0 +1,81 @@
+import gzip
+
+from urllib3.util.request import ACCEPT_ENCODING
+
+from odm_sdk import GenestackException
+
+DEFAULT_COMPRESSION_THRESHOLD = 16 * 1024
+
+# content codings which can be decoded by urllib3 in this environment
+# (``br`` and ``zstd`` are added when the corresponding packages are installed)
+ACCEPTED_ENCODINGS = ACCEPT_ENCODING
+
+
+class GzipCompressor(object):
+    """
+    Compresses request bodies with gzip. Supported by any server.
+    """
+
+    name = 'gzip'
+
+    def __init__(self, level=6):
+        """
+        :param level: compression level from 1 (fastest) to 9 (smallest)
+        :type level: int
+        """
+        self.level = level
+
+    def compress(self, data):
+        """
+        Compress request body.
+
+        :param data: request body
+        :type data: bytes
+        :return: compressed body
+        :rtype: bytes
+        """
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    def __repr__(self):
+        return '%s(level=%s)' % (self.__class__.__name__, self.level)
+
+
+class ZstdCompressor(GzipCompressor):
+    """
+    Compresses request bodies with Zstandard, using
+    `zstandard <https://pypi.org/project/zstandard/>`_ package.
+    It is faster than gzip at a better ratio, but the server has to support it.
+    """
+
+    name = 'zstd'
+
+    def __init__(self, level=3):
+        import zstandard
+        super(ZstdCompressor, self).__init__(level)
+        self.__zstandard = zstandard
+
+    def compress(self, data):
+        # compressor objects must not be shared between threads
+        return self.__zstandard.ZstdCompressor(level=self.level).compress(data)
+
+
+_COMPRESSORS = (GzipCompressor, ZstdCompressor)
+
+
+def get_compressor(name):
+    """
+    Return request body compressor by name: ``'gzip'`` or ``'zstd'``.
+
+    :param name: name of content coding
+    :type name: str
+    :return: compressor
+    :rtype: GzipCompressor
+    """
+    for compressor_class in _COMPRESSORS:
+        if compressor_class.name == name:
+            try:
+                return compressor_class()
+            except ImportError:
+                raise GenestackException('Compression "%s" is not installed' % name)
+    raise GenestackException('Unknown compression "%s", expect one of: %s' % (
+        name, ', '.join(compressor_class.name for compressor_class in _COMPRESSORS)))
@@ -1,18 +1,59 @@
-import json
 import os
 import sys
+import threading
+import time
 import urllib
 from io import FileIO
 from urllib.parse import urlsplit
 import requests
 from requests import HTTPError, RequestException
+from requests.adapters import HTTPAdapter
 
 from odm_sdk import (GenestackAuthenticationException, GenestackConnectionFailure,
                               GenestackException, GenestackResponseError, GenestackServerException,
                               GenestackVersionException, __version__)
+from odm_sdk.batch import DEFAULT_MAX_IN_FLIGHT, Batch
 from odm_sdk.chunked_upload import upload_by_chunks
+from odm_sdk.compression import ACCEPTED_ENCODINGS, DEFAULT_COMPRESSION_THRESHOLD, get_compressor
+from odm_sdk.download import ParallelDownload
+from odm_sdk.instrumentation import RequestInfo
+from odm_sdk.json_codec import DEFAULT_CODEC
+from odm_sdk.json_stream import iter_json_array_field
+from odm_sdk.rate_limit import get_bucket, throttle
+from odm_sdk.retry import NO_RETRY, RetryPolicy, print_retry
+from odm_sdk.upload_manager import UploadManager
 from odm_sdk.utils import isatty
 
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+
+
+def _body_size(body):
+    if body is None:
+        return 0
+    try:
+        return len(body)
+    except TypeError:
+        # unsized file-like object
+        return 0
+
+
+def _received_size(http_response, decoded_size):
+    """
+    Return the number of body bytes received over the wire, i.e. before the content
+    has been decompressed.
+    """
+    try:
+        size = http_response.raw.tell()
+    except (AttributeError, OSError):
+        size = 0
+    if size:
+        return size
+    content_length = http_response.headers.get('Content-Length')
+    if content_length is not None and content_length.isdigit():
+        return int(content_length)
+    return decoded_size
+
 
 class Response(object):
     """Represents response from Genestack server."""
@@ -45,6 +86,70 @@ class Response(object):
         return self._data.get('elapsedMicroseconds')
 
 
+class StreamingResponse(Response):
+    """
+    Represents response from Genestack server whose result is decoded incrementally.
+
+    Iterating over the response yields elements of the ``result`` array as soon as they
+    are received, without keeping the whole result in memory. Other fields
+    (:py:attr:`error`, :py:attr:`log`, ...) are available when iteration is finished.
+    A response can be iterated only once.
+    """
+
+    READ_SIZE = 64 * 1024
+
+    def __init__(self, http_response, on_finish=None):
+        """
+        :param http_response: response opened with ``stream=True``
+        :type http_response: requests.Response
+        :param on_finish: function called when the iteration is over with this response
+                          and the exception raised by the iteration, if any
+        :type on_finish: callable
+        """
+        super(StreamingResponse, self).__init__({})
+        self.__http_response = http_response
+        self.__on_finish = on_finish
+        self.bytes_received = 0
+
+    @property
+    def log(self):
+        return self._data.get('log')
+
+    @property
+    def result(self):
+        raise GenestackException('Result of a streaming response is only available by iteration')
+
+    def __read(self):
+        decoded_size = 0
+        for chunk in self.__http_response.iter_content(self.READ_SIZE):
+            decoded_size += len(chunk)
+            self.bytes_received = _received_size(self.__http_response, decoded_size)
+            yield chunk
+
+    def __iter__(self):
+        error = None
+        try:
+            items = iter_json_array_field(self.__read(), 'result', self._data)
+            for item in items:
+                yield item
+            # result which is not a list is yielded as a single item
+            if self._data.get('result') is not None:
+                yield self._data.pop('result')
+        except RequestException as e:
+            error = GenestackConnectionFailure(str(e))
+            raise error
+        except ValueError as e:
+            error = GenestackException('Cannot parse content: %s' % e)
+            raise error
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.__http_response.close()
+            if self.__on_finish is not None:
+                self.__on_finish(self, error)
+
+
 class Connection(object):
     """
     A class to handle a connection to a specified Genestack server.
@@ -52,7 +157,11 @@ class Connection(object):
     To do so, you need to call the :py:meth:`~odm_sdk.Connection.login` method.
     """
 
-    def __init__(self, server_url, debug=False, show_logs=False):
+    def __init__(self, server_url, debug=False, show_logs=False,
+                 pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 pool_block=False, keep_alive=True, retry_policy=None, codec=None,
+                 compression=None, compression_threshold=DEFAULT_COMPRESSION_THRESHOLD,
+                 hooks=None, logout_on_delete=True):
         """
         :param server_url: server url
         :type server_url: str
@@ -60,19 +169,106 @@ class Connection(object):
         :type debug: bool
         :param show_logs: will print application logs (received from server)
         :type show_logs: bool
+        :param pool_connections: number of per-host connection pools to keep
+        :type pool_connections: int
+        :param pool_maxsize: maximum number of keep-alive connections per host;
+                             should not be less than the number of threads sharing the connection
+        :type pool_maxsize: int
+        :param pool_block: if ``True``, never open more than ``pool_maxsize`` connections
+                           to a host and wait for a free one instead
+        :type pool_block: bool
+        :param keep_alive: reuse TCP/TLS connections between requests
+        :type keep_alive: bool
+        :param retry_policy: policy of retrying requests on transient failures,
+                             by default :py:class:`~odm_sdk.RetryPolicy` with default settings
+        :type retry_policy: odm_sdk.RetryPolicy
+        :param codec: JSON codec for requests and responses, the fastest available one
+                      by default (see :py:func:`~odm_sdk.json_codec.get_codec`)
+        :type codec: odm_sdk.json_codec.JsonCodec
+        :param compression: content coding of request bodies: ``'gzip'`` or ``'zstd'``,
+                            or ``None`` to send them uncompressed; if the server replies
+                            that the coding is not supported, compression is turned off
+                            for the connection
+        :type compression: str
+        :param compression_threshold: minimal size of a request body to be compressed, bytes
+        :type compression_threshold: int
+        :param hooks: instrumentation hooks, see :py:meth:`add_hook`
+        :type hooks: list[odm_sdk.instrumentation.RequestHook]
+        :param logout_on_delete: sign out when the connection object is garbage collected;
+                                 turned off for sessions shared between processes
+                                 (see :py:class:`~odm_sdk.settings.session_cache.SessionCache`)
+        :type logout_on_delete: bool
         """
         self.server_url = server_url
-        self.session = requests.session()
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.session = self._make_session()
+        # a separate pool for GET requests (chunk checks and downloads),
+        # so a broken download connection never affects application calls
+        self._get_session = self._make_session()
+        self._get_session.cookies = self.session.cookies
+        self.retry_policy = RetryPolicy() if retry_policy is None else retry_policy
+        self.codec = DEFAULT_CODEC if codec is None else codec
+        self.compressor = get_compressor(compression) if compression else None
+        self.compression_threshold = compression_threshold
+        self.hooks = list(hooks or [])
+        self.logout_on_delete = logout_on_delete
+        # function without arguments to log in again when the session has expired
+        self.reauthenticate = None
+        self.__reauthentication_lock = threading.RLock()
+        self.__reauthenticating = False
+        self.__authentication_generation = 0
         self.debug = debug
         self.show_logs = show_logs
 
+    def _make_session(self):
+        session = requests.session()
+        adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                              pool_maxsize=self.pool_maxsize,
+                              pool_block=self.pool_block)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        # advertise only the codings which can be decoded
+        session.headers['Accept-Encoding'] = ACCEPTED_ENCODINGS
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
     def __del__(self):
+        if not getattr(self, 'logout_on_delete', True):
+            return
         try:
+            # do not delay garbage collection or interpreter exit by retries
+            self.retry_policy = NO_RETRY
             self.logout()
         except Exception:
             # fail silently
             pass
 
+    def add_hook(self, hook):
+        """
+        Add an instrumentation hook, which is called before and after every request
+        performed by :py:meth:`perform_request` and :py:meth:`perform_streaming_request`
+        (i.e. every application call). See :py:mod:`odm_sdk.instrumentation`.
+
+        :param hook: hook to add
+        :type hook: odm_sdk.instrumentation.RequestHook
+        :rtype: None
+        """
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        """
+        Remove an instrumentation hook added by :py:meth:`add_hook`.
+
+        :param hook: hook to remove
+        :type hook: odm_sdk.instrumentation.RequestHook
+        :rtype: None
+        """
+        self.hooks.remove(hook)
+
     def whoami(self):
         """
         Return user email.
@@ -174,29 +370,141 @@ class Connection(object):
         :return: response from server
         :rtype: Response
         """
+        info = self._before_request(path)
+        try:
+            try:
+                http_response = self.__post(path, data, follow, headers, info=info)
+                info.bytes_received = _received_size(http_response,
+                                                     len(http_response.content))
+                try:
+                    response = Response(self.codec.loads(http_response.content))
+                except ValueError as e:
+                    raise GenestackException('Cannot parse content: %s' % e)
+
+            except RequestException as e:
+                raise GenestackConnectionFailure(str(e))
+        except Exception as e:
+            self._after_request(info, error=e)
+            raise
+        self._after_request(info, response)
+        return response
+
+    def perform_streaming_request(self, path, data='', follow=True, headers=None):
+        """
+        Perform an HTTP request to Genestack server and decode the ``result`` array
+        of the response incrementally, while it is being received.
+        Parameters are the same as for :py:meth:`perform_request`.
+
+        :return: response from server, iterate over it to get elements of the result
+        :rtype: StreamingResponse
+        """
+        info = self._before_request(path)
+        try:
+            try:
+                http_response = self.__post(path, data, follow, headers, stream=True, info=info)
+            except RequestException as e:
+                raise GenestackConnectionFailure(str(e))
+        except Exception as e:
+            self._after_request(info, error=e)
+            raise
+
+        def on_finish(response, error):
+            info.bytes_received = response.bytes_received
+            self._after_request(info, response, error)
+
+        return StreamingResponse(http_response, on_finish)
+
+    def _before_request(self, path):
+        info = RequestInfo(path, time.perf_counter())
+        for hook in self.hooks:
+            hook.before_request(info)
+        return info
+
+    def _after_request(self, info, response=None, error=None):
+        info.elapsed = time.perf_counter() - info.start_time
+        info.error = error
+        if response is not None:
+            info.server_error = response.error
+            info.trace = response.trace
+            if response.elapsed_microseconds is not None:
+                info.server_elapsed = response.elapsed_microseconds / 1e6
+        for hook in self.hooks:
+            hook.after_request(info)
+
+    def __post(self, path, data, follow, headers, stream=False, info=None):
         _headers = {'gs-extendSession': 'true'}
 
         if headers:
             _headers.update(headers)
+        # a file-like body cannot be sent again
+        retry_policy = self.retry_policy if isinstance(data, (str, bytes, dict)) else NO_RETRY
+
+        def send(body, body_headers):
+            return retry_policy.call(
+                lambda: self.session.post(
+                    self.server_url + path, data=body, headers=body_headers,
+                    allow_redirects=follow, stream=stream,
+                    timeout=int(os.environ.get("GENESTACK_CLIENT_TIMEOUT"))
+                    if os.environ.get("GENESTACK_CLIENT_TIMEOUT", None) else None),
+                'POST', on_retry=self._on_retry(path, retry_policy, info))
+
+        def send_data():
+            compressor = self.compressor
+            if compressor is not None and isinstance(data, (str, bytes)) \
+                    and len(data) >= self.compression_threshold:
+                body = data.encode('utf-8') if isinstance(data, str) else data
+                response = send(compressor.compress(body),
+                                dict(_headers, **{'Content-Encoding': compressor.name}))
+                if response.status_code == 415:
+                    # the server does not accept compressed bodies, do not try it again
+                    response.close()
+                    self.compressor = None
+                    response = send(data, _headers)
+                return response
+            return send(data, _headers)
+
+        generation = self.__authentication_generation
+        response = send_data()
+        if response.status_code == 401 and retry_policy is not NO_RETRY \
+                and self.__reauthenticate(generation):
+            response.close()
+            response = send_data()
+        if info is not None:
+            info.status_code = response.status_code
+            info.bytes_sent = _body_size(response.request.body)
+        if response.status_code == 401:
+            response.close()
+            raise GenestackAuthenticationException('Authentication failure')
         try:
-            response = self.session.post(
-                self.server_url + path, data=data, headers=_headers,
-                allow_redirects=follow,
-                timeout=int(os.environ.get("GENESTACK_CLIENT_TIMEOUT"))
-                if os.environ.get("GENESTACK_CLIENT_TIMEOUT", None) else None)
-            if response.status_code == 401:
-                raise GenestackAuthenticationException('Authentication failure')
-            try:
-                response.raise_for_status()
-            except HTTPError as e:
-                raise GenestackResponseError(*e.args)
-            try:
-                return Response(response.json())
-            except ValueError as e:
-                raise GenestackException('Cannot parse content: %s' % e)
+            response.raise_for_status()
+        except HTTPError as e:
+            response.close()
+            raise GenestackResponseError(*e.args)
+        return response
 
-        except RequestException as e:
-            raise GenestackConnectionFailure(str(e))
+    def __reauthenticate(self, generation):
+        """
+        Log in again after the server has rejected the session, if :py:attr:`reauthenticate`
+        is set. Only one thread logs in, others wait for it and reuse the new session.
+
+        :param generation: authentication generation when the rejected request was sent
+        :return: ``True`` if the request should be repeated
+        :rtype: bool
+        """
+        if self.reauthenticate is None:
+            return False
+        with self.__reauthentication_lock:
+            if self.__reauthenticating:
+                # the login request itself has been rejected
+                return False
+            if generation == self.__authentication_generation:
+                self.__reauthenticating = True
+                try:
+                    self.reauthenticate()
+                finally:
+                    self.__reauthenticating = False
+                self.__authentication_generation += 1
+        return True
 
     def application(self, application_id):
         """
@@ -209,25 +517,74 @@ class Connection(object):
         """
         return Application(self, application_id)
 
+    def batch(self, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        """
+        Returns a context manager that performs application calls concurrently.
+        See :py:class:`~odm_sdk.batch.Batch`.
+
+        :param max_in_flight: maximum number of concurrent requests
+        :type max_in_flight: int
+        :return: batch of calls
+        :rtype: odm_sdk.batch.Batch
+        """
+        return Batch(self, max_in_flight=max_in_flight)
+
     def __repr__(self):
         return 'Connection("%s")' % self.server_url
 
-    def get_request(self, path, params=None, follow=True):
-        # This request also serves for download method of an application
-        # It is possible that next request that uses same connection will fail,
-        # that why we create new connection every time instead of reuse self.session
-        return requests.get(
-            url=self.server_url + path,
-            params=params,
-            allow_redirects=follow,
-            cookies=self.session.cookies
-        )
+    def _on_retry(self, path, retry_policy, info=None):
+        if not self.debug and info is None:
+            return None
+
+        def on_retry(attempt, delay, outcome):
+            if info is not None:
+                info.retries += 1
+            if self.debug:
+                print_retry(attempt, delay, outcome, retry_policy.max_attempts, what=path)
+
+        return on_retry
+
+    def get_request(self, path, params=None, follow=True, retry=True, headers=None,
+                    stream=False):
+        # This request also serves for download method of an application.
+        # It is sent via a dedicated pool sharing cookies with self.session:
+        # the body is read completely, so the connection is safely returned to the pool.
+        # A streamed response should be closed by the caller.
+        retry_policy = self.retry_policy if retry else NO_RETRY
+        return retry_policy.call(
+            lambda: self._get_session.get(
+                url=self.server_url + path,
+                params=params,
+                headers=headers,
+                allow_redirects=follow,
+                stream=stream
+            ),
+            'GET', on_retry=self._on_retry(path, retry_policy))
+
+    def download_file(self, path, destination, **kwargs):
+        """
+        Download a file from the server by parallel range requests.
+        An interrupted download is resumed by the next call with the same arguments.
+        See :py:class:`~odm_sdk.download.ParallelDownload`.
+
+        :param path: path of the file on the server
+        :type path: str
+        :param destination: local path of the file
+        :type destination: str
+        :param kwargs: arguments of :py:class:`~odm_sdk.download.ParallelDownload`
+        :return: ``destination``
+        :rtype: str
+        """
+        return ParallelDownload(self, path, destination, **kwargs).download()
 
-    def post_multipart(self, path, data=None, files=None, follow=True):
+    def post_multipart(self, path, data=None, files=None, follow=True, headers=None):
+        # ``data`` can be a streaming body with its own Content-Type header,
+        # e.g. odm_sdk.multipart.MultipartEncoder
         return self.session.post(
             url=self.server_url + path,
             data=data,
             files=files,
+            headers=headers,
             allow_redirects=follow,
         )
 
@@ -264,7 +621,10 @@ class Application(object):
         if trace:
             headers['Genestack-Trace'] = 'true'
         response = self.connection.perform_request(path, post_data, headers=headers)
+        self.__handle_response(response, path, post_data)
+        return response
 
+    def __handle_response(self, response, path, post_data):
         if response.error is not None:
             raise GenestackServerException(
                 response.error, path, post_data,
@@ -278,8 +638,6 @@ class Application(object):
             )
             print(message)
 
-        return response
-
     def get_response(self, method, params=None, trace=True):
         """
         Invoke one of the application's public Java methods and return Response object.
@@ -299,7 +657,7 @@ class Application(object):
         if not params:
             params = []
 
-        post_data = json.dumps(params)
+        post_data = self.connection.codec.dumps(params)
         path = '/application/invoke/%s/%s' % (self.application_id, urllib.parse.quote(method))
 
         # there might be present also self.__invoke(path, post_data)['log'] -- show it?
@@ -317,10 +675,77 @@ class Application(object):
         """
         return self.get_response(method, params).result
 
-    def upload_chunked_file(self, file_path):
-        return upload_by_chunks(self, file_path)
+    def invoke_stream(self, method, *params):
+        """
+        Invoke one of the application's public Java methods which returns a list,
+        and iterate over the elements of the list while the response is being received.
+        Unlike :py:meth:`invoke`, the whole result is never kept in memory,
+        which is useful for methods returning large lists.
+
+        An error returned by the method is raised when iteration is finished.
+
+        :param method: name of the public Java method
+        :type method: str
+        :param params: arguments that will be passed to the Java method.
+                       Arguments must be JSON-serializable.
+        :return: iterator over JSON-deserialized elements of the result
+        """
+        post_data = self.connection.codec.dumps(params)
+        path = '/application/invoke/%s/%s' % (self.application_id, urllib.parse.quote(method))
+        response = self.connection.perform_streaming_request(path, post_data)
+        for item in response:
+            yield item
+        self.__handle_response(response, path, post_data)
+
+    def upload_chunked_file(self, file_path, adaptive=False, journal=None, checksum=None,
+                            rate_limit=None, name=None, size=None):
+        """
+        Upload a file in chunks, several chunks at a time.
+
+        The data can be streamed from another source without staging it on a local disk:
+        an URL of a server supporting range requests, a file-like object or an iterable
+        of bytes (see :py:func:`~odm_sdk.upload_sources.get_upload_source`).
+
+        :param file_path: path to existing local file or another source of data
+        :type file_path: str|odm_sdk.upload_sources.UploadSource
+        :param adaptive: choose chunk size by the file size and adjust the number
+                         of concurrent uploads to the link throughput and errors
+        :type adaptive: bool
+        :param journal: record uploaded chunks to resume the upload after the process
+                        is interrupted, ``True`` to use the default journal
+                        (see :py:class:`~odm_sdk.upload_journal.UploadJournal`)
+        :type journal: bool|odm_sdk.upload_journal.UploadJournal
+        :param checksum: send checksums of chunks computed with this algorithm
+                         and verify them against the ones reported by the server
+                         (see :py:func:`~odm_sdk.checksums.get_checksum`)
+        :type checksum: str
+        :param rate_limit: maximum upload rate in bytes per second
+                           (see :py:mod:`odm_sdk.rate_limit`)
+        :type rate_limit: float|odm_sdk.rate_limit.TokenBucket
+        :param name: file name, required for iterables and non-seekable file-like objects
+        :type name: str
+        :param size: data size, required for iterables and non-seekable file-like objects
+        :type size: int
+        :return: result of the application for the uploaded file
+        """
+        return upload_by_chunks(self, file_path, adaptive=adaptive, journal=journal,
+                                checksum=checksum, rate_limit=rate_limit, name=name, size=size)
+
+    def upload_chunked_files(self, file_paths, **kwargs):
+        """
+        Upload many files in chunks with one pool of workers, largest files first.
+        A failed file does not stop the others.
+        See :py:class:`~odm_sdk.upload_manager.UploadManager`.
+
+        :param file_paths: paths to existing local files
+        :type file_paths: list[str]
+        :param kwargs: arguments of :py:class:`~odm_sdk.upload_manager.UploadManager`
+        :return: results in the order of ``file_paths``
+        :rtype: list[odm_sdk.upload_manager.UploadResult]
+        """
+        return UploadManager(self, **kwargs).upload(file_paths)
 
-    def upload_file(self, file_path, token):
+    def upload_file(self, file_path, token, rate_limit=None):
         """
         Upload a file to the current Genestack instance.
         This action requires a special token that can be generated by the application.
@@ -329,6 +754,9 @@ class Application(object):
         :type file_path: str
         :param token: upload token
         :type file_path: str
+        :param rate_limit: maximum upload rate in bytes per second
+                           (see :py:mod:`odm_sdk.rate_limit`)
+        :type rate_limit: float|odm_sdk.rate_limit.TokenBucket
         :rtype: None
         """
         if isatty():
@@ -336,7 +764,8 @@ class Application(object):
         else:
             progress = DottedProgress(40)
 
-        file_to_upload = FileWithCallback(file_path, 'rb', progress)
+        file_to_upload = FileWithCallback(file_path, 'rb', progress,
+                                          bucket=get_bucket(rate_limit))
         filename = os.path.basename(file_path)
         path = '/application/upload/%s/%s/%s' % (
             self.application_id, token, urllib.parse.quote(filename)
@@ -345,45 +774,49 @@ class Application(object):
 
 
 class FileWithCallback(FileIO):
-    def __init__(self, path, mode, callback):
+    def __init__(self, path, mode, callback, bucket=None):
         FileIO.__init__(self, path, mode)
         self.seek(0, os.SEEK_END)
         self.__total = self.tell()
         self.seek(0)
         self.__callback = callback
+        self.__bucket = bucket
 
     def __len__(self):
         return self.__total
 
     def read(self, size=None):
         data = FileIO.read(self, size)
+        throttle(len(data), self.__bucket)
         self.__callback(os.path.basename(self.name), len(data), self.__total)
         return data
 
 
 class TTYProgress(object):
-    def __init__(self):
+    def __init__(self, action='Uploading'):
         self._seen = 0.0
+        self._action = action
 
     def __call__(self, name, size, total):
         if size > 0 and total > 0:
             self._seen += size
             pct = self._seen * 100.0 / total
-            sys.stderr.write('\rUploading %s - %.2f%%' % (name, pct))
+            sys.stderr.write('\r%s %s - %.2f%%' % (self._action, name, pct))
             if int(pct) >= 100:
                 sys.stderr.write('\n')
 
 
 class DottedProgress(object):
-    def __init__(self, full_length):
+    def __init__(self, full_length, action='Uploading'):
         self.__full_length = full_length
+        self.__action = action
         self.__dots = 0
         self.__seen = 0.0
 
     def __call__(self, name, size, total):
         if size > 0 and total > 0:
             if self.__seen == 0:
-                sys.stderr.write('Uploading %s: ' % name)
+                sys.stderr.write('%s %s: ' % (self.__action, name))
             self.__seen += size
             dots = int(self.__seen * self.__full_length / total)
             while dots > self.__dots and self.__dots < self.__full_length:
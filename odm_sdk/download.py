@@ -0,0 +1,417 @@
+import json
+import os
+import re
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from OpenSSL.SSL import SysCallError
+from requests.exceptions import RequestException
+
+from odm_sdk import GenestackException
+from odm_sdk.checksums import compute_file_checksum
+from odm_sdk.utils import isatty
+
+DEFAULT_PART_SIZE = 1024 * 1024 * 8  # 8mb
+DEFAULT_MAX_WORKERS = 4
+READ_SIZE = 1024 * 256
+
+# the file is downloaded to ``<destination>.part``, the state of the download
+# is kept in ``<destination>.part.json`` until the file is complete
+PARTIAL_SUFFIX = '.part'
+STATE_SUFFIX = '.part.json'
+
+_CONTENT_RANGE = re.compile(r'bytes\s+(\d+)-(\d+)/(\d+)')
+
+_seek_lock = threading.Lock()
+
+
+def _pwrite(fd, data, offset):
+    """
+    Write ``data`` at ``offset`` without changing the file position,
+    so one descriptor can be shared by many threads.
+    """
+    if hasattr(os, 'pwrite'):
+        while data:
+            written = os.pwrite(fd, data, offset)
+            data = data[written:]
+            offset += written
+        return
+    # Windows
+    with _seek_lock:
+        os.lseek(fd, offset, os.SEEK_SET)
+        while data:
+            data = data[os.write(fd, data):]
+
+
+class Part(object):
+    """
+    Byte range of the downloaded file.
+    """
+
+    def __init__(self, number, start, size):
+        self.number = number
+        self.start = start
+        self.size = size
+
+    @property
+    def end(self):
+        # last byte, inclusive like in ``Range`` header
+        return self.start + self.size - 1
+
+    def __str__(self):
+        return 'Part %s (bytes %s-%s)' % (self.number, self.start, self.end)
+
+
+class PartResult(object):
+    """
+    Outcome of downloading a part, produced by a worker.
+
+    :ivar part: the part
+    :ivar error: error message if the part has not been downloaded,
+                 ``None`` if it has been downloaded or skipped
+    :ivar permanent: the download cannot be resumed, e.g. the file has been changed
+    :ivar skipped: the part has not been started because the download has been stopped
+    """
+
+    def __init__(self, part, error=None, permanent=False, skipped=False):
+        self.part = part
+        self.error = error
+        self.permanent = permanent
+        self.skipped = skipped
+
+
+class ParallelDownload(object):
+    """
+    Downloads a file by parallel HTTP range requests.
+
+    The file is preallocated and parts are written to their places by a pool of workers
+    with positional writes, so parts can arrive in any order. A part interrupted by
+    a network error is continued from the last received byte.
+
+    The download is written to ``<destination>.part``. Completed parts are recorded
+    in ``<destination>.part.json``, so an interrupted download (e.g. by Ctrl-C)
+    is resumed from the missing parts by the next download of the same file.
+    The file is validated by ``ETag`` or ``Last-Modified`` of the server: if it has been
+    changed, the download starts from the beginning. When all parts are downloaded,
+    the checksum is verified and the file is renamed to ``destination``.
+
+    If the server does not support range requests, the file is downloaded
+    in one request.
+    """
+
+    def __init__(self, connection, path, destination, part_size=DEFAULT_PART_SIZE,
+                 max_workers=DEFAULT_MAX_WORKERS, retry_policy=None, checksum=None,
+                 checksum_algorithm='md5', show_progress=True):
+        """
+        :param connection: connection to the server
+        :type connection: odm_sdk.Connection
+        :param path: path of the file on the server
+        :type path: str
+        :param destination: local path of the file
+        :type destination: str
+        :param part_size: size of a range request
+        :type part_size: int
+        :param max_workers: maximum number of parts downloaded at the same time
+        :type max_workers: int
+        :param retry_policy: policy of retrying parts, the one of the connection by default
+        :type retry_policy: odm_sdk.RetryPolicy
+        :param checksum: expected hexadecimal digest of the file
+        :type checksum: str
+        :param checksum_algorithm: algorithm of ``checksum``,
+                                   see :py:func:`~odm_sdk.checksums.get_checksum`
+        :type checksum_algorithm: str
+        :param show_progress: report progress to stderr
+        :type show_progress: bool
+        """
+        if part_size <= 0:
+            raise GenestackException('Part size should be positive')
+        if max_workers <= 0:
+            raise GenestackException('Number of workers should be positive')
+        self.connection = connection
+        self.path = path
+        self.destination = destination
+        self.part_size = part_size
+        self.max_workers = max_workers
+        self.retry_policy = retry_policy or connection.retry_policy
+        self.checksum = checksum
+        self.checksum_algorithm = checksum_algorithm
+        self.partial_path = destination + PARTIAL_SUFFIX
+        self.state_path = destination + STATE_SUFFIX
+        self.name = os.path.basename(destination)
+
+        self.total_size = None
+        self.validator = None
+        self.completed_parts = set()
+        self.downloaded_size = 0
+        self.fd = None
+        self.__stopped = threading.Event()
+
+        if not show_progress:
+            self.progress = lambda name, size, total: None
+        elif isatty():
+            from odm_sdk.connection import TTYProgress
+            self.progress = TTYProgress('Downloading')
+        else:
+            from odm_sdk.connection import DottedProgress
+            self.progress = DottedProgress(40, 'Downloading')
+
+    def __update_progress(self, size):
+        self.downloaded_size += size
+        self.progress(self.name, size, self.total_size)
+
+    def __get(self, start, end, retry=True):
+        # offsets of a compressed body would not match the range
+        headers = {'Range': 'bytes=%s-%s' % (start, end), 'Accept-Encoding': 'identity'}
+        if self.validator is not None:
+            # the server sends the whole file instead of a range if it has been changed
+            headers['If-Range'] = self.validator
+        return self.connection.get_request(self.path, headers=headers, retry=retry, stream=True)
+
+    def __probe(self):
+        """
+        Request the first byte to learn the size of the file and whether
+        the server supports ranges.
+
+        :return: response to stream the whole file from, if ranges are not supported
+        """
+        response = self.__get(0, 0)
+        if response.status_code == 206:
+            match = _CONTENT_RANGE.match(response.headers.get('Content-Range', ''))
+            response.close()
+            if match is None:
+                raise GenestackException('Fail to download %s: invalid Content-Range "%s"' % (
+                    self.path, response.headers.get('Content-Range')))
+            self.total_size = int(match.group(3))
+            self.validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+            if self.validator is not None and self.validator.startswith('W/'):
+                # weak validators cannot be used with ranges
+                self.validator = None
+            return None
+        if response.status_code == 416:
+            # empty file
+            response.close()
+            self.total_size = 0
+            return None
+        if response.status_code == 200:
+            self.total_size = int(response.headers.get('Content-Length', 0))
+            return response
+        response.close()
+        raise GenestackException('Fail to download %s: got response with status code: %s' % (
+            self.path, response.status_code))
+
+    def __load_state(self):
+        """
+        Restore completed parts of an interrupted download of the same file.
+        """
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if (state.get('path') == self.path and state.get('size') == self.total_size
+                and state.get('part_size') == self.part_size
+                and state.get('validator') == self.validator and self.validator is not None
+                and os.path.exists(self.partial_path)
+                and os.path.getsize(self.partial_path) == self.total_size):
+            self.completed_parts = set(state.get('completed', []))
+
+    def __save_state(self):
+        state = {
+            'path': self.path,
+            'size': self.total_size,
+            'part_size': self.part_size,
+            'validator': self.validator,
+            'completed': sorted(self.completed_parts),
+        }
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def __remove_state(self):
+        for path in (self.state_path, self.partial_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def __open(self):
+        flags = os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+        self.fd = os.open(self.partial_path, flags, 0o644)
+        if not self.completed_parts:
+            os.ftruncate(self.fd, 0)
+            # reserve space for the file, so that writes of parts do not fail halfway
+            if self.total_size and hasattr(os, 'posix_fallocate'):
+                try:
+                    os.posix_fallocate(self.fd, 0, self.total_size)
+                except OSError:
+                    pass
+            os.ftruncate(self.fd, self.total_size)
+
+    def __close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def __close_after(self, futures):
+        wait(futures)
+        self.__close()
+
+    @property
+    def parts(self):
+        """
+        All parts of the file.
+
+        :rtype: list[Part]
+        """
+        count = -(-self.total_size // self.part_size)
+        return [Part(number, number * self.part_size,
+                     min(self.part_size, self.total_size - number * self.part_size))
+                for number in range(count)]
+
+    def fetch_part(self, part):
+        """
+        Download a part in several attempts and write it to the file.
+        This method is run by workers, it does not change the state of the download.
+
+        :param part: part of the file
+        :type part: Part
+        :rtype: PartResult
+        """
+        try:
+            result = self.__fetch_part(part)
+        except Exception as e:
+            result = PartResult(part, error=str(e))
+        if result.error is not None:
+            self.__stopped.set()
+        return result
+
+    def __fetch_part(self, part):
+        retry_policy = self.retry_policy
+        received = 0
+        error = None
+        for attempt in range(1, retry_policy.max_attempts + 1):
+            if self.__stopped.is_set():
+                return PartResult(part, skipped=True)
+            response = None
+            try:
+                response = self.__get(part.start + received, part.end, retry=False)
+                if response.status_code == 206:
+                    for data in response.iter_content(READ_SIZE):
+                        data = data[:part.size - received]
+                        _pwrite(self.fd, data, part.start + received)
+                        received += len(data)
+                        if received == part.size:
+                            return PartResult(part)
+                    error = 'Connection closed after %s of %s bytes' % (received, part.size)
+                elif response.status_code == 200:
+                    return PartResult(part, error='File has been changed on the server',
+                                      permanent=True)
+                elif response.status_code in retry_policy.retry_statuses:
+                    error = 'Got response with status code: %s' % response.status_code
+                else:
+                    return PartResult(part, error='Got response with status code: %s' %
+                                      response.status_code)
+            except (RequestException, SysCallError) as e:
+                error = str(e)
+            finally:
+                if response is not None:
+                    response.close()
+            if self.connection.debug:
+                sys.stderr.write('%s/%s attempt to download %s failed. %s\n' %
+                                 (attempt, retry_policy.max_attempts, part, error))
+            self.__stopped.wait(retry_policy.get_delay(attempt, response))
+        return PartResult(part, error=error)
+
+    def __download_whole(self, response):
+        # the server does not support ranges: stream the file in one request
+        try:
+            with open(self.partial_path, 'wb') as f:
+                for data in response.iter_content(READ_SIZE):
+                    f.write(data)
+                    self.__update_progress(len(data))
+        finally:
+            response.close()
+
+    def __handle_result(self, result):
+        """
+        Record a downloaded part.
+
+        :return: the result if the part has failed
+        :rtype: PartResult
+        """
+        if result.skipped:
+            return None
+        if result.error is not None:
+            return result
+        self.completed_parts.add(result.part.number)
+        self.__save_state()
+        self.__update_progress(result.part.size)
+        return None
+
+    def __download_parts(self):
+        self.__load_state()
+        parts = [part for part in self.parts if part.number not in self.completed_parts]
+        if self.completed_parts:
+            completed_size = self.total_size - sum(part.size for part in parts)
+            sys.stderr.write('Resuming download of %s: %s of %s bytes remaining\n' % (
+                self.name, self.total_size - completed_size, self.total_size))
+            self.__update_progress(completed_size)
+        self.__open()
+        self.__save_state()
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(parts) or 1),
+                                      thread_name_prefix='odm-sdk-download')
+        futures = set()
+        error = None
+        try:
+            futures = {executor.submit(self.fetch_part, part) for part in parts}
+            while futures:
+                # wait with a timeout to handle KeyboardInterrupt promptly
+                done, futures = wait(futures, timeout=1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    error = self.__handle_result(future.result()) or error
+                if error is not None:
+                    break
+        except (KeyboardInterrupt, SystemExit):
+            self.__stopped.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            running = [future for future in futures if not future.done()]
+            threading.Thread(target=self.__close_after, args=(running,), daemon=True).start()
+            raise GenestackException('Fail to download %s: Interrupted by user' % self.path)
+        self.__stopped.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+        self.__close()
+        # parts completed while the download was stopping can be resumed
+        for future in futures:
+            if not future.cancelled():
+                error = self.__handle_result(future.result()) or error
+        if error is not None:
+            if error.permanent:
+                self.__remove_state()
+            raise GenestackException('Fail to download %s: %s: %s' % (
+                self.path, error.part, error.error))
+
+    def download(self):
+        """
+        Download the file.
+
+        :return: ``destination``
+        :rtype: str
+        :raises GenestackException: if the download has failed or the checksum does not match
+        """
+        response = self.__probe()
+        if response is not None:
+            self.__download_whole(response)
+        else:
+            self.__download_parts()
+
+        if self.checksum is not None:
+            actual = compute_file_checksum(self.partial_path, self.checksum_algorithm)
+            if actual != self.checksum.lower():
+                self.__remove_state()
+                raise GenestackException('Checksum mismatch for %s: expected %s, got %s' % (
+                    self.path, self.checksum, actual))
+        os.replace(self.partial_path, self.destination)
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        return self.destination
@@ -0,0 +1,151 @@
+import sqlite3
+import threading
+import time
+
+DEFAULT_MAX_AGE = 7 * 24 * 60 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS imports (
+    server_url TEXT NOT NULL,
+    study TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    link TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    accession TEXT NOT NULL,
+    existed INTEGER NOT NULL,
+    recorded REAL NOT NULL,
+    PRIMARY KEY (server_url, study, kind, link, metadata)
+);
+CREATE TABLE IF NOT EXISTS links (
+    server_url TEXT NOT NULL,
+    study TEXT NOT NULL,
+    what TEXT NOT NULL,
+    accession_from TEXT NOT NULL,
+    accession_to TEXT NOT NULL,
+    recorded REAL NOT NULL,
+    PRIMARY KEY (server_url, study, what, accession_from, accession_to)
+);
+"""
+
+
+class ImportCheckpoint(object):
+    """
+    Records files imported and links created by study imports in a SQLite database,
+    so that a rerun of an interrupted import skips the finished steps without requests
+    to the server and continues from the first incomplete one.
+
+    Records are kept per server and study (link to the study metadata file or
+    accession of an existing study). Records older than ``max_age`` are forgotten,
+    because imported data may be deleted from the server. The checkpoint can be shared
+    by threads and processes.
+    """
+
+    def __init__(self, path, max_age=DEFAULT_MAX_AGE):
+        """
+        :param path: path to the database file
+        :type path: str
+        :param max_age: time in seconds after which records are forgotten
+        :type max_age: float
+        """
+        self.path = path
+        self.max_age = max_age
+        self.__lock = threading.Lock()
+        self.__db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self.__lock, self.__db:
+            self.__db.executescript(_SCHEMA)
+            expired = time.time() - max_age
+            self.__db.execute('DELETE FROM imports WHERE recorded < ?', (expired,))
+            self.__db.execute('DELETE FROM links WHERE recorded < ?', (expired,))
+
+    def close(self):
+        with self.__lock:
+            self.__db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # pylint: disable-next=too-many-arguments
+    def get_import(self, server_url, study, kind, link, metadata=None):
+        """
+        Return accession of an imported file and whether it had been imported before
+        the import, or ``None`` if the file has not been imported.
+
+        :param kind: kind of the file, e.g. ``study``, ``samples`` or ``expression``
+        :type kind: str
+        :param link: link to the file
+        :type link: str
+        :param metadata: link to the metadata file of the signals
+        :type metadata: str
+        :rtype: (str, bool)
+        """
+        with self.__lock:
+            row = self.__db.execute(
+                'SELECT accession, existed FROM imports WHERE server_url = ? AND study = ? '
+                'AND kind = ? AND link = ? AND metadata = ?',
+                (server_url, study, kind, link, metadata or '')).fetchone()
+        if row is None:
+            return None
+        return row[0], bool(row[1])
+
+    # pylint: disable-next=too-many-arguments
+    def record_import(self, server_url, study, kind, link, accession, existed=False,
+                      metadata=None):
+        """
+        Record an imported file.
+
+        :param accession: accession of the study or the group
+        :type accession: str
+        :param existed: whether the file had been imported before the import
+        :type existed: bool
+        :rtype: None
+        """
+        with self.__lock, self.__db:
+            self.__db.execute(
+                'INSERT OR REPLACE INTO imports (server_url, study, kind, link, metadata, '
+                'accession, existed, recorded) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (server_url, study, kind, link, metadata or '', accession, int(existed),
+                 time.time()))
+
+    # pylint: disable-next=too-many-arguments
+    def has_link(self, server_url, study, what, accession_from, accession_to):
+        """
+        Return whether a link has been created.
+
+        :param what: kind of the link, e.g. ``samples_to_study``
+        :type what: str
+        :rtype: bool
+        """
+        with self.__lock:
+            row = self.__db.execute(
+                'SELECT 1 FROM links WHERE server_url = ? AND study = ? AND what = ? '
+                'AND accession_from = ? AND accession_to = ?',
+                (server_url, study, what, accession_from, accession_to)).fetchone()
+        return row is not None
+
+    # pylint: disable-next=too-many-arguments
+    def record_link(self, server_url, study, what, accession_from, accession_to):
+        """
+        Record a created link.
+
+        :rtype: None
+        """
+        with self.__lock, self.__db:
+            self.__db.execute(
+                'INSERT OR REPLACE INTO links (server_url, study, what, accession_from, '
+                'accession_to, recorded) VALUES (?, ?, ?, ?, ?, ?)',
+                (server_url, study, what, accession_from, accession_to, time.time()))
+
+    def forget(self, server_url, study):
+        """
+        Forget all records of a study, so that it is imported anew.
+
+        :rtype: None
+        """
+        with self.__lock, self.__db:
+            self.__db.execute('DELETE FROM imports WHERE server_url = ? AND study = ?',
+                              (server_url, study))
+            self.__db.execute('DELETE FROM links WHERE server_url = ? AND study = ?',
+                              (server_url, study))
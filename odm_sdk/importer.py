@@ -0,0 +1,1725 @@
+"""
+Import of studies with their samples, libraries, preparations, signals and mapping files
+to ODM via the ETL job API. ``odm-import-data`` is a command line interface
+of :py:class:`StudyImporter`.
+"""
+
+import collections
+import copy
+import csv
+import itertools
+import json
+import math
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from time import monotonic, sleep
+from urllib.parse import urlparse
+
+import requests
+
+from odm_sdk.exceptions import GenestackException
+from odm_sdk.retry import RetryPolicy
+
+ACC_RE = re.compile(r'([A-Z]+[0-9]+)$')
+
+# regexp to match accession in square brackets appended to links
+TRAILING_ACC_RE = r'\[([A-Z]+[0-9]+)\]$'
+TRAILING_ACC_RE = re.compile(TRAILING_ACC_RE)
+
+INTEGRATION_PREFIX = "integrationCurator/%s/integration/link/"
+
+# how long to wait for ETL jobs to be finished (in seconds)
+ETL_WAITING_TIMEOUT = 30 * 60
+# how often to poll for jobs: the interval starts at the minimum and grows
+# by the backoff factor while no job finishes, up to the maximum
+ETL_MIN_POLLING_INTERVAL = 0.5
+ETL_POLLING_BACKOFF = 1.5
+ETL_POLLING_INTERVAL = 5
+# how long the server may hold a long polling request for a job (in seconds),
+# and the name of the query parameter passing it
+ETL_LONG_POLL_WAIT = 10
+JOB_WAIT_PARAMETER = 'wait'
+# how many requests (job submissions, links, polls) to send at once
+DEFAULT_MAX_WORKERS = 8
+# how many studies to import at once in a bulk import
+DEFAULT_MAX_STUDIES = 4
+
+# how to retry requests failed due to network errors or server overload
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+# all supported file "sources" supported by ETL
+ETL_SOURCES = ('S3', 'HTTP', 'Arvados', 'LOCAL')
+
+# a mapping of URL scheme to its *default* ETL "source" (see above)
+# if no source is provided explicitly
+SCHEME_TO_ETL_SOURCE = {
+    'http': 'HTTP',
+    'https': 'HTTP',
+    's3': 'S3',
+    'file': 'LOCAL'
+}
+
+# guard against possible mistakes in ETL source constants
+assert set(SCHEME_TO_ETL_SOURCE.values()).issubset(ETL_SOURCES)
+
+LIB_PREP_TAGS = {'libraries', 'preparations'}
+SIGNAL_TAGS = {'flow-cytometry', 'variant', 'expression'}
+
+FILE_FOUND_ERR_MSG_RE = r'job instance already exists .+ jobExecId=([0-9]+)'
+FILE_FOUND_ERR_MSG_RE = re.compile(FILE_FOUND_ERR_MSG_RE)
+
+_RUNNING_STATUSES = (u'STARTED', u'STARTING', u'RUNNING')
+
+
+class StudyImportError(GenestackException):
+    """
+    Error which stops a study import.
+
+    :ivar message: error message
+    :ivar response: response of the server which caused the error, if any
+    """
+
+    def __init__(self, message, response=None):
+        super(StudyImportError, self).__init__(message)
+        self.message = message
+        self.response = response
+
+    def __str__(self):
+        return self.message
+
+
+class InvalidImportError(StudyImportError):
+    """
+    Arguments of an import are invalid or inconsistent, nothing has been imported.
+    """
+
+
+class StudyAccessError(StudyImportError):
+    """
+    Existing study does not exist or is not accessible.
+    """
+
+
+class MetadataFileError(StudyImportError):
+    """
+    Metadata file cannot be fetched or parsed.
+    """
+
+
+class JobError(StudyImportError):
+    """
+    ETL job cannot be submitted, has failed or has not been finished in time.
+
+    :ivar job_id: ID of the job, ``None`` if it has not been submitted
+    """
+
+    def __init__(self, message, job_id=None, response=None):
+        super(JobError, self).__init__(message, response)
+        self.job_id = job_id
+
+
+class DuplicateFileError(StudyImportError):
+    """
+    File has already been imported and existing files are not allowed.
+
+    :ivar accession: accession of the existing object
+    """
+
+    def __init__(self, message, accession):
+        super(DuplicateFileError, self).__init__(message)
+        self.accession = accession
+
+
+class GroupLinkingError(StudyImportError):
+    """
+    Exception raised for error during group linking. E.g linking signals to
+    samples or samples to study
+    """
+
+    # pylint: disable-next=too-many-arguments
+    def __init__(self, what, accession_to, accession_from, message=None, response=None):
+        if message is None:
+            message = "Linking {} ({} to {}) failed".format(what, accession_from, accession_to)
+        super(GroupLinkingError, self).__init__(message, response)
+        self.what = what
+        self.accession_to = accession_to
+        self.accession_from = accession_from
+
+
+class ImportReporter(object):
+    """
+    Receives messages about the progress of an import, this class ignores them.
+    Methods may be called from worker threads of the import.
+    """
+
+    def info(self, message):
+        """
+        Report an imported file or a created link.
+        """
+
+    def warning(self, message):
+        """
+        Report a problem which does not stop the import, e.g. an already imported file.
+        """
+
+    def error(self, error):
+        """
+        Report an error which does not stop the import (linking errors are ignored).
+
+        :type error: StudyImportError
+        """
+
+    def waiting(self, message):
+        """
+        Report that the import is waiting for jobs; the message replaces the previous one,
+        ``None`` means that the waiting is over.
+        """
+
+
+class ImportedGroup(object):
+    """
+    Study or group imported (or found on the server) by an import.
+
+    :ivar kind: ``study``, ``samples``, ``libraries``, ``preparations``, ``expression``,
+                ``variant`` or ``flow-cytometry``
+    :ivar link: link to the imported file
+    :ivar accession: accession of the study or the group
+    :ivar existed: whether the file had already been imported
+    """
+
+    def __init__(self, kind, link, accession, existed):
+        self.kind = kind
+        self.link = link
+        self.accession = accession
+        self.existed = existed
+
+    def __repr__(self):
+        return 'ImportedGroup(%r, %r, %r, existed=%r)' % (
+            self.kind, self.link, self.accession, self.existed)
+
+
+class ImportResult(object):
+    """
+    Result of a study import.
+
+    :ivar study: accession of the study
+    :ivar groups: list of :py:class:`ImportedGroup` in the order of import,
+                  including the ones restored from the checkpoint
+    :ivar links: list of ``(what, accession_from, accession_to)`` tuples of created links,
+                 including the ones restored from the checkpoint
+    :ivar failures: list of :py:class:`StudyImportError` which have not stopped the import,
+                    the steps depending on them have been skipped
+    """
+
+    def __init__(self):
+        self.study = None
+        self.groups = []
+        self.links = []
+        self.failures = []
+
+    @property
+    def ok(self):
+        return not self.failures
+
+
+def is_acc(string):
+    return bool(ACC_RE.match(string))
+
+
+def parse_file_signal(link):
+    """ Parse URLs like http://examp.le/file.txt[GSF123456] """
+    version = TRAILING_ACC_RE.search(link)
+    if version is not None:
+        link = link[:version.start()]
+        version = version.groups()[0]
+    return link, version
+
+
+def partition(pred, iterable):
+    "Use a predicate to partition entries into false entries and true entries"
+    # partition(is_odd, range(10)) --> 0 2 4 6 8   and  1 3 5 7 9
+    t1, t2 = itertools.tee(iterable)
+    return itertools.filterfalse(pred, t1), filter(pred, t2)
+
+
+def get_all_tags(sample_nodes):
+    result = set()
+
+    def get_tags(node):
+        result.add(node['tag'])
+        for child_node in node.get('children', []):
+            get_tags(child_node)
+
+    for node in sample_nodes:
+        get_tags(node)
+    return result
+
+
+def has_libraries_or_preparations(sample_nodes):
+    return not get_all_tags(sample_nodes).isdisjoint(LIB_PREP_TAGS)
+
+
+def has_consistent_data_model(sample_nodes):
+    if not has_libraries_or_preparations(sample_nodes):
+        return True
+    # in case libraries or preparations have been passed, all signals
+    # should be linked to them instead of samples
+    for sample_node in sample_nodes:
+        for child_node in sample_node.get('children', []):
+            if child_node['tag'] not in LIB_PREP_TAGS:
+                return False
+    return True
+
+
+def has_non_expression_signals(sample_nodes):
+    return not get_all_tags(sample_nodes).issubset({'samples', 'libraries', 'preparations',
+                                                    'expression', 'mapping-file'})
+
+
+def check_mapping_files_arguments(signal_args):
+    # check if there are no mappings and we can skip the checks
+    if not any(s.startswith("mapping-file") for s in signal_args):
+        return
+    if "expression" not in signal_args:
+        raise InvalidImportError("mapping file is supported with expression matrices only")
+    mpf_prefix = 'mapping-'
+    mapping_args = collections.Counter(s[len(mpf_prefix):]
+                                       for s in signal_args
+                                       if s.startswith(mpf_prefix))
+    total_mpfiles = mapping_args['file'] + mapping_args['file-accession']
+    if total_mpfiles == 0:
+        # we checked that there's *something* starting with `mpf_prefix`,
+        # and that leaves only metadata
+        raise InvalidImportError("the parameter '-mpf' for mapping file loading is missing")
+    if total_mpfiles > 1:
+        raise InvalidImportError("Only one mapping file is expected, "
+                                 "check the value of parameters 'mpf' or 'mpfa'")
+    if mapping_args["file-metadata"] and mapping_args["file-accession"]:
+        raise InvalidImportError("Cannot attach mapping metainfo to an existing mapping file")
+    if mapping_args["file-metadata"] > 1:
+        raise InvalidImportError("Cannot attach multiple metadata sources to a mapping file")
+
+
+def check_and_merge_mapping_file_nodes(signal_nodes):
+    non_mf_nodes_f, mf_nodes_f = partition(
+        lambda node: node['tag'].startswith('mapping-file'),
+        signal_nodes)
+    mf_nodes = list(mf_nodes_f)
+    if len(mf_nodes) == 0:
+        return signal_nodes
+
+    signal_args = []
+    for node in signal_nodes:
+        signal_args.append(node['tag'])
+        signal_args.append(node['value'])
+    check_mapping_files_arguments(signal_args)
+
+    new_mf_node = {'tag': 'mapping-file'}
+    for mf_node in mf_nodes:
+        if mf_node['tag'] == 'mapping-file-metadata':
+            new_mf_node['metadata'] = mf_node['value']
+        else:
+            new_mf_node['value'] = mf_node['value']
+    return list(non_mf_nodes_f) + [new_mf_node]
+
+
+def check_and_merge_mapping_file_in_sample_nodes(sample_nodes):
+    for sample_node in sample_nodes:
+        children = sample_node.get('children', [])
+        children_tags = {child['tag'] for child in children}
+        if children_tags.issubset(LIB_PREP_TAGS):
+            for lib_prep_node in children:
+                if 'children' not in lib_prep_node:
+                    continue
+                signal_nodes = lib_prep_node.get('children')
+                lib_prep_node['children'] = check_and_merge_mapping_file_nodes(signal_nodes)
+        else:
+            if 'children' in sample_node:
+                sample_node['children'] = check_and_merge_mapping_file_nodes(children)
+
+
+def check_for_repeated_links(link, nodes, links_cache):
+    links_cache[link] = 'study'
+    for node in nodes:
+        value = node['value']
+        tag = node['tag']
+        value = None if value == 'implicit' else value
+        if value is not None:
+            if value in links_cache:
+                raise InvalidImportError('Duplicate link or accession: --{} {}'.format(tag, value))
+            links_cache[value] = tag
+        meta = node.get('metainfo', None)
+        if meta is not None:
+            if meta in links_cache:
+                raise InvalidImportError('Duplicate link or accession: --{} {}'.format(tag, meta))
+            links_cache[meta] = tag
+        children = node.get('children', [])
+        check_for_repeated_links(link, children, links_cache)
+
+
+def collect_all_nodes_by_tag(nodes, filter_tag_fun):
+    result = []
+    for node in nodes:
+        if filter_tag_fun(node['tag']):
+            result.append(node)
+        children = node.get('children', [])
+        result = result + collect_all_nodes_by_tag(children, filter_tag_fun)
+    return result
+
+
+def collect_all_mapping_file_nodes(nodes):
+    return collect_all_nodes_by_tag(
+        nodes,
+        lambda x: x.startswith('mapping-file')
+    )
+
+
+def add_all_signal_args_to_all_lib_preps(sample_nodes):
+    all_libs_preps = collect_all_nodes_by_tag(
+        sample_nodes,
+        lambda x: x in LIB_PREP_TAGS
+    )
+    all_signal_nodes = collect_all_nodes_by_tag(
+        sample_nodes,
+        lambda x: x in SIGNAL_TAGS
+    )
+    mapping_file_nodes = collect_all_mapping_file_nodes(sample_nodes)
+    for libs_preps_node in all_libs_preps:
+        libs_preps_node['children'] = copy.deepcopy(all_signal_nodes)
+    for sample_node in sample_nodes:
+        sample_node['children'] = copy.deepcopy(all_libs_preps)
+    if mapping_file_nodes:
+        sample_node = sample_nodes[0]
+        libs_preps_node = sample_node['children'][0]
+        libs_preps_node['children'] = all_signal_nodes + mapping_file_nodes
+
+
+def add_all_signal_args_to_all_samples(sample_nodes):
+    all_signal_nodes = collect_all_nodes_by_tag(
+        sample_nodes,
+        lambda x: x in SIGNAL_TAGS
+    )
+    for sample_node in sample_nodes:
+        children = sample_node.get('children', [])
+        non_signal_children = [node for node in children if node['tag'] not in SIGNAL_TAGS]
+        sample_node['children'] = all_signal_nodes + non_signal_children
+
+
+def check_signal_versions(study_acc, parent_accession, parent_tag, signals):
+    """ Perform basic validation of signal versioning arguments
+    Updating version is allowed when:
+    - study already exists
+    - samples already exist
+    - designated previous version of signal object appears only once in a
+      script call
+    """
+    prev_versions = set()
+    for signal_node in signals:
+        value = signal_node['value']
+        _, prev_version = parse_file_signal(value)
+        if prev_version is None:
+            continue
+        if study_acc is None:
+            raise InvalidImportError(
+                "Previous versions cannot be specified when creating new studies, "
+                "only for signal group objects of existing studies")
+        if parent_accession is None:
+            raise InvalidImportError(
+                "Previous versions cannot be specified when creating new {0}, "
+                "only for signal group objects of existing {0}".format(parent_tag))
+        if prev_version in prev_versions:
+            raise InvalidImportError(
+                "It is not possible to import a new version of an existing "
+                "signal group object version ('{}') more than once "
+                "in the same script call".format(prev_version))
+        prev_versions.add(prev_version)
+
+
+def check_signal_versions_libs_preps(sample_nodes, study_acc):
+    for sample_node in sample_nodes:
+        libs_preps = sample_node.get('children', [])
+        for libs_preps_node in libs_preps:
+            value = libs_preps_node['value']
+            parent_accession = value if is_acc(value) else None
+            parent_tag = libs_preps_node['tag']
+            signals = [node for node in libs_preps_node.get('children', [])
+                       if node['tag'] in SIGNAL_TAGS]
+            check_signal_versions(study_acc, parent_accession, parent_tag, signals)
+
+
+def check_signal_versions_samples(sample_nodes, study_acc):
+    for sample_node in sample_nodes:
+        value = sample_node['value']
+        parent_accession = value if is_acc(value) else None
+        parent_tag = sample_node['tag']
+        signals = [node for node in sample_node.get('children', []) if node['tag'] in SIGNAL_TAGS]
+        check_signal_versions(study_acc, parent_accession, parent_tag, signals)
+
+
+def _unpack_job_response(r):
+    # TODO: go through other unguarded `json.loads` calls and wrap them too
+    try:
+        return json.loads(r.text)
+    except json.decoder.JSONDecodeError:
+        raise StudyImportError("Unexpected response received from server "
+                               "(cannot decode body as JSON)", response=r)
+
+
+class JobWaiter(object):
+    '''
+    Fetches the state of ETL jobs for :py:class:`JobTracker` by polling: the info request
+    returns at once, and the tracker repeats it with growing intervals.
+
+    The output of a finished job is requested separately, unless the info response
+    already contains it (``result``), so a job is checked in one round trip where
+    the server allows it.
+    '''
+
+    #: whether :py:meth:`fetch` waits on the server until the job is finished
+    long_poll = False
+
+    def __init__(self, client, app_version):
+        '''
+        :param client: client of the server
+        :type client: odm_sdk.rest_client.RestClient
+        :param app_version: version of the job API
+        :type app_version: str
+        '''
+        self.client = client
+        self.app_version = app_version
+
+    def job_url(self, job_id):
+        return "job/{}/{}".format(self.app_version, job_id)
+
+    def fetch(self, job_id, wait=None):
+        '''
+        Return status of the job and its output, the output is ``None`` while the job
+        is running.
+
+        :param wait: time the server may hold the request until the job is finished,
+                     in seconds; used by waiters with :py:attr:`long_poll` only
+        :type wait: float
+        :rtype: (str, dict)
+        :raises JobError: if the job has failed
+        '''
+        info = self._get_info(job_id, wait)
+        status = info.get(u'status')
+        if status in _RUNNING_STATUSES:
+            return status, None
+        if status == u'COMPLETED' and u'result' in info:
+            return status, info
+        output_r = self.client.get(self.job_url(job_id) + "/output")
+        output = _unpack_job_response(output_r)
+        if status != u'COMPLETED':
+            raise JobError("Job {} failed with status {}".format(job_id, status),
+                           job_id=job_id, response=output_r)
+        return status, output
+
+    def _get_info(self, job_id, wait):
+        response = self.client.get(self.job_url(job_id) + "/info")
+        return _unpack_job_response(response)
+
+
+class LongPollJobWaiter(JobWaiter):
+    '''
+    Asks the server to hold the info request until the job is finished, for up to
+    ``wait`` seconds (``wait`` query parameter), so that the tracker learns about
+    finished jobs at once and sends a request per job per ``ETL_LONG_POLL_WAIT``
+    seconds at most.
+
+    If the server rejects the parameter or responds about a running job early,
+    it does not support long polling, and the waiter falls back to polling.
+    '''
+
+    long_poll = True
+
+    def _get_info(self, job_id, wait):
+        if not self.long_poll or not wait:
+            return super(LongPollJobWaiter, self)._get_info(job_id, wait)
+        started = monotonic()
+        response = self.client.get(self.job_url(job_id) + "/info",
+                                   params={JOB_WAIT_PARAMETER: int(math.ceil(wait))})
+        # pylint: disable=no-member
+        if response.status_code == requests.codes.BAD_REQUEST:
+            self.long_poll = False
+            return super(LongPollJobWaiter, self)._get_info(job_id, wait)
+        info = _unpack_job_response(response)
+        if info.get(u'status') in _RUNNING_STATUSES and monotonic() - started < wait / 2:
+            self.long_poll = False
+        return info
+
+
+class JobTracker(object):
+    '''
+    Tracks all submitted ETL jobs at once.
+
+    If the waiter supports long polling, up to ``max_long_polls`` jobs have an outstanding
+    request held by the server until the job is finished; the requests are sent from
+    a separate pool of threads, and their futures are in :py:attr:`futures`. The other
+    jobs are polled together in rounds by :py:meth:`poll`: the interval between rounds
+    starts at ``ETL_MIN_POLLING_INTERVAL`` and grows while no job finishes, up to
+    ``ETL_POLLING_INTERVAL``; a job takes a free long polling slot on the next call.
+
+    Callbacks of finished jobs are called by :py:meth:`poll` in the calling thread,
+    in the order of their keys: a job finished before the running jobs with lower keys
+    waits for them.
+    '''
+
+    # pylint: disable-next=too-many-arguments
+    def __init__(self, client, app_version, job_timeout=ETL_WAITING_TIMEOUT, executor=None,
+                 reporter=None, waiter=None, max_long_polls=DEFAULT_MAX_WORKERS):
+        '''
+        :param client: client of the server
+        :type client: odm_sdk.rest_client.RestClient
+        :param app_version: version of the job API
+        :type app_version: str
+        :param job_timeout: time to wait for a job to finish, in seconds
+        :type job_timeout: float
+        :param executor: executor to send requests of a round in parallel,
+                         requests are sent one by one by default
+        :type executor: concurrent.futures.Executor
+        :param reporter: receiver of the waiting messages
+        :type reporter: ImportReporter
+        :param waiter: fetcher of job states, :py:class:`JobWaiter` polling the jobs
+                       by default
+        :type waiter: JobWaiter
+        :param max_long_polls: maximum number of long polling requests sent at once
+        :type max_long_polls: int
+        '''
+        self.client = client
+        self.app_version = app_version
+        self.job_timeout = job_timeout
+        self.executor = executor
+        self.reporter = reporter or ImportReporter()
+        self.waiter = waiter or JobWaiter(client, app_version)
+        self.max_long_polls = max_long_polls
+        # job ID -> (deadline, callback, key), until the callback is called
+        self.jobs = {}
+        # outstanding long polling requests: future -> job ID
+        self.futures = {}
+        self.next_poll = monotonic()
+        # outputs of finished jobs waiting for the jobs with lower keys
+        self.__outputs = {}
+        self.__keys = itertools.count()
+        self.__next_round = self.next_poll
+        self.__interval = ETL_MIN_POLLING_INTERVAL
+        self.__waiting_reported = False
+        self.__long_poll_executor = None
+
+    def track(self, job_id, callback, key=None):
+        '''
+        Call ``callback`` with the output of the job when it is finished.
+
+        :param key: order of callbacks, the order of tracking by default
+        '''
+        if key is None:
+            key = next(self.__keys)
+        now = monotonic()
+        self.jobs[job_id] = (now + self.job_timeout, callback, key)
+        # a new job gets a long polling request at once, or is polled soon
+        due = now if self.waiter.long_poll else now + ETL_MIN_POLLING_INTERVAL
+        self.next_poll = min(self.next_poll, due)
+        if not self.waiter.long_poll:
+            self.__next_round = min(self.__next_round, due)
+
+    def run(self):
+        ''' Wait until all jobs, including the ones tracked by callbacks, are finished '''
+        while self.jobs:
+            delay = max(0, self.next_poll - monotonic())
+            if self.futures:
+                wait(self.futures, delay, return_when=FIRST_COMPLETED)
+            elif delay > 0:
+                sleep(delay)
+            self.poll()
+
+    def close(self):
+        '''
+        Stop waiting for jobs: cancel the queued long polling requests and wait for
+        the sent ones, which the server holds for ``ETL_LONG_POLL_WAIT`` seconds at most.
+        '''
+        if self.__long_poll_executor is not None:
+            self.__long_poll_executor.shutdown(cancel_futures=True)
+            self.__long_poll_executor = None
+            self.futures.clear()
+
+    def poll(self):
+        '''
+        Send long polling requests for the jobs which get free slots, poll the other
+        jobs if their round is due, and call callbacks of the finished ones.
+
+        :raises JobError: if a job has failed or has not been finished in time
+        '''
+        self.__collect_long_polls()
+        now = monotonic()
+        outstanding = set(self.futures.values())
+        job_ids = sorted((job_id for job_id in self.jobs
+                          if job_id not in outstanding and job_id not in self.__outputs),
+                         key=lambda job_id: self.jobs[job_id][2])
+        if self.waiter.long_poll:
+            slots = max(0, self.max_long_polls - len(self.futures))
+            self.__send_long_polls(job_ids[:slots])
+            job_ids = job_ids[slots:]
+        polled = bool(job_ids) and now >= self.__next_round
+        if polled:
+            states = self.__map(self.waiter.fetch, job_ids)
+            self.__outputs.update((job_id, output) for job_id, (_, output)
+                                  in zip(job_ids, states) if output is not None)
+        if self.__call_finished():
+            self.__clear_waiting()
+            # callbacks usually start dependent jobs, poll them soon
+            self.__interval = ETL_MIN_POLLING_INTERVAL
+            self.__next_round = now + self.__interval
+        elif polled:
+            self.__next_round = now + self.__interval
+            self.__interval = min(self.__interval * ETL_POLLING_BACKOFF, ETL_POLLING_INTERVAL)
+        running = [(deadline, job_id) for job_id, (deadline, _, _) in self.jobs.items()
+                   if job_id not in self.__outputs]
+        # finished long polls wake the caller, poll the others only to check deadlines
+        polling = len(running) > len(self.futures)
+        self.next_poll = self.__next_round if polling else now + ETL_POLLING_INTERVAL
+        if not running:
+            return
+        deadline, job_id = min(running)
+        if deadline <= now:
+            self.__clear_waiting()
+            raise JobError("Job {} has been running for {} seconds with no result, exiting"
+                           "".format(job_id, self.job_timeout), job_id=job_id)
+        self.next_poll = min(self.next_poll, deadline)
+        # report "progress" after two minutes of waiting
+        if self.job_timeout - (deadline - now) > 120:
+            self.__waiting_reported = True
+            self.__report_waiting(job_id, deadline - now)
+
+    def __collect_long_polls(self):
+        for future in [future for future in self.futures if future.done()]:
+            job_id = self.futures.pop(future)
+            _, output = future.result()
+            if output is not None:
+                self.__outputs[job_id] = output
+
+    def __call_finished(self):
+        running = [key for job_id, (_, _, key) in self.jobs.items()
+                   if job_id not in self.__outputs]
+        first_running = min(running, default=None)
+        finished = sorted((self.jobs[job_id][2], job_id) for job_id in self.__outputs
+                          if first_running is None or self.jobs[job_id][2] < first_running)
+        for _, job_id in finished:
+            output = self.__outputs.pop(job_id)
+            _, callback, _ = self.jobs.pop(job_id)
+            callback(output)
+        return bool(finished)
+
+    def __send_long_polls(self, job_ids):
+        if not job_ids:
+            return
+        if self.__long_poll_executor is None:
+            self.__long_poll_executor = ThreadPoolExecutor(max_workers=self.max_long_polls)
+        for job_id in job_ids:
+            deadline = self.jobs[job_id][0]
+            wait_time = min(ETL_LONG_POLL_WAIT, max(1, deadline - monotonic()))
+            future = self.__long_poll_executor.submit(self.waiter.fetch, job_id, wait_time)
+            self.futures[future] = job_id
+
+    def __map(self, func, *iterables):
+        if self.executor is None:
+            return list(map(func, *iterables))
+        return list(self.executor.map(func, *iterables))
+
+    def __clear_waiting(self):
+        if self.__waiting_reported:
+            self.reporter.waiting(None)
+            self.__waiting_reported = False
+
+    def __report_waiting(self, job_id, time_left):
+        minutes = int(time_left) // 60 + 1
+        if len(self.jobs) == 1:
+            message = "Waiting for job #{} to complete, {} minutes before timeout".format(
+                job_id, minutes)
+        else:
+            message = ("Waiting for {} jobs to complete, {} minutes before timeout of job #{}"
+                       "".format(len(self.jobs), minutes, job_id))
+        self.reporter.waiting(message)
+
+
+class StepFailed(Exception):
+    '''
+    Raised by a step of the import graph which failed without stopping the import
+    (e.g. linking errors are ignored), the steps depending on it are skipped.
+    '''
+
+
+class ImportStep(object):
+    '''
+    Node of the import graph.
+
+    ``run`` is called with the results of the dependencies when all of them are done,
+    and returns the result of the step. Steps importing files (``finish`` is set) return
+    ID of the submitted ETL job and ``file_exists`` flag, and ``finish`` is called
+    with the output of the finished job and the flag to get the result of the step.
+    '''
+
+    PENDING, RUNNING, DONE, FAILED = range(4)
+
+    # pylint: disable-next=too-many-arguments
+    def __init__(self, index, name, run, dependencies=(), finish=None):
+        self.index = index
+        self.name = name
+        self.run = run
+        self.dependencies = list(dependencies)
+        self.finish = finish
+        self.state = ImportStep.PENDING
+        self.result = None
+
+    def __repr__(self):
+        return 'ImportStep(%r)' % self.name
+
+
+class ImportGraph(object):
+    '''
+    Import and link steps of a study with dependencies between them
+    (study -> samples -> libraries/preparations -> signals -> mapping files).
+
+    :py:meth:`run` executes a step as soon as its dependencies are done: requests
+    of independent steps are sent in parallel, and ETL jobs of all steps are polled
+    together. Results of import jobs are handled in the calling thread in the order
+    of steps, but other steps run in worker threads, so their messages may be reordered.
+    '''
+
+    def __init__(self):
+        self.steps = []
+
+    def add(self, name, run, dependencies=(), finish=None):
+        ''' Add step, see :py:class:`ImportStep` '''
+        step = ImportStep(len(self.steps), name, run, dependencies, finish)
+        self.steps.append(step)
+        return step
+
+    def add_result(self, name, result):
+        ''' Add step which is already done, e.g. an existing group '''
+        step = self.add(name, None)
+        step.state = ImportStep.DONE
+        step.result = result
+        return step
+
+    def run(self, executor, tracker):
+        '''
+        Run all steps.
+
+        :param executor: executor to run steps
+        :type executor: concurrent.futures.Executor
+        :param tracker: tracker of the jobs submitted by the steps
+        :type tracker: JobTracker
+        '''
+        running = {}
+        pending = [step for step in self.steps if step.state == ImportStep.PENDING]
+        while True:
+            pending = self.__start_ready_steps(pending, executor, running)
+            if not running and not tracker.jobs:
+                break
+            # imports are submitted as soon as the imports they depend on are done;
+            # polling waits for the submissions, so that the jobs submitted together
+            # are polled together
+            submitting = any(step.finish is not None for step in running.values())
+            if submitting or not tracker.jobs:
+                timeout = None
+                futures = list(running)
+            else:
+                timeout = max(0, tracker.next_poll - monotonic())
+                # finished long polls of the tracker wake the loop too
+                futures = list(running) + list(tracker.futures)
+            if futures:
+                done, _ = wait(futures, timeout, return_when=FIRST_COMPLETED)
+            else:
+                sleep(timeout)
+                done = ()
+            steps_done = [future for future in done if future in running]
+            for future in sorted(steps_done, key=lambda f: running[f].index):
+                self.__complete(running.pop(future), future, tracker)
+            if any(step.finish is not None for step in running.values()):
+                continue
+            if tracker.jobs and (len(steps_done) < len(done) or not done
+                                 or monotonic() >= tracker.next_poll):
+                tracker.poll()
+
+    @staticmethod
+    def __start_ready_steps(pending, executor, running):
+        waiting = []
+        # dependencies are added before the steps depending on them,
+        # so failures are propagated in one pass
+        for step in pending:
+            states = [dependency.state for dependency in step.dependencies]
+            if ImportStep.FAILED in states:
+                step.state = ImportStep.FAILED
+            elif all(state == ImportStep.DONE for state in states):
+                step.state = ImportStep.RUNNING
+                arguments = [dependency.result for dependency in step.dependencies]
+                running[executor.submit(step.run, *arguments)] = step
+            else:
+                waiting.append(step)
+        return waiting
+
+    @staticmethod
+    def __complete(step, future, tracker):
+        try:
+            result = future.result()
+        except StepFailed:
+            step.state = ImportStep.FAILED
+            return
+        if step.finish is None:
+            step.result = result
+            step.state = ImportStep.DONE
+            return
+        job_id, file_exists = result
+
+        def on_finished(output):
+            step.result = step.finish(output, file_exists)
+            step.state = ImportStep.DONE
+
+        tracker.track(job_id, on_finished, key=step.index)
+
+
+class StudyImporter(object):
+    """
+    Imports a study with its samples, libraries, preparations, signals and mapping files,
+    and links them together.
+
+    The importer does not print or exit: it returns an :py:class:`ImportResult`, raises
+    :py:class:`StudyImportError` and reports progress to an :py:class:`ImportReporter`.
+    Importers sharing one :py:class:`~odm_sdk.rest_client.RestClient` can run
+    in parallel threads.
+
+    Samples and the data linked to them are described by a list of nodes, the same
+    as ``odm-import-data`` builds from its arguments::
+
+        [{'tag': 'samples', 'value': 's3://bucket/samples.tsv', 'children': [
+            {'tag': 'expression', 'value': 's3://bucket/expression.gct',
+             'metadata': 's3://bucket/expression-metadata.tsv'},
+            {'tag': 'mapping-file', 'value': 's3://bucket/mapping.gtf'},
+        ]}]
+
+    The value of a ``samples``, ``libraries`` or ``preparations`` node is a link
+    to a metadata file or an accession of an existing group; libraries and preparations
+    are children of samples, and signals are children of libraries and preparations
+    if they are present. Signal nodes (``expression``, ``variant``, ``flow-cytometry``)
+    may have ``metadata``, ``nfa`` (number of feature attributes), ``dc`` (data class)
+    and ``ms`` (measurement separator) keys; a signal link may end with the accession
+    of its previous version in square brackets. A ``mapping-file``
+    (or ``mapping-file-accession``) node, optionally with a ``mapping-file-metadata``
+    node, follows expression signals.
+    """
+
+    # pylint: disable-next=too-many-arguments
+    def __init__(self, client, study_link=None, study_accession=None, sample_nodes=None,
+                 app_version='default-released', etl_source=None, template_accession=None,
+                 allow_duplicates=False, fail_if_file_exists=False,
+                 link_signals_to_all_samples=False, ignore_linking_errors=False,
+                 job_timeout=ETL_WAITING_TIMEOUT, max_workers=DEFAULT_MAX_WORKERS,
+                 reporter=None, checkpoint=None, long_poll_jobs=True):
+        """
+        :param client: client of the server
+        :type client: odm_sdk.rest_client.RestClient
+        :param study_link: link to a study metadata file, to create a new study
+        :type study_link: str
+        :param study_accession: accession of an existing study
+        :type study_accession: str
+        :param sample_nodes: samples and the data linked to them, see above
+        :type sample_nodes: list[dict]
+        :param app_version: version of the REST API
+        :type app_version: str
+        :param etl_source: protocol for the server to fetch data (one of ``ETL_SOURCES``),
+                           determined by the links by default
+        :type etl_source: str
+        :param template_accession: accession of the template of a new study, or a function
+                                   returning it; the default template by default
+        :type template_accession: str|callable
+        :param allow_duplicates: import files which have already been imported
+        :type allow_duplicates: bool
+        :param fail_if_file_exists: raise :py:class:`DuplicateFileError` if a file
+                                    has already been imported, instead of using the existing one
+        :type fail_if_file_exists: bool
+        :param link_signals_to_all_samples: link all signals to all samples
+                                            (or libraries and preparations)
+        :type link_signals_to_all_samples: bool
+        :param ignore_linking_errors: continue the import if linking fails,
+                                      the errors are listed in :py:attr:`ImportResult.failures`
+        :type ignore_linking_errors: bool
+        :param job_timeout: time to wait for an import job, in seconds
+        :type job_timeout: float
+        :param max_workers: maximum number of steps run at once, and of jobs waited for
+                            with long polling requests; the connection pool of the client
+                            should fit both (see :py:func:`get_pool_size`)
+        :type max_workers: int
+        :param reporter: receiver of progress messages, they are ignored by default
+        :type reporter: ImportReporter
+        :param checkpoint: checkpoint to record finished steps in and to skip the steps
+                           finished by a previous run
+        :type checkpoint: odm_sdk.import_checkpoint.ImportCheckpoint
+        :param long_poll_jobs: wait for jobs with long polling requests if the server
+                               supports them, see :py:class:`LongPollJobWaiter`
+        :type long_poll_jobs: bool
+        """
+        self.client = client
+        self.study_link = study_link
+        self.study_accession = study_accession
+        self.sample_nodes = sample_nodes or []
+        self.app_version = app_version
+        self.etl_source = etl_source
+        self.template_accession = template_accession
+        self.allow_duplicates = allow_duplicates
+        self.fail_if_file_exists = fail_if_file_exists
+        self.link_signals_to_all_samples = link_signals_to_all_samples
+        self.ignore_linking_errors = ignore_linking_errors
+        self.job_timeout = job_timeout
+        self.max_workers = max_workers
+        self.reporter = reporter or ImportReporter()
+        self.checkpoint = checkpoint
+        self.long_poll_jobs = long_poll_jobs
+
+    def prepare(self):
+        """
+        Validate the arguments and return the sample nodes to import:
+        signals are copied to all samples if ``link_signals_to_all_samples`` is set,
+        and mapping file nodes are merged.
+
+        :rtype: list[dict]
+        :raises InvalidImportError: if the arguments are invalid
+        """
+        server = self.client.server
+        if not (server.startswith("https://") or server.startswith("http://")):
+            raise InvalidImportError("The server url should start with 'http' or 'https'")
+        if not (self.study_link or self.study_accession):
+            raise InvalidImportError("No study link or accession was provided")
+        if self.study_link and self.study_accession:
+            raise InvalidImportError("You need to provide either study link or accession")
+
+        sample_nodes = copy.deepcopy(self.sample_nodes)
+        check_for_repeated_links(self.study_link, sample_nodes, links_cache={})
+
+        # If the option LINK_SIGNALS_TO_ALL_SAMPLES is set, we try to modify
+        # the arguments in such a way as to conform to the behaviour, which is described in
+        # ODM-7826.
+        # The subsequent code actually works with repeated links for signal data
+        if self.link_signals_to_all_samples:
+            if has_libraries_or_preparations(sample_nodes):
+                add_all_signal_args_to_all_lib_preps(sample_nodes)
+            else:
+                add_all_signal_args_to_all_samples(sample_nodes)
+
+        check_and_merge_mapping_file_in_sample_nodes(sample_nodes)
+
+        mapping_files_number = len(collect_all_mapping_file_nodes(sample_nodes))
+        if self.link_signals_to_all_samples and mapping_files_number > 1:
+            raise InvalidImportError('Only one mapping file is expected with link-all-to-all '
+                                     'option')
+
+        if (has_libraries_or_preparations(sample_nodes)
+                and has_non_expression_signals(sample_nodes)):
+            raise InvalidImportError('the linkage between libraries/preparations and '
+                                     'variants/flow-cytometry is not supported')
+
+        if not has_consistent_data_model(sample_nodes):
+            raise InvalidImportError('inconsistent data model')
+
+        if has_libraries_or_preparations(sample_nodes):
+            check_signal_versions_libs_preps(sample_nodes, self.study_accession)
+        else:
+            check_signal_versions_samples(sample_nodes, self.study_accession)
+        return sample_nodes
+
+    def run(self):
+        """
+        Import the study.
+
+        :rtype: ImportResult
+        :raises StudyImportError: if the import is stopped by an error
+        """
+        sample_nodes = self.prepare()
+        result = ImportResult()
+        graph = ImportGraph()
+        study = self.__add_study(graph, result)
+        if has_libraries_or_preparations(sample_nodes):
+            self.__handle_lib_prep_case(sample_nodes, graph, study, result)
+        else:
+            self.__handle_samples_signals_case(sample_nodes, graph, study, result)
+        waiter_class = LongPollJobWaiter if self.long_poll_jobs else JobWaiter
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        tracker = JobTracker(self.client, self.app_version, self.job_timeout, executor,
+                             self.reporter, waiter_class(self.client, self.app_version),
+                             max_long_polls=self.max_workers)
+        try:
+            graph.run(executor, tracker)
+        finally:
+            tracker.close()
+            executor.shutdown(cancel_futures=True)
+        result.study = study.result
+        return result
+
+    def check_access_to_study(self, accession):
+        """
+        :raises StudyAccessError: if the study does not exist or is not accessible
+        """
+        response = self.client.get(
+            'studyUser/{0}/studies/{1}'.format(self.app_version, accession))
+        if response.status_code != 200:
+            raise StudyAccessError("You don't have access permissions to study: "
+                                   "%s or it doesn't exist!" % accession, response=response)
+
+    def fetch_and_parse_csv(self, csv_link):
+        """ Fetch remote one-row CSV file and parse it to a dictionary """
+        # must not be empty or None
+        assert csv_link
+        try:
+            response = self.client.retry_policy.call(lambda: requests.get(csv_link), 'GET')
+        except requests.exceptions.RequestException as error:
+            raise MetadataFileError("Error accessing metadata file '{link}':\n"
+                                    "{err_name}: {err_args}"
+                                    "".format(link=csv_link, err_name=error.__class__.__name__,
+                                              err_args=error.args))
+        if not response.ok:
+            raise MetadataFileError("Error accessing metadata file '{}'".format(csv_link),
+                                    response=response)
+        csv_data = _read_utf_csv(response.iter_lines())
+        try:
+            metadata = next(csv_data)
+        # pylint: disable=broad-except
+        except Exception as err:
+            raise MetadataFileError("Error parsing '{}' as CSV file:\n"
+                                    "{}: {}".format(csv_link, err, err.args))
+        try:
+            next(csv_data)
+            self.reporter.warning("Metadata file '{}' contains multiple rows, "
+                                  "using only the first one".format(csv_link))
+        except StopIteration:
+            pass
+        return metadata
+
+    def add_mappings(self, data_link, metadata_link=None):
+        """ Upload gene-tx mapping file with optional metadata
+            for import xref-mappings we are using syncronous endpoint
+            https://genestack.atlassian.net/browse/ODM-7489
+        """
+        metadata = self.fetch_and_parse_csv(metadata_link) if metadata_link else None
+        url = 'reference-data/{}/xrefsets/'.format(self.app_version)
+        source = _get_etl_source_from_url(data_link).lower()
+        payload = {
+            "dataLink": data_link,
+            "dataSource": source,
+            "xrefSetType": "gene-transcript"
+        }
+
+        if metadata is not None:
+            payload["metadata"] = metadata
+
+        resp = self.client.post(url, json=payload)
+        if resp.status_code != 200:
+            raise StudyImportError("Importing '{}' failed!".format(data_link), response=resp)
+        accession = json.loads(resp.text)['xrefSetId']
+        if accession is None:
+            raise StudyImportError("Unexpected response from the server while importing '{}'."
+                                   .format(data_link), response=resp)
+        self.reporter.info("Mapping file {} was added successfully".format(accession))
+        return accession
+
+    def link_mappings(self, mapping_file_acc, expression_acc):
+        """ Link gene-tx mapping to expression data """
+        url = 'integrationCurator/{}/links'.format(self.app_version)
+        payload = [{'firstId': expression_acc,
+                    'firstType': 'expressionGroup',
+                    'secondId': mapping_file_acc,
+                    'secondType': 'geneTranscriptMapping'}]
+        resp = self.client.post(url, json=payload)
+        if not resp.ok:
+            raise StudyImportError("Linking gene-transcription mapping '{}' to expression "
+                                   "group '{}' failed".format(mapping_file_acc, expression_acc),
+                                   response=resp)
+        self.reporter.info("Successfully linked: [mapping_file_to_expression]")
+
+    def check_mapping_file(self, acc):
+        """
+        Check if provided accession corresponds to an existing mapping file
+
+        Returns the same accession if it's fine, otherwise raises an error
+        """
+        if acc is None:
+            return None
+        url = 'reference-data/{}/xrefsets/{}/metadata'.format(self.app_version, acc)
+        resp = self.client.get(url)
+        if resp.ok:
+            return acc
+        raise StudyImportError("mapping file with the accession '{}' is not found".format(acc))
+
+    def link_by_parent(self, what, accession_to, accession_from):
+        ''' Link data using new group-centric API '''
+        ENDPOINT_DICT = {
+            'samples_to_study': 'sample/group/{sourceId}/to/study/{targetId}',
+            'libraries_to_samples': 'library/group/{sourceId}/to/sample/group/{targetId}',
+            'preparations_to_samples': 'preparation/group/{sourceId}/to/sample/group/{targetId}',
+            'expression_to_sample': 'expression/group/{sourceId}/to/sample/group/{targetId}',
+            'expression_to_libraries': 'expression/group/{sourceId}/to/library/group/{targetId}',
+            'expression_to_preparations':
+                'expression/group/{sourceId}/to/preparation/group/{targetId}',
+            'variant_to_sample': 'variant/group/{sourceId}/to/sample/group/{targetId}',
+            # API not yet implemented
+            # 'variant_to_libraries': 'variant/group/{sourceId}/to/library/group/{targetId}',
+            # 'variant_to_preparations':
+            #     'variant/group/{sourceId}/to/preparation/group/{targetId}',
+            'flow-cytometry_to_sample':
+                'flow-cytometry/group/{sourceId}/to/sample/group/{targetId}',
+            # API not yet implemented
+            # 'flow-cytometry_to_libraries':
+            #     'flow_cytometry/group/{sourceId}/to/library/group/{targetId}',
+            # 'flow-cytometry_to_preparations':
+            #     'flow_cytometry/group/{sourceId}/to/preparation/group/{targetId}',
+        }
+        url = INTEGRATION_PREFIX % self.app_version + ENDPOINT_DICT[what]
+        response = self.client.post(url.format(sourceId=accession_from,
+                                               targetId=accession_to))
+        if response.ok:
+            self.reporter.info("Successfully linked: [{}]".format(what))
+            return (what, accession_from, accession_to)
+
+        raise GroupLinkingError(what=what.replace('_', ' '),
+                                accession_to=accession_to,
+                                accession_from=accession_from,
+                                response=response)
+
+    def get_libs_preps_by_study(self, file_type, study):
+        link_word = {'libraries': 'library', 'preparations': 'preparation'}[file_type]
+        url = ('integrationCurator/{}/integration/link/{}/group/by/study/{}'
+               ''.format(self.app_version, link_word, study))
+        response = self.client.get(url)
+        if response.ok:
+            return json.loads(response.text)
+        raise StudyAccessError("You don't have access permissions to study: {} or it "
+                               "doesn't exist!".format(study), response=response)
+
+    def check_study_has_libs_preps(self, group_acc, samples_group, file_type, study):
+        libs_preps = self.get_libs_preps_by_study(file_type, study)
+        # example of libs_preps: [{"itemId":"GSF020175","metadata":{}}]
+        accessions = {item['itemId'] for item in libs_preps}
+        if group_acc not in accessions:
+            raise GroupLinkingError(what=file_type,
+                                    accession_to=samples_group,
+                                    accession_from=group_acc)
+
+    def __handle_linking_error(self, error, result):
+        ''' Raise the error or record it if linking errors are ignored '''
+        if not self.ignore_linking_errors:
+            raise error
+        self.reporter.error(error)
+        result.failures.append(error)
+
+    def __check_job_error(self, response):
+        ''' Checks if import job error is actually a message about duplicate '''
+        # if a file had already been submitted, REST API returns 409 Conflict
+        # pylint: disable=no-member
+        if response.status_code != requests.codes.CONFLICT:
+            return None
+        r_data = _unpack_job_response(response)
+        job_id_match = FILE_FOUND_ERR_MSG_RE.search(r_data['error']['message'])
+        if job_id_match is None:
+            return None
+        job_id = int(job_id_match.groups()[0])
+        return job_id
+
+    def __get_mdata_params(self, metadata_link, inline_metadata):
+        ''' Return dictionary of metadata parameters
+
+        If ``inline_metadata`` is True, parse provided CSV link and return its content
+        as a "subdictionary".
+        Otherwise, pass metadata link to ETL as-is
+        '''
+        if not inline_metadata:
+            return {"metadataLink": metadata_link}
+        metadata = self.fetch_and_parse_csv(metadata_link)
+        return {"data": metadata}
+
+    # pylint: disable-next=too-many-arguments
+    def __prepare_etl_payload(self, kind, metadata_link, template_id=None, data_link=None,
+                              prev_version=None, number_of_feature_attributes=None,
+                              data_class=None, measurement_separator=None):
+        ''' Prepare payload to be sent to ETL as parameters '''
+        payload = {}
+        if template_id is not None:
+            payload["templateId"] = template_id
+        inline_metadata = False
+        if metadata_link is not None:
+            inline_metadata = (kind == 'transcript-mapping')
+            md_params = self.__get_mdata_params(metadata_link, inline_metadata)
+            payload.update(md_params)
+        if data_link is not None:
+            payload["dataLink"] = data_link
+        if prev_version is not None:
+            payload["previousVersion"] = prev_version
+        if number_of_feature_attributes is not None:
+            payload["numberOfFeatureAttributes"] = number_of_feature_attributes
+        if data_class is not None:
+            payload["dataClass"] = data_class
+        if measurement_separator is not None:
+            payload["measurementSeparator"] = measurement_separator.lstrip()
+        source = self.etl_source
+        if source is None:
+            # determine list of links eligible for source guesswork
+            source_links = [data_link]
+            if not inline_metadata:
+                source_links.append(metadata_link)
+            source = _select_source(filter(lambda l: l is not None, source_links))
+        payload["source"] = source
+        return payload
+
+    # pylint: disable-next=too-many-arguments
+    def submit_import(self, kind, metadata_link=None, data_link=None,
+                      prev_version=None, number_of_feature_attributes=None,
+                      data_class=None, measurement_separator=None):
+        ''' Submit import job using Job/ETL API
+
+        Returns ID of the job, and a ``file_exists`` boolean: ``True`` if file has
+        been found in ODM (the ID of the job which imported it is returned), and
+        ``False`` if it is being uploaded anew.
+        '''
+        if metadata_link is None and kind in ('study', 'samples'):
+            raise InvalidImportError("No metadata link is provided for {} import"
+                                     "".format(kind))
+        if data_link is None and kind in ('expression', 'variant', 'flow-cytometry',
+                                          'transcript-mapping'):
+            raise InvalidImportError("No data link is provided for {} import"
+                                     "".format(kind))
+        url = "job/{}/import/{}/".format(self.app_version, kind.replace('_', '-'))
+        if self.allow_duplicates:
+            url += '?allow_dups=true'
+        template_id = self.template_accession
+        if callable(template_id):
+            template_id = template_id()
+        payload = self.__prepare_etl_payload(kind, metadata_link, template_id, data_link,
+                                             prev_version, number_of_feature_attributes,
+                                             data_class, measurement_separator)
+
+        resp = self.client.post(url, json=payload)
+        if resp.status_code == 200:
+            r_data = _unpack_job_response(resp)
+            job_id = int(r_data.get('jobExecId'))
+            file_exists = False
+        else:
+            job_id = self.__check_job_error(resp)
+            if job_id is None:
+                raise JobError("Submitting job failed!", response=resp)
+            file_exists = True
+        return job_id, file_exists
+
+    def __report_existing(self, message, accession):
+        if self.fail_if_file_exists:
+            raise DuplicateFileError(message, accession)
+        self.reporter.warning(message)
+
+    def __restore_import(self, kind, link, metadata=None):
+        ''' Return accession and ``existed`` flag of a file imported by a previous run '''
+        if self.checkpoint is None:
+            return None
+        return self.checkpoint.get_import(self.client.server,
+                                          self.study_link or self.study_accession,
+                                          kind, link, metadata)
+
+    # pylint: disable-next=too-many-arguments
+    def __record_import(self, kind, link, accession, existed, metadata=None):
+        if self.checkpoint is not None and accession is not None:
+            self.checkpoint.record_import(self.client.server,
+                                          self.study_link or self.study_accession,
+                                          kind, link, accession, existed, metadata)
+
+    def __is_linked(self, what, accession_from, accession_to):
+        ''' Return whether the groups have been linked by a previous run '''
+        if self.checkpoint is None:
+            return False
+        return self.checkpoint.has_link(self.client.server,
+                                        self.study_link or self.study_accession,
+                                        what, accession_from, accession_to)
+
+    def __record_link(self, what, accession_from, accession_to):
+        if self.checkpoint is not None:
+            self.checkpoint.record_link(self.client.server,
+                                        self.study_link or self.study_accession,
+                                        what, accession_from, accession_to)
+
+    # pylint: disable-next=too-many-arguments
+    def __add_import(self, graph, kind, link, submit, finish, result, metadata=None,
+                     dependencies=()):
+        '''
+        Add step importing a file, the accession of the file is restored from the checkpoint
+        if the file has been imported by a previous run.
+
+        The file is imported when the imports in ``dependencies`` are done, so that
+        nothing is imported into a study which has failed.
+        '''
+        name = '{} {}'.format(kind, link)
+        restored = self.__restore_import(kind, link, metadata)
+        if restored is not None:
+            accession, existed = restored
+            self.reporter.info("'{}' has been imported as '{}' by a previous run, skipping"
+                               "".format(link, accession))
+            result.groups.append(ImportedGroup(kind, link, accession, existed))
+            return graph.add_result(name, accession)
+
+        def finish_and_record(job_info, exists):
+            accession = finish(job_info, exists)
+            self.__record_import(kind, link, accession, exists, metadata)
+            return accession
+
+        return graph.add(name, lambda *_: submit(), dependencies, finish=finish_and_record)
+
+    def __link(self, what, accession_to, accession_from):
+        ''' Link groups unless they have been linked by a previous run '''
+        if self.__is_linked(what, accession_from, accession_to):
+            return (what, accession_from, accession_to)
+        link = self.link_by_parent(what, accession_to, accession_from)
+        self.__record_link(*link)
+        return link
+
+    def __add_study(self, graph, result):
+        ''' Create new study or return existing one '''
+        if self.study_accession:
+            if self.__restore_import('study', self.study_accession) is None:
+                self.check_access_to_study(self.study_accession)
+                self.__record_import('study', self.study_accession, self.study_accession, True)
+            return graph.add_result('study', self.study_accession)
+
+        def finish(job_info, study_exists):
+            accession = job_info.get(u'result', {}).get(u'accession')
+            if accession is None:
+                raise StudyImportError("Mandatory file: study metadata wasn't loaded. "
+                                       "Uploading is stopped!")
+            if study_exists:
+                # this error message is parsed by load.py script: do not change it
+                self.__report_existing("'{}' has already been uploaded as study '{}'"
+                                       "".format(self.study_link, accession), accession)
+            else:
+                self.reporter.info("study " + accession + " was added successfully")
+            result.groups.append(ImportedGroup('study', self.study_link, accession,
+                                               study_exists))
+            return accession
+
+        return self.__add_import(graph, 'study', self.study_link,
+                                 lambda: self.submit_import('study',
+                                                            metadata_link=self.study_link),
+                                 finish, result)
+
+    def __add_and_link_samples(self, graph, study, sample_link, result):
+        '''
+        Add steps importing samples after the study and linking them to the study.
+
+        :return: import and link steps
+        '''
+        def finish(job_info, samples_exist):
+            group_acc = job_info.get(u'result', {}).get(u'groupAccession')
+            if group_acc is None:
+                raise StudyImportError(
+                    "Mandatory file: samples metadata wasn't loaded. "
+                    "Without samples metadata file, linking of signals to samples are "
+                    "impossible. Uploading of signals files are stopped!")
+            if samples_exist:
+                self.__report_existing("'{}' has already been uploaded as sample group '{}'"
+                                       "".format(sample_link, group_acc), group_acc)
+            else:
+                self.reporter.info("samples were added successfully (sample group accession "
+                                   "is {})".format(group_acc))
+            result.groups.append(ImportedGroup('samples', sample_link, group_acc,
+                                               samples_exist))
+            return group_acc
+
+        def link_to_study(group_acc, study_acc):
+            try:
+                result.links.append(self.__link(what="samples_to_study",
+                                                accession_from=group_acc,
+                                                accession_to=study_acc))
+            except GroupLinkingError as ex:
+                self.__handle_linking_error(ex, result)
+                raise StepFailed()
+            return group_acc
+
+        samples = self.__add_import(graph, 'samples', sample_link,
+                                    lambda: self.submit_import('samples',
+                                                               metadata_link=sample_link),
+                                    finish, result, dependencies=[study])
+        return samples, graph.add('link samples ' + sample_link, link_to_study,
+                                  [samples, study])
+
+    # pylint: disable-next=too-many-arguments
+    def __add_and_link_libs_preps(self, graph, samples, samples_group, metadata_link, file_type,
+                                  study, result):
+        def finish(job_info, exists):
+            group_acc = job_info.get(u'result', {}).get(u'groupAccession')
+            if exists:
+                self.__report_existing("'{}' has already been uploaded as {} group '{}'"
+                                       "".format(metadata_link, file_type, group_acc),
+                                       group_acc)
+            else:
+                self.reporter.info("{ft} were added successfully ({ft} group accession is "
+                                   "{acc})".format(ft=file_type, acc=group_acc))
+            result.groups.append(ImportedGroup(file_type, metadata_link, group_acc, exists))
+            return group_acc
+
+        def link_to_samples(group_acc, samples_acc, study_acc):
+            what = "{}_to_samples".format(file_type)
+            if self.__is_linked(what, group_acc, samples_acc):
+                result.links.append((what, group_acc, samples_acc))
+                return group_acc
+            result.links.append(self.link_by_parent(what=what,
+                                                    accession_from=group_acc,
+                                                    accession_to=samples_acc))
+            try:
+                # TODO remove this check when https://genestack.atlassian.net/browse/ODM-7793 will be fixed
+                self.check_study_has_libs_preps(group_acc, samples_acc, file_type, study_acc)
+            except GroupLinkingError as ex:
+                self.__handle_linking_error(ex, result)
+                return group_acc
+            self.reporter.info("Successfully linked: [{}]".format(what))
+            self.__record_link(what, group_acc, samples_acc)
+            return group_acc
+
+        libs_preps = self.__add_import(graph, file_type, metadata_link,
+                                       lambda: self.submit_import(file_type,
+                                                                  metadata_link=metadata_link),
+                                       finish, result, dependencies=[samples])
+        return graph.add('link {} {}'.format(file_type, metadata_link), link_to_samples,
+                         [libs_preps, samples_group, study])
+
+    def __add_signals(self, graph, samples, node, result):
+        file_type = node['tag']
+        file_signal = node['value']
+        file_metadata = node.get('metadata', None)
+
+        def finish(job_info, signals_exist):
+            group_acc = job_info.get(u'result', {}).get(u'groupAccession')
+            if signals_exist:
+                signal_str = "'{}'".format(file_signal)
+                if file_metadata is not None:
+                    signal_str = "'{} + '{}'".format(signal_str, file_metadata)
+                self.__report_existing("{} {} have already been uploaded as signal group '{}'"
+                                       "".format(file_type, signal_str, group_acc), group_acc)
+            else:
+                self.reporter.info("{} data were added successfully (group accession is {})"
+                                   "".format(file_type.replace('-', ' '), group_acc))
+            result.groups.append(ImportedGroup(file_type, file_signal, group_acc,
+                                               signals_exist))
+            return group_acc
+
+        data_link, prev_version = parse_file_signal(file_signal)
+        return self.__add_import(graph, file_type, file_signal,
+                                 lambda: self.submit_import(
+                                     file_type, metadata_link=file_metadata,
+                                     data_link=data_link,
+                                     prev_version=prev_version,
+                                     number_of_feature_attributes=node.get('nfa'),
+                                     data_class=node.get('dc'),
+                                     measurement_separator=node.get('ms')),
+                                 finish, result, metadata=file_metadata, dependencies=[samples])
+
+    # pylint: disable-next=too-many-arguments
+    def __add_signals_to_parent(self, graph, samples, parent_prep_group, parent_prep_file_type,
+                                signal_nodes, signal_cache, result):
+        expression_groups = []
+        for node in signal_nodes:
+            file_type = node['tag']
+            url = node['value']
+            if file_type in SIGNAL_TAGS:
+                signal_group = signal_cache.get(url, None)
+                if signal_group is None:
+                    signal_group = self.__add_signals(graph, samples, node, result)
+                    signal_cache[url] = signal_group
+                if file_type == 'expression':
+                    expression_groups.append(signal_group)
+                what = '{}_to_{}'.format(file_type, parent_prep_file_type)
+                graph.add('link ' + what + ' ' + url,
+                          lambda parent_acc, signal_acc, what=what:
+                          self.__link_signals(what, parent_acc, signal_acc, result),
+                          [parent_prep_group, signal_group])
+            elif file_type == 'mapping-file':
+                # mapping file is always the last node, if present
+                graph.add('mapping-file ' + url,
+                          lambda parent_acc, *expression_accs, url=url,
+                          metadata=node.get('metadata', None):
+                          self.__add_and_link_mappings(url, metadata, expression_accs),
+                          [parent_prep_group] + expression_groups)
+
+    def __link_signals(self, what, parent_acc, signal_acc, result):
+        try:
+            result.links.append(self.__link(what, parent_acc, signal_acc))
+        except GroupLinkingError as ex:
+            self.__handle_linking_error(ex, result)
+            raise StepFailed()
+
+    def __add_and_link_mappings(self, url, metadata, expression_accs):
+        restored = self.__restore_import('mapping-file', url, metadata)
+        if restored is not None:
+            map_f_acc, _ = restored
+        elif is_acc(url):
+            map_f_acc = self.check_mapping_file(url)
+            self.__record_import('mapping-file', url, map_f_acc, True, metadata)
+        else:
+            map_f_acc = self.add_mappings(url, metadata)
+            self.__record_import('mapping-file', url, map_f_acc, False, metadata)
+        for expr_acc in expression_accs:
+            if not self.__is_linked('mapping_file_to_expression', map_f_acc, expr_acc):
+                self.link_mappings(map_f_acc, expr_acc)
+                self.__record_link('mapping_file_to_expression', map_f_acc, expr_acc)
+        return map_f_acc
+
+    # pylint: disable-next=too-many-arguments
+    def __add_lib_prep(self, graph, samples, sample_group, nodes, link_cache, study, result):
+        for node in nodes:
+            lib_prep_file_type = node['tag']
+            url = node['value']
+            lib_prep_group = link_cache.get(url, None)
+            if lib_prep_group is None:
+                lib_prep_group = self.__add_and_link_libs_preps(
+                    graph, samples, sample_group, url, lib_prep_file_type, study, result
+                )
+                link_cache[url] = lib_prep_group
+            children = node.get('children', [])
+            self.__add_signals_to_parent(
+                graph, samples, lib_prep_group, lib_prep_file_type, children, link_cache, result
+            )
+
+    def __handle_lib_prep_case(self, sample_nodes, graph, study, result):
+        link_cache = {}
+        for sample_node in sample_nodes:
+            value = sample_node['value']
+            libraries_and_preparations = sample_node.get('children', [])
+            if value == 'implicit':
+                assert len(libraries_and_preparations) == 1, \
+                    'Internal error: expect only one subnode for implicit sample node'
+                sub_node = libraries_and_preparations[0]
+                lib_prep_group = graph.add_result(sub_node['tag'], sub_node['value'])
+                self.__add_signals_to_parent(
+                    graph, study, lib_prep_group, sub_node['tag'],
+                    sub_node.get('children', []), link_cache, result
+                )
+                return
+
+            if is_acc(value):
+                # existing samples group, expect some libraries and preparations
+                if len(libraries_and_preparations) == 0:
+                    self.reporter.info('samples argument {} is ignored'.format(value))
+                    return
+                samples = sample_group = graph.add_result('samples', value)
+            else:
+                samples, sample_group = self.__add_and_link_samples(graph, study, value, result)
+
+            self.__add_lib_prep(
+                graph, samples, sample_group, libraries_and_preparations, link_cache, study,
+                result
+            )
+
+    def __handle_samples_signals_case(self, sample_nodes, graph, study, result):
+        signal_cache = {}
+        for sample_node in sample_nodes:
+            value = sample_node['value']
+            signals = sample_node.get('children', [])
+
+            if is_acc(value):
+                # existing samples group, expect some signals
+                if not signals:
+                    self.reporter.warning('No signals provided to link, ignoring `--samples {}`'
+                                          ''.format(value))
+                    return
+                samples = sample_group = graph.add_result('samples', value)
+            else:
+                samples, sample_group = self.__add_and_link_samples(graph, study, value, result)
+
+            self.__add_signals_to_parent(
+                graph, samples, sample_group, 'sample', signals, signal_cache, result
+            )
+
+
+class StudyOutcome(object):
+    """
+    Outcome of a study import in :py:func:`import_studies`.
+
+    :ivar name: name of the study in the bulk import
+    :ivar result: :py:class:`ImportResult`, ``None`` if the import has been stopped
+    :ivar error: error which stopped the import
+    """
+
+    def __init__(self, name, result=None, error=None):
+        self.name = name
+        self.result = result
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None and self.result.ok
+
+
+def get_pool_size(max_workers=DEFAULT_MAX_WORKERS, max_studies=1):
+    """
+    Return the number of connections used by studies imported at once: every study sends
+    requests from ``max_workers`` step workers and as many long polling requests.
+
+    :param max_workers: ``max_workers`` of the importers
+    :type max_workers: int
+    :param max_studies: number of studies imported at once
+    :type max_studies: int
+    :rtype: int
+    """
+    return 2 * max_workers * max_studies
+
+
+def import_studies(importers, max_studies=DEFAULT_MAX_STUDIES, on_finished=None):
+    """
+    Import many studies, up to ``max_studies`` at once. An error of one study does not
+    stop the others. Importers should share a :py:class:`~odm_sdk.rest_client.RestClient`,
+    so that studies reuse connections; its connection pool should be as large as
+    :py:func:`get_pool_size` returns.
+
+    :param importers: list of ``(name, importer)`` pairs
+    :type importers: list[(str, StudyImporter)]
+    :param max_studies: maximum number of studies imported at once
+    :type max_studies: int
+    :param on_finished: function called with :py:class:`StudyOutcome` of every study
+                        when it is finished, in the calling thread
+    :return: outcomes of the studies in the order of importers
+    :rtype: list[StudyOutcome]
+    """
+    def run(name, importer):
+        try:
+            return StudyOutcome(name, result=importer.run())
+        except (GenestackException, requests.exceptions.RequestException) as e:
+            return StudyOutcome(name, error=e)
+
+    outcomes = {}
+    executor = ThreadPoolExecutor(max_workers=max_studies)
+    try:
+        futures = {executor.submit(run, name, importer): index
+                   for index, (name, importer) in enumerate(importers)}
+        for future in as_completed(futures):
+            outcome = future.result()
+            outcomes[futures[future]] = outcome
+            if on_finished is not None:
+                on_finished(outcome)
+    finally:
+        executor.shutdown(cancel_futures=True)
+    return [outcomes[index] for index in range(len(importers))]
+
+
+def _read_utf_csv(csv_data):
+    ''' Yield stripped and decoded CSV rows as dictionaries '''
+    csv_data = (line.decode('utf-8') for line in csv_data)
+    for row in csv.DictReader(csv_data):
+        yield {k.strip(): v.strip() for k, v in row.items()}
+
+
+def _get_etl_source_from_url(url):
+    parsed_url = urlparse(url)
+    source = SCHEME_TO_ETL_SOURCE.get(parsed_url.scheme)
+    if source is None:
+        raise InvalidImportError("Scheme '{}' is not supported, exiting"
+                                 "".format(parsed_url.scheme))
+    return source
+
+
+def _select_source(links):
+    sources = set(_get_etl_source_from_url(link) for link in links)
+    if len(sources) != 1:
+        raise InvalidImportError("Mixing URL schemes is not supported; "
+                                 "provide source explicitly")
+    assert sources != set([None])
+    return sources.pop()
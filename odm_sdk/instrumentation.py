@@ -0,0 +1,307 @@
+import threading
+import urllib.parse
+
+INVOKE_PATH_PREFIX = '/application/invoke/'
+
+# upper bounds of latency histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class RequestInfo(object):
+    """
+    Describes a request to Genestack server for instrumentation hooks.
+    Attributes describing the response are set before
+    :py:meth:`RequestHook.after_request` is called.
+
+    :ivar path: URL path of the request
+    :ivar application_id: ID of the invoked application, ``None`` for other requests
+    :ivar method: name of the invoked application method, or the path for other requests
+    :ivar start_time: time when the request was started, by :py:func:`time.perf_counter`
+    :ivar elapsed: client-side latency in seconds, including retries and parsing
+    :ivar server_elapsed: processing time reported by the server in seconds, if any
+    :ivar bytes_sent: size of the request body as sent (i.e. after compression)
+    :ivar bytes_received: size of the response body as received (i.e. before decompression)
+    :ivar retries: number of retried attempts
+    :ivar status_code: HTTP status of the response
+    :ivar trace: execution trace returned by the server, if requested
+    :ivar error: exception raised by the request, ``None`` if it has succeeded
+    :ivar server_error: error message returned by the invoked application, if any
+    :ivar context: dictionary where hooks can keep their own data between the calls
+    """
+
+    def __init__(self, path, start_time):
+        self.path = path
+        self.application_id, self.method = _split_invoke_path(path)
+        self.start_time = start_time
+        self.elapsed = None
+        self.server_elapsed = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.retries = 0
+        self.status_code = None
+        self.trace = None
+        self.error = None
+        self.server_error = None
+        self.context = {}
+
+    def __repr__(self):
+        return 'RequestInfo(%r)' % self.path
+
+
+def _split_invoke_path(path):
+    if not path.startswith(INVOKE_PATH_PREFIX):
+        return None, path
+    parts = path[len(INVOKE_PATH_PREFIX):].split('/')
+    if len(parts) != 3:
+        return None, path
+    vendor, application, method = parts
+    return '%s/%s' % (vendor, application), urllib.parse.unquote(method)
+
+
+class RequestHook(object):
+    """
+    Base class of instrumentation hooks, see :py:meth:`~odm_sdk.Connection.add_hook`.
+    Hooks are called in the thread performing the request, so they should be thread-safe
+    if the connection is shared between threads. Exceptions raised by hooks are propagated
+    to the caller.
+    """
+
+    def before_request(self, info):
+        """
+        Called before the request is sent.
+
+        :param info: request description
+        :type info: RequestInfo
+        """
+
+    def after_request(self, info):
+        """
+        Called when the request is finished, whether successfully or not.
+        For streaming requests, it is called when the iteration over the response is over.
+
+        :param info: request description
+        :type info: RequestInfo
+        """
+
+
+class Histogram(object):
+    """
+    Histogram of observed values with fixed buckets.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def cumulative_counts(self):
+        """
+        Return pairs of bucket upper bound and number of values not greater than it.
+        """
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class CallStats(object):
+    """
+    Statistics of calls of one application method.
+
+    :ivar latency: histogram of client-side latency
+    :ivar server_latency: histogram of latency reported by the server
+    """
+
+    def __init__(self, application_id, method, buckets=DEFAULT_BUCKETS):
+        self.application_id = application_id
+        self.method = method
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency = Histogram(buckets)
+        self.server_latency = Histogram(buckets)
+
+    def __repr__(self):
+        return 'CallStats(%r, %r, count=%s, mean=%.3f)' % (
+            self.application_id, self.method, self.count, self.latency.mean)
+
+
+class MetricsCollector(RequestHook):
+    """
+    Hook collecting statistics per application method::
+
+        metrics = MetricsCollector()
+        connection.add_hook(metrics)
+        ...
+        for stats in metrics.slowest(10):
+            print(stats.application_id, stats.method, stats.latency.sum)
+        print(metrics.to_prometheus())
+
+    The gap between client-side and server-reported latency shows time spent
+    on the network and in serialization.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        :param buckets: upper bounds of latency histogram buckets, in seconds
+        :type buckets: tuple[float]
+        """
+        self.buckets = buckets
+        self.__stats = {}
+        self.__lock = threading.Lock()
+
+    def after_request(self, info):
+        key = (info.application_id, info.method)
+        with self.__lock:
+            stats = self.__stats.get(key)
+            if stats is None:
+                stats = self.__stats[key] = CallStats(info.application_id, info.method,
+                                                      self.buckets)
+            stats.count += 1
+            if info.error is not None or info.server_error is not None:
+                stats.errors += 1
+            stats.retries += info.retries
+            stats.bytes_sent += info.bytes_sent
+            stats.bytes_received += info.bytes_received
+            stats.latency.observe(info.elapsed)
+            if info.server_elapsed is not None:
+                stats.server_latency.observe(info.server_elapsed)
+
+    def get_stats(self):
+        """
+        Return statistics of all called methods.
+
+        :rtype: list[CallStats]
+        """
+        with self.__lock:
+            return list(self.__stats.values())
+
+    def slowest(self, limit=10):
+        """
+        Return methods with the largest total client-side latency.
+
+        :param limit: maximum number of methods to return
+        :type limit: int
+        :rtype: list[CallStats]
+        """
+        return sorted(self.get_stats(), key=lambda s: s.latency.sum, reverse=True)[:limit]
+
+    def reset(self):
+        """
+        Drop collected statistics.
+        """
+        with self.__lock:
+            self.__stats = {}
+
+    def to_prometheus(self, prefix='odm_sdk'):
+        """
+        Export statistics in Prometheus text exposition format.
+
+        :param prefix: prefix of metric names
+        :type prefix: str
+        :rtype: str
+        """
+        with self.__lock:
+            stats_list = sorted(self.__stats.values(),
+                                key=lambda s: (s.application_id or '', s.method))
+            lines = []
+            for name, kind, description, getter in (
+                    ('requests_total', 'counter', 'Number of requests', lambda s: s.count),
+                    ('request_errors_total', 'counter', 'Number of failed requests',
+                     lambda s: s.errors),
+                    ('request_retries_total', 'counter', 'Number of retried attempts',
+                     lambda s: s.retries),
+                    ('request_sent_bytes_total', 'counter', 'Bytes sent in request bodies',
+                     lambda s: s.bytes_sent),
+                    ('request_received_bytes_total', 'counter',
+                     'Bytes received in response bodies', lambda s: s.bytes_received)):
+                metric = '%s_%s' % (prefix, name)
+                lines.append('# HELP %s %s' % (metric, description))
+                lines.append('# TYPE %s %s' % (metric, kind))
+                for stats in stats_list:
+                    lines.append('%s{%s} %s' % (metric, _labels(stats), getter(stats)))
+            for name, description, getter in (
+                    ('request_duration_seconds', 'Client-side latency of requests',
+                     lambda s: s.latency),
+                    ('server_duration_seconds', 'Processing time reported by the server',
+                     lambda s: s.server_latency)):
+                metric = '%s_%s' % (prefix, name)
+                lines.append('# HELP %s %s' % (metric, description))
+                lines.append('# TYPE %s histogram' % metric)
+                for stats in stats_list:
+                    histogram = getter(stats)
+                    labels = _labels(stats)
+                    for bound, count in histogram.cumulative_counts():
+                        lines.append('%s_bucket{%s,le="%s"} %s' % (metric, labels, bound, count))
+                    lines.append('%s_bucket{%s,le="+Inf"} %s' % (metric, labels, histogram.count))
+                    lines.append('%s_sum{%s} %s' % (metric, labels, histogram.sum))
+                    lines.append('%s_count{%s} %s' % (metric, labels, histogram.count))
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(stats):
+    return 'application="%s",method="%s"' % (_escape_label(stats.application_id or ''),
+                                             _escape_label(stats.method))
+
+
+class OpenTelemetryHook(RequestHook):
+    """
+    Hook reporting every request as an `OpenTelemetry <https://opentelemetry.io/>`_ span.
+    Requires ``opentelemetry-api`` package.
+    """
+
+    def __init__(self, tracer=None):
+        """
+        :param tracer: tracer to create spans, by default the tracer of this module
+                       from the global tracer provider
+        :type tracer: opentelemetry.trace.Tracer
+        """
+        from opentelemetry import trace
+        self.__trace = trace
+        self.tracer = tracer or trace.get_tracer(__name__)
+
+    def before_request(self, info):
+        name = '%s/%s' % (info.application_id, info.method) if info.application_id else info.path
+        info.context['span'] = self.tracer.start_span(
+            name, kind=self.__trace.SpanKind.CLIENT, attributes={'odm.path': info.path})
+
+    def after_request(self, info):
+        span = info.context.pop('span', None)
+        if span is None:
+            return
+        span.set_attribute('odm.bytes_sent', info.bytes_sent)
+        span.set_attribute('odm.bytes_received', info.bytes_received)
+        span.set_attribute('odm.retries', info.retries)
+        if info.status_code is not None:
+            span.set_attribute('http.status_code', info.status_code)
+        if info.server_elapsed is not None:
+            span.set_attribute('odm.server_elapsed', info.server_elapsed)
+        if info.error is not None:
+            span.record_exception(info.error)
+            span.set_status(self.__trace.Status(self.__trace.StatusCode.ERROR, str(info.error)))
+        elif info.server_error is not None:
+            span.set_status(self.__trace.Status(self.__trace.StatusCode.ERROR, info.server_error))
+        span.end()
@@ -0,0 +1,136 @@
+import json
+import os
+from collections.abc import Mapping, Set
+
+from odm_sdk import GenestackException
+
+
+def _default(obj):
+    """
+    Serialize objects which are not supported by JSON encoders natively.
+    Dictionaries (including :py:class:`~odm_sdk.Metainfo` and
+    :py:class:`~odm_sdk.MetainfoScalarValue`), lists and tuples never get here.
+    """
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    if isinstance(obj, Set):
+        return list(obj)
+    raise TypeError('Object of type %s is not JSON serializable' % type(obj).__name__)
+
+
+class JsonCodec(object):
+    """
+    Serializes application call parameters and deserializes responses.
+    This implementation uses the standard :py:mod:`json` module.
+
+    Dictionary subclasses such as :py:class:`~odm_sdk.Metainfo` and
+    :py:class:`~odm_sdk.MetainfoScalarValue` are serialized directly, without copying them
+    into plain dictionaries first.
+    """
+
+    name = 'json'
+
+    def dumps(self, obj):
+        """
+        Serialize object to JSON.
+
+        :param obj: object to serialize
+        :return: JSON document
+        :rtype: str|bytes
+        """
+        return json.dumps(obj, default=_default)
+
+    def loads(self, data):
+        """
+        Deserialize JSON document.
+
+        :param data: JSON document
+        :type data: bytes|str
+        :return: deserialized object
+        :raises ValueError: if the document is not valid
+        """
+        return json.loads(data)
+
+    def __repr__(self):
+        return '%s()' % self.__class__.__name__
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    Codec based on `orjson <https://pypi.org/project/orjson/>`_ package.
+    Objects which orjson cannot serialize, e.g. integers wider than 64 bits,
+    are serialized by the standard :py:mod:`json` module.
+    """
+
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self.__orjson = orjson
+
+    def dumps(self, obj):
+        try:
+            return self.__orjson.dumps(obj, default=_default,
+                                       option=self.__orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            return super(OrjsonCodec, self).dumps(obj)
+
+    def loads(self, data):
+        return self.__orjson.loads(data)
+
+
+class UjsonCodec(JsonCodec):
+    """
+    Codec based on `ujson <https://pypi.org/project/ujson/>`_ package.
+    Objects which ujson cannot serialize are serialized by the standard
+    :py:mod:`json` module.
+    """
+
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self.__ujson = ujson
+
+    def dumps(self, obj):
+        try:
+            return self.__ujson.dumps(obj, default=_default)
+        except (TypeError, OverflowError):
+            return super(UjsonCodec, self).dumps(obj)
+
+    def loads(self, data):
+        return self.__ujson.loads(data)
+
+
+_CODECS = (OrjsonCodec, UjsonCodec, JsonCodec)
+
+
+def get_codec(name=None):
+    """
+    Return JSON codec by name: ``'orjson'``, ``'ujson'`` or ``'json'``.
+    If name is not specified, the fastest available codec is returned;
+    the choice can be overridden by ``GENESTACK_JSON_CODEC`` environment variable.
+
+    :param name: codec name
+    :type name: str
+    :return: codec
+    :rtype: JsonCodec
+    """
+    name = name or os.environ.get('GENESTACK_JSON_CODEC')
+    if name:
+        for codec_class in _CODECS:
+            if codec_class.name == name:
+                try:
+                    return codec_class()
+                except ImportError:
+                    raise GenestackException('JSON codec "%s" is not installed' % name)
+        raise GenestackException('Unknown JSON codec "%s", expect one of: %s' % (
+            name, ', '.join(codec_class.name for codec_class in _CODECS)))
+    for codec_class in _CODECS:
+        try:
+            return codec_class()
+        except ImportError:
+            continue
+
+
+DEFAULT_CODEC = get_codec()
@@ -0,0 +1,142 @@
+import codecs
+import json
+
+_WHITESPACE = ' \t\n\r'
+_NUMBER_PARTS = '.eE+-'
+_DECODER = json.JSONDecoder()
+
+
+class _TextBuffer(object):
+    """
+    Text decoded from a stream of bytes, with a read position.
+    Consumed text is dropped when more data is read, so the buffer only holds
+    the value that is being decoded.
+    """
+
+    def __init__(self, chunks):
+        self.__chunks = iter(chunks)
+        self.__decoder = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size=1):
+        """
+        Read more data from the stream.
+
+        :param size: minimal number of characters to read, unless the stream ends earlier
+        :type size: int
+        :return: ``False`` if the stream has been exhausted before the call
+        :rtype: bool
+        """
+        if self.eof:
+            return False
+        pieces = [self.text[self.pos:]]
+        self.pos = 0
+        for chunk in self.__chunks:
+            piece = self.__decoder.decode(chunk)
+            if piece:
+                pieces.append(piece)
+                size -= len(piece)
+                if size <= 0:
+                    break
+        else:
+            pieces.append(self.__decoder.decode(b'', final=True))
+            self.eof = True
+        self.text = ''.join(pieces)
+        return True
+
+    def fill_more(self):
+        """
+        Read more data for a value that starts at the read position and is not complete yet.
+        At least as much data as is already buffered is read, so a large value is decoded
+        a logarithmic number of times rather than once per chunk.
+
+        :return: ``False`` if the stream has been exhausted before the call
+        :rtype: bool
+        """
+        return self.fill(len(self.text) - self.pos)
+
+    def peek(self):
+        """
+        Skip whitespace and return the next character.
+        """
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                raise ValueError('Unexpected end of content')
+
+    def expect(self, *characters):
+        """
+        Skip the next character and return it, it should be one of ``characters``.
+        """
+        character = self.peek()
+        if character not in characters:
+            raise ValueError('Expecting one of "%s" at position %s, got "%s"' % (
+                ''.join(characters), self.pos, character))
+        self.pos += 1
+        return character
+
+    def read_value(self):
+        """
+        Decode the next JSON value.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.text, self.pos)
+            except ValueError:
+                # the value is incomplete
+                if not self.fill_more():
+                    raise
+                continue
+            # a number at the end of the buffer (or followed by an incomplete fraction or
+            # exponent, e.g. "1." or "1e") may continue in the next piece of data
+            if not self.eof and (end == len(self.text) or self.text[end] in _NUMBER_PARTS):
+                self.fill_more()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_array_field(chunks, field, other_fields):
+    """
+    Decode a JSON object from a stream of bytes, yielding elements of its array ``field``
+    one by one as soon as they are received.
+
+    Other fields of the object are stored to the ``other_fields`` dictionary.
+    If ``field`` is not an array, its value is stored to ``other_fields`` as well.
+
+    :param chunks: iterable of bytes in UTF-8
+    :param field: name of the array field
+    :type field: str
+    :param other_fields: dictionary for values of other fields
+    :type other_fields: dict
+    :raises ValueError: if content is not a valid JSON object
+    """
+    buffer = _TextBuffer(chunks)
+    buffer.expect('{')
+    if buffer.peek() == '}':
+        buffer.pos += 1
+        return
+    while True:
+        key = buffer.read_value()
+        if not isinstance(key, str):
+            raise ValueError('Expecting property name at position %s' % buffer.pos)
+        buffer.expect(':')
+        if key == field and buffer.peek() == '[':
+            buffer.pos += 1
+            if buffer.peek() == ']':
+                buffer.pos += 1
+            else:
+                while True:
+                    yield buffer.read_value()
+                    if buffer.expect(',', ']') == ']':
+                        break
+        else:
+            other_fields[key] = buffer.read_value()
+        if buffer.expect(',', '}') == '}':
+            return
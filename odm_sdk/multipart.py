@@ -0,0 +1,203 @@
+import os
+import threading
+import uuid
+
+CRLF = b'\r\n'
+
+_seek_lock = threading.Lock()
+
+
+def _pread(fd, size, offset):
+    """
+    Read ``size`` bytes at ``offset`` without changing the file position,
+    so one descriptor can be shared by many threads.
+    """
+    if hasattr(os, 'pread'):
+        return os.pread(fd, size, offset)
+    # Windows
+    with _seek_lock:
+        os.lseek(fd, offset, os.SEEK_SET)
+        return os.read(fd, size)
+
+
+class FileRange(object):
+    """
+    Read-only file-like view of a byte range of a file.
+    Data is read from the file on demand in pieces requested by the caller,
+    the range is never loaded into memory as a whole.
+    """
+
+    def __init__(self, fd, offset, size):
+        """
+        :param fd: file descriptor opened for reading, it is not closed by this object
+        :type fd: int
+        :param offset: position of the range in the file
+        :type offset: int
+        :param size: size of the range
+        :type size: int
+        """
+        self.fd = fd
+        self.offset = offset
+        self.size = size
+        self.__position = 0
+
+    def __len__(self):
+        return self.size
+
+    def tell(self):
+        return self.__position
+
+    def seek(self, position, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            position += self.__position
+        elif whence == os.SEEK_END:
+            position += self.size
+        self.__position = min(max(position, 0), self.size)
+        return self.__position
+
+    def read(self, size=-1):
+        remaining = self.size - self.__position
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        if size == 0:
+            return b''
+        data = _pread(self.fd, size, self.offset + self.__position)
+        if not data:
+            raise EOFError('File is shorter than expected: %s bytes at %s' % (
+                self.size, self.offset))
+        self.__position += len(data)
+        return data
+
+
+class DeferredValue(object):
+    """
+    Value of a form field which is known only when the preceding parts have been read,
+    e.g. a checksum of a file part. Its length should be known in advance.
+    """
+
+    def __init__(self, length, getter):
+        """
+        :param length: length of the value in bytes
+        :type length: int
+        :param getter: function without arguments returning the value as str or bytes
+        :type getter: callable
+        """
+        self.length = length
+        self.getter = getter
+        self.__data = None
+        self.__position = 0
+
+    def __len__(self):
+        return self.length
+
+    def tell(self):
+        return self.__position
+
+    def seek(self, position, whence=os.SEEK_SET):
+        if position != 0 or whence != os.SEEK_SET:
+            raise ValueError('Deferred value can only be rewound to the beginning')
+        self.__data = None
+        self.__position = 0
+        return 0
+
+    def read(self, size=-1):
+        if self.__data is None:
+            data = self.getter()
+            self.__data = data.encode('utf-8') if isinstance(data, str) else data
+            if len(self.__data) != self.length:
+                raise ValueError('Deferred value has length %s instead of %s' % (
+                    len(self.__data), self.length))
+        if size is None or size < 0:
+            size = self.length - self.__position
+        data = self.__data[self.__position:self.__position + size]
+        self.__position += len(data)
+        return data
+
+
+class MultipartEncoder(object):
+    """
+    Streaming ``multipart/form-data`` request body.
+
+    Parts are produced while the body is being sent: the content of file parts is read
+    from their file-like objects piece by piece, so the body is never built in memory.
+    The body has a known length, so it is sent with ``Content-Length``, and it can
+    be rewound with ``seek(0)`` to send it again.
+    """
+
+    def __init__(self, fields, files, trailer=None):
+        """
+        :param fields: names and values of form fields
+        :type fields: dict
+        :param files: names and sized file-like objects (e.g. :py:class:`FileRange`)
+                      of file parts, the name is used as a filename too
+        :type files: dict
+        :param trailer: names and values of form fields sent after the files,
+                        values can be :py:class:`DeferredValue`
+        :type trailer: dict
+        """
+        self.boundary = uuid.uuid4().hex
+        self.content_type = 'multipart/form-data; boundary=%s' % self.boundary
+        self.__parts = []
+        for name, value in fields.items():
+            self.__parts.append(self.__header(name) + str(value).encode('utf-8') + CRLF)
+        for name, fileobj in files.items():
+            self.__parts.append(
+                self.__header(name, filename=name) + b'Content-Type: application/octet-stream'
+                + CRLF + CRLF)
+            self.__parts.append(fileobj)
+            self.__parts.append(CRLF)
+        for name, value in (trailer or {}).items():
+            if isinstance(value, DeferredValue):
+                self.__parts.append(self.__header(name))
+                self.__parts.append(value)
+                self.__parts.append(CRLF)
+            else:
+                self.__parts.append(self.__header(name) + str(value).encode('utf-8') + CRLF)
+        self.__parts.append(('--%s--' % self.boundary).encode('ascii') + CRLF)
+        self.__length = sum(len(part) for part in self.__parts)
+        self.seek(0)
+
+    def __header(self, name, filename=None):
+        disposition = 'form-data; name="%s"' % name
+        if filename is not None:
+            disposition += '; filename="%s"' % filename
+        header = '--%s\r\nContent-Disposition: %s\r\n' % (self.boundary, disposition)
+        if filename is None:
+            header += '\r\n'
+        return header.encode('utf-8')
+
+    def __len__(self):
+        return self.__length
+
+    def seek(self, position, whence=os.SEEK_SET):
+        if position != 0 or whence != os.SEEK_SET:
+            raise ValueError('Multipart body can only be rewound to the beginning')
+        self.__part_index = 0
+        self.__part_offset = 0
+        for part in self.__parts:
+            if not isinstance(part, bytes):
+                part.seek(0)
+        return 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.__length
+        pieces = []
+        while size > 0 and self.__part_index < len(self.__parts):
+            part = self.__parts[self.__part_index]
+            if isinstance(part, bytes):
+                piece = part[self.__part_offset:self.__part_offset + size]
+                self.__part_offset += len(piece)
+                done = self.__part_offset == len(part)
+            else:
+                piece = part.read(size)
+                done = not piece or part.tell() == len(part)
+            if piece:
+                pieces.append(piece)
+                size -= len(piece)
+            if done:
+                self.__part_index += 1
+                self.__part_offset = 0
+        if len(pieces) == 1:
+            return pieces[0]
+        return b''.join(pieces)
@@ -0,0 +1,154 @@
+import threading
+import time
+
+from odm_sdk import GenestackException
+
+
+class TokenBucket(object):
+    """
+    Token bucket limiting the rate of sent data.
+
+    The bucket is filled with ``rate`` bytes per second up to ``burst`` bytes; sending
+    data takes bytes from the bucket. When the bucket is empty, senders wait in the order
+    of their requests: the bucket goes into debt, so a waiting thread is not overtaken
+    by the others, and concurrent uploads get equal shares of the bandwidth.
+
+    One bucket can be shared by any number of threads and uploads.
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        :param rate: maximum average rate in bytes per second
+        :type rate: float
+        :param burst: maximum amount of data sent at once after a pause,
+                      one second of data by default
+        :type burst: float
+        """
+        if rate <= 0:
+            raise GenestackException('Rate limit should be positive')
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else rate)
+        self.__tokens = self.burst
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def reserve(self, amount):
+        """
+        Take ``amount`` bytes from the bucket without waiting.
+
+        :return: time in seconds to wait before sending the data
+        :rtype: float
+        """
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.burst,
+                                self.__tokens + (now - self.__updated) * self.rate)
+            self.__updated = now
+            self.__tokens -= amount
+            if self.__tokens >= 0:
+                return 0.0
+            return -self.__tokens / self.rate
+
+    def consume(self, amount):
+        """
+        Wait until ``amount`` bytes can be sent.
+
+        :param amount: number of bytes
+        :type amount: int
+        :rtype: None
+        """
+        delay = self.reserve(amount)
+        if delay > 0:
+            time.sleep(delay)
+
+    def __repr__(self):
+        return 'TokenBucket(rate=%s, burst=%s)' % (self.rate, self.burst)
+
+
+_global_bucket = None
+
+
+def set_global_rate_limit(rate, burst=None):
+    """
+    Limit the total upload rate of the process: all uploads (chunked and not chunked)
+    share one :py:class:`TokenBucket` in addition to their own limits.
+
+    :param rate: maximum rate in bytes per second, ``None`` to remove the limit
+    :type rate: float
+    :param burst: see :py:class:`TokenBucket`
+    :type burst: float
+    :rtype: None
+    """
+    global _global_bucket
+    _global_bucket = TokenBucket(rate, burst) if rate is not None else None
+
+
+def get_global_rate_limit():
+    """
+    Return the bucket set by :py:func:`set_global_rate_limit`.
+
+    :rtype: TokenBucket
+    """
+    return _global_bucket
+
+
+def get_bucket(rate_limit):
+    """
+    Return bucket for a rate limit argument: a number of bytes per second,
+    a bucket (to share it between uploads) or ``None``.
+
+    :type rate_limit: float|TokenBucket
+    :rtype: TokenBucket
+    """
+    if rate_limit is None or isinstance(rate_limit, TokenBucket):
+        return rate_limit
+    return TokenBucket(rate_limit)
+
+
+class ThrottledReader(object):
+    """
+    Sized file-like object which does not let data to be read faster than
+    the global limit and the given buckets allow.
+    """
+
+    def __init__(self, fileobj, bucket=None):
+        """
+        :param fileobj: sized file-like object
+        :param bucket: limit of this reader in addition to the global one
+        :type bucket: TokenBucket
+        """
+        self.fileobj = fileobj
+        self.bucket = bucket
+
+    def __len__(self):
+        return len(self.fileobj)
+
+    def tell(self):
+        return self.fileobj.tell()
+
+    def seek(self, position, whence=0):
+        return self.fileobj.seek(position, whence)
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        throttle(len(data), self.bucket)
+        return data
+
+
+def throttle(amount, bucket=None):
+    """
+    Wait until ``amount`` bytes can be sent according to the global limit
+    and the given bucket.
+
+    :param amount: number of bytes
+    :type amount: int
+    :param bucket: limit in addition to the global one
+    :type bucket: TokenBucket
+    :rtype: None
+    """
+    if not amount:
+        return
+    # take tokens from all buckets at once, so waits do not add up
+    delays = [b.reserve(amount) for b in (_global_bucket, bucket) if b is not None]
+    if delays and max(delays) > 0:
+        time.sleep(max(delays))
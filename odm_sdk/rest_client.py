@@ -0,0 +1,112 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+from odm_sdk.exceptions import GenestackResponseError
+from odm_sdk.retry import RetryPolicy, print_retry
+
+REST_PREFIX = 'frontend/rs/genestack/'
+DEFAULT_POOL_MAXSIZE = 10
+
+
+class RestClient(object):
+    """
+    Client of the ODM REST API, e.g. ETL jobs and integration links.
+
+    Paths of requests are relative to ``<server>/frontend/rs/genestack/``. All requests
+    share a pool of keep-alive connections and the authentication headers, and are
+    retried on transient failures according to the retry policy.
+    The client can be used by many threads at once.
+    """
+
+    def __init__(self, server, headers, retry_policy=None, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 debug=False):
+        """
+        :param server: server URL, e.g. ``https://odm.example.com``
+        :type server: str
+        :param headers: headers sent with every request, e.g. ``Genestack-API-Token``
+        :type headers: dict
+        :param retry_policy: policy of retrying requests on transient failures,
+                             by default :py:class:`~odm_sdk.RetryPolicy` with default settings
+        :type retry_policy: odm_sdk.RetryPolicy
+        :param pool_maxsize: maximum number of keep-alive connections;
+                             should not be less than the number of threads sharing the client
+        :type pool_maxsize: int
+        :param debug: report retries to stderr
+        :type debug: bool
+        """
+        self.server = server.rstrip('/')
+        self.base_url = '%s/%s' % (self.server, REST_PREFIX)
+        self.retry_policy = RetryPolicy() if retry_policy is None else retry_policy
+        self.debug = debug
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(headers)
+
+    def url(self, path):
+        """
+        Return URL of a path relative to the REST prefix, absolute URLs are returned as is.
+
+        :rtype: str
+        """
+        if path.startswith(('http://', 'https://')):
+            return path
+        return self.base_url + path.lstrip('/')
+
+    def request(self, method, path, **kwargs):
+        """
+        Send request, retrying it on transient failures.
+        Keyword arguments are passed to :py:meth:`requests.Session.request`.
+
+        :param method: HTTP method
+        :type method: str
+        :param path: path relative to the REST prefix or an absolute URL
+        :type path: str
+        :return: the last response, its status is not checked
+        :rtype: requests.Response
+        """
+        url = self.url(path)
+
+        def on_retry(attempt, delay, outcome):
+            if self.debug:
+                print_retry(attempt, delay, outcome, self.retry_policy.max_attempts,
+                            what='%s %s' % (method, url))
+
+        return self.retry_policy.call(
+            lambda: self.session.request(method, url, **kwargs), method, on_retry=on_retry)
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def request_json(self, method, path, **kwargs):
+        """
+        Send request and return its decoded JSON body.
+
+        :raises GenestackResponseError: if the server returns an error status
+                                        or a body which is not JSON
+        """
+        response = self.request(method, path, **kwargs)
+        if not response.ok:
+            raise GenestackResponseError('%s %s: got response with status code %s: %s' % (
+                method, response.url, response.status_code, response.text))
+        try:
+            return response.json()
+        except ValueError:
+            raise GenestackResponseError('%s %s: cannot decode response body as JSON: %s' % (
+                method, response.url, response.text))
+
+    def close(self):
+        """
+        Close all pooled connections.
+        """
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,216 @@
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from OpenSSL.SSL import SysCallError
+from requests.exceptions import ConnectionError, ConnectTimeout, RequestException
+from urllib3.exceptions import NewConnectionError
+
+from odm_sdk import GenestackException
+
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'TRACE'])
+RETRY_STATUSES = frozenset([429, 502, 503, 504])
+# the server guarantees that a request rejected with these statuses has not been processed
+NOT_PROCESSED_STATUSES = frozenset([429, 503])
+
+
+def _is_connect_error(error):
+    """
+    Return ``True`` if the request has failed before it could reach the server.
+    """
+    if isinstance(error, ConnectTimeout):
+        return True
+    if isinstance(error, ConnectionError) and error.args:
+        reason = getattr(error.args[0], 'reason', error.args[0])
+        return isinstance(reason, NewConnectionError)
+    return False
+
+
+def _parse_retry_after(response):
+    """
+    Return the delay in seconds requested by the ``Retry-After`` header, or ``None``.
+    """
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy(object):
+    """
+    Describes how network requests are retried on transient failures.
+
+    The delay before the ``n``-th retry is
+    ``backoff_factor * backoff_multiplier ** (n - 1)`` seconds, limited by ``max_backoff``;
+    with ``jitter`` a random delay between zero and this value is used instead,
+    so that many clients do not retry in lockstep.
+    If the server sends a ``Retry-After`` header, the client waits at least as long.
+
+    Requests with idempotent methods (``GET``, ``PUT``, ...) are retried on any
+    connection error or a status from ``retry_statuses``. Other requests (e.g. application
+    calls, which are ``POST`` requests) are retried only when the server has surely not
+    processed them: the connection could not be established, or the response status is
+    ``429`` or ``503``.
+    """
+
+    def __init__(self, max_attempts=5, backoff_factor=0.5, backoff_multiplier=2, max_backoff=60,
+                 jitter=True, retry_statuses=RETRY_STATUSES,
+                 idempotent_methods=IDEMPOTENT_METHODS, respect_retry_after=True,
+                 retry_exceptions=(RequestException, SysCallError)):
+        """
+        :param max_attempts: total number of attempts including the first one
+        :type max_attempts: int
+        :param backoff_factor: delay before the first retry, in seconds
+        :type backoff_factor: float
+        :param backoff_multiplier: growth factor of the delay between attempts
+        :type backoff_multiplier: float
+        :param max_backoff: maximum delay between attempts in seconds, ``None`` for no limit
+        :type max_backoff: float
+        :param jitter: randomize delays
+        :type jitter: bool
+        :param retry_statuses: HTTP statuses considered transient
+        :type retry_statuses: collections.abc.Set[int]
+        :param idempotent_methods: HTTP methods which are safe to repeat
+        :type idempotent_methods: collections.abc.Set[str]
+        :param respect_retry_after: wait for the time requested by ``Retry-After`` header
+        :type respect_retry_after: bool
+        :param retry_exceptions: exceptions considered transient for idempotent requests
+        :type retry_exceptions: tuple[type]
+        """
+        if max_attempts <= 0:
+            raise GenestackException('Number of attempts should be positive')
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.backoff_multiplier = backoff_multiplier
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.idempotent_methods = frozenset(m.upper() for m in idempotent_methods)
+        self.respect_retry_after = respect_retry_after
+        self.retry_exceptions = tuple(retry_exceptions)
+
+    def is_idempotent(self, method):
+        """
+        Return ``True`` if requests with this HTTP method can be safely repeated.
+
+        :param method: HTTP method
+        :type method: str
+        :rtype: bool
+        """
+        return method.upper() in self.idempotent_methods
+
+    def should_retry(self, attempt, method, response=None, error=None, idempotent=None):
+        """
+        Decide whether a request should be repeated after a failed attempt.
+
+        :param attempt: number of the attempt which has just finished, starting from 1
+        :type attempt: int
+        :param method: HTTP method of the request
+        :type method: str
+        :param response: response received at this attempt
+        :type response: requests.Response
+        :param error: exception raised at this attempt
+        :type error: Exception
+        :param idempotent: overrides classification of the request by its method
+        :type idempotent: bool
+        :rtype: bool
+        """
+        if attempt >= self.max_attempts:
+            return False
+        if idempotent is None:
+            idempotent = self.is_idempotent(method)
+        if error is not None:
+            if idempotent:
+                return isinstance(error, self.retry_exceptions)
+            return _is_connect_error(error)
+        if response is not None and response.status_code in self.retry_statuses:
+            return idempotent or response.status_code in NOT_PROCESSED_STATUSES
+        return False
+
+    def get_delay(self, attempt, response=None):
+        """
+        Return the delay in seconds before the next attempt.
+
+        :param attempt: number of the attempt which has just finished, starting from 1
+        :type attempt: int
+        :param response: response received at this attempt
+        :type response: requests.Response
+        :rtype: float
+        """
+        delay = self.backoff_factor * self.backoff_multiplier ** (attempt - 1)
+        if self.max_backoff is not None:
+            delay = min(delay, self.max_backoff)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        if self.respect_retry_after:
+            retry_after = _parse_retry_after(response)
+            if retry_after is not None:
+                if self.max_backoff is not None:
+                    retry_after = min(retry_after, self.max_backoff)
+                delay = max(delay, retry_after)
+        return delay
+
+    def call(self, send, method, idempotent=None, on_retry=None):
+        """
+        Perform a request with retries.
+
+        :param send: function without arguments which makes one attempt and returns
+                     :py:class:`requests.Response`
+        :type send: callable
+        :param method: HTTP method of the request
+        :type method: str
+        :param idempotent: overrides classification of the request by its method
+        :type idempotent: bool
+        :param on_retry: function called before each retry with the number of the failed
+                         attempt, the delay and the response or exception of this attempt
+        :type on_retry: callable
+        :return: the last response
+        :rtype: requests.Response
+        :raises: the exception of the last attempt
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = send()
+            except Exception as e:
+                if not self.should_retry(attempt, method, error=e, idempotent=idempotent):
+                    raise
+                delay = self.get_delay(attempt)
+                outcome = e
+            else:
+                if not self.should_retry(attempt, method, response=response,
+                                         idempotent=idempotent):
+                    return response
+                delay = self.get_delay(attempt, response)
+                outcome = response
+                response.close()
+            if on_retry is not None:
+                on_retry(attempt, delay, outcome)
+            time.sleep(delay)
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
+
+
+def print_retry(attempt, delay, outcome, max_attempts, what='request'):
+    """
+    Report a retry to stderr, can be used as a base of ``on_retry`` callback.
+    """
+    if isinstance(outcome, Exception):
+        reason = 'Connection error: %s' % outcome
+    else:
+        reason = 'Got response with status code: %s' % outcome.status_code
+    sys.stderr.write('%s/%s attempt of %s failed, retrying in %.1f seconds. %s\n' % (
+        attempt, max_attempts, what, delay, reason))
@@ -10,27 +10,25 @@ for detailed guide
 from __future__ import division, print_function
 
 import argparse
-import collections
-import copy
 import csv
-import itertools
 import json
+import os
 import pprint
-import re
+import shlex
 import sys
-from time import sleep
-
-try:
-    # Python 3
-    from urllib.parse import urlparse
-except ImportError:
-    # PY3TODO - this is a label for code that could be simplified/improved when
-    # dropping support for Python 2
-    # Python 2
-    from urlparse import urlparse
+import threading
 
 import requests
 
+from odm_sdk.import_checkpoint import ImportCheckpoint
+from odm_sdk.importer import (DEFAULT_MAX_STUDIES, DEFAULT_MAX_WORKERS, DEFAULT_RETRY_POLICY,
+                              ETL_SOURCES, ETL_WAITING_TIMEOUT, LIB_PREP_TAGS, SIGNAL_TAGS,
+                              ImportReporter, StudyImportError, StudyImporter, get_all_tags,
+                              get_pool_size,
+                              has_consistent_data_model, has_libraries_or_preparations,
+                              has_non_expression_signals, import_studies, is_acc)
+from odm_sdk.rest_client import RestClient
+
 # let's do it `six`-style! (https://github.com/benjaminp/six/blob/master/six.py#L35)
 PY2 = sys.version_info[0] == 2
 PY3 = sys.version_info[0] == 3
@@ -41,48 +39,6 @@ if PY3:
 else:
     bytes_type = str
 
-ACC_RE = re.compile(r'([A-Z]+[0-9]+)$')
-
-# regexp to match accession in square brackets appended to links
-TRAILING_ACC_RE = r'\[([A-Z]+[0-9]+)\]$'
-TRAILING_ACC_RE = re.compile(TRAILING_ACC_RE)
-
-LOAD_RETRIES = 60
-INTEGRATION_PREFIX = "integrationCurator/%s/integration/link/"
-FILE_ENDPOINTS_DICT = {"study": "studyCurator/%s/studies",
-                       "samples": "sampleCurator/%s/samples",
-                       "variant": "variantCurator/%s/variant/vcf",
-                       "expression": "expressionCurator/%s/expression/gct",
-                       "flow-cytometry": "flowCytometryCurator/%s/flow-cytometry/facs"}
-LINK_ENDPOINTS_DICT = {"samples_to_study": "sample/%s/to/study/%s",
-                       "variant_to_sample": "variant/%s/to/sample/%s",
-                       "flow-cytometry_to_sample": "flow-cytometry/%s/to/sample/%s",
-                       "expression_to_sample": "expression/%s/to/sample/%s"}  # type: dict
-LINK_ENDPOINTS_DICT = {k: INTEGRATION_PREFIX + v
-                       for k, v in LINK_ENDPOINTS_DICT.items()}
-
-# how long to wait for ETL jobs to be finished (in seconds)
-ETL_WAITING_TIMEOUT = 30 * 60
-# how often to poll for jobs
-ETL_POLLING_INTERVAL = 5
-
-# all supported file "sources" supported by ETL
-ETL_SOURCES = ('S3', 'HTTP', 'Arvados', 'LOCAL')
-
-# a mapping of URL scheme to its *default* ETL "source" (see above)
-# if no source is provided explicitly
-SCHEME_TO_ETL_SOURCE = {
-    'http': 'HTTP',
-    'https': 'HTTP',
-    's3': 'S3',
-    'file': 'LOCAL'
-}
-
-# guard against possible mistakes in ETL source constants
-assert set(SCHEME_TO_ETL_SOURCE.values()).issubset(ETL_SOURCES)
-
-COMMON_URL_PREFIX = 'frontend/rs/genestack'
-
 TAGS = {"-sm": "samples",
         "-lb": "libraries",
         "-pr": "preparations",
@@ -100,46 +56,6 @@ TAGS = {"-sm": "samples",
         "-ms": "measurement-separator"
         }
 
-LIB_PREP_TAGS = {'libraries', 'preparations'}
-SIGNAL_TAGS = {'flow-cytometry', 'variant', 'expression'}
-
-FILE_FOUND_ERR_MSG_RE = r'job instance already exists .+ jobExecId=([0-9]+)'
-FILE_FOUND_ERR_MSG_RE = re.compile(FILE_FOUND_ERR_MSG_RE)
-
-
-def is_acc(string):
-    return bool(ACC_RE.match(string))
-
-
-def parse_file_signal(link):
-    """ Parse URLs like http://examp.le/file.txt[GSF123456] """
-    version = TRAILING_ACC_RE.search(link)
-    if version is not None:
-        link = link[:version.start()]
-        version = version.groups()[0]
-    return link, version
-
-
-def partition(pred, iterable):
-    "Use a predicate to partition entries into false entries and true entries"
-    # partition(is_odd, range(10)) --> 0 2 4 6 8   and  1 3 5 7 9
-    t1, t2 = itertools.tee(iterable)
-    return itertools.filterfalse(pred, t1), filter(pred, t2)
-
-
-class GroupLinkingError(Exception):
-    """
-    Exception raised for error during group linking. E.g linking signals to
-    samples or samples to study
-    """
-
-    def __init__(self, what, accession_to, accession_from):
-        self.what = what
-        self.accession_to = accession_to
-        self.accession_from = accession_from
-        # PY3TODO
-        super(GroupLinkingError, self).__init__(self, what, accession_to, accession_from)
-
 
 def green_text(text):
     if sys.platform == 'win32' or not sys.stdout.isatty():
@@ -159,14 +75,17 @@ class TemplateAccessionSupplier:
     """
     Container for TEMPLATE_ACCESSION.
     If empty, could try to request default template's accession
+    with the client of the import
     """
-    def __init__(self, args):
-        self.server = args.SERVER
+    def __init__(self, args, client):
+        self.client = client
         self.token = args.API_TOKEN
         self.debug = args.debug
         self.template_accession = args.TEMPLATE_ACCESSION
         self.should_request_default = args.TEMPLATE_ACCESSION is None and \
                                       args.study_accession is None
+        # jobs are submitted from several threads, request the default template once
+        self._lock = threading.Lock()
         self._validate()
 
     def _validate(self):
@@ -175,30 +94,30 @@ class TemplateAccessionSupplier:
             sys.exit(1)
 
     def __call__(self, *args, **kwargs):
-        if self.should_request_default:
-            self.template_accession = self._request_default_template()
-            self.should_request_default = False
+        with self._lock:
+            if self.should_request_default:
+                self.template_accession = self._request_default_template()
+                self.should_request_default = False
         return self.template_accession
 
     def _authenticate(self):
         aut_url = "/frontend/endpoint/application/invoke/genestack/signin/authenticateByApiToken"
-        url_authenticate = self.server + aut_url
-        session = requests.Session()
+        url_authenticate = self.client.server + aut_url
         try:
-            result = session.post(url_authenticate, json=[self.token], timeout=10)
+            # the session of the client keeps the authentication
+            result = self.client.post(url_authenticate, json=[self.token], timeout=10)
             if not json.loads(result.text)["result"]["authenticated"]:
                 if self.debug:
                     print(result, result.text)
                 print(red_text("You set invalid token or your license is expired!"))
                 sys.exit(1)
-            return session
         except requests.exceptions.ConnectionError as error:
             if not self.debug:
                 if error.__class__.__name__ == 'ConnectionError':
                     _err("Failed connection to server {srv}. Check the server name"
-                         .format(srv=self.server))
+                         .format(srv=self.client.server))
                 if error.__class__.__name__ == 'ConnectTimeout':
-                    _err("Connection timeout to server {srv}".format(srv=self.server))
+                    _err("Connection timeout to server {srv}".format(srv=self.client.server))
             else:
                 _err("{err_name}: {err_args}"
                      "".format(err_name=error.__class__.__name__,
@@ -206,11 +125,11 @@ class TemplateAccessionSupplier:
             sys.exit(1)
 
     def _request_default_template(self):
-        url_request_template = (self.server +
+        url_request_template = (self.client.server +
                                 "/frontend/endpoint/application/invoke/genestack"
                                 "/study-metainfotemplateeditor/listTemplates")
-        session = self._authenticate()
-        response = session.post(url=url_request_template, json=[])
+        self._authenticate()
+        response = self.client.post(url_request_template, json=[])
         assert response.status_code == 200, response.text
         assert "result" in response.text, response.text
         result = json.loads(response.text)["result"]
@@ -220,111 +139,6 @@ class TemplateAccessionSupplier:
         return accession
 
 
-def get_study(params):
-    response = requests.get(
-        url='{0}/frontend/rs/genestack/studyUser/{1}/studies/{2}'.format(
-            params.SERVER, params.APP_VERSION, params.study_accession),
-        headers=params.headers)
-    return response
-
-
-def check_access_to_study(params):
-    response = get_study(params)
-    if response.status_code != 200:
-        if params.debug:
-            print(response, response.text)
-        _err("You don't have access permissions to study: "
-             "%s or it doesn't exist!" % params.study_accession, in_red=True)
-        sys.exit(1)
-
-
-def read_utf_csv(csv_data):
-    ''' Yield stripped and decoded CSV rows as dictionaries '''
-    # PY3TODO
-    if sys.version_info.major == 3:
-        csv_data = (line.decode('utf-8') for line in csv_data)
-    for row in csv.DictReader(csv_data):
-        yield {k.strip(): v.strip() for k, v in row.items()}
-
-
-def fetch_and_parse_csv(csv_link):
-    """ Fetch remote one-row CSV file and parse it to a dictionary """
-    # must not be empty or None
-    assert csv_link
-    try:
-        response = requests.get(csv_link)
-    except requests.exceptions.RequestException as error:
-        _err("Error accessing metadata file '{link}':\n{err_name}: {err_args}"
-             "".format(link=csv_link, err_name=error.__class__.__name__,
-                       err_args=error.args))
-        sys.exit(1)
-    if not response.ok:
-        _err("Error accessing metadata file '{}'".format(csv_link),
-             response=response, in_red=True)
-        sys.exit(1)
-    csv_data = read_utf_csv(response.iter_lines())
-    try:
-        metadata = next(csv_data)
-    # pylint: disable=broad-except
-    except Exception as err:
-        _err("Error parsing '{}' as CSV file:\n"
-             "{}: {}".format(csv_link, err, err.args),
-             in_red=True)
-        sys.exit(1)
-    try:
-        next(csv_data)
-        _err("Metadata file '{}' contains multiple rows, using only the first one"
-             "".format(csv_link), in_red=True)
-    except StopIteration:
-        pass
-    return metadata
-
-
-def _get_etl_source_from_url(url):
-    parsed_url = urlparse(url)
-    source = SCHEME_TO_ETL_SOURCE.get(parsed_url.scheme)
-    if source is None:
-        _err("Scheme '{}' is not supported, exiting".format(parsed_url.scheme),
-             in_red=True)
-        sys.exit(1)
-    return source
-
-
-def link_mappings(mapping_file_acc, expression_acc, params):
-    """ Link gene-tx mapping to expression data """
-    url = '{}/{}/integrationCurator/{}/links'.format(params.SERVER, COMMON_URL_PREFIX,
-                                                     params.APP_VERSION)
-    payload = [{'firstId': expression_acc,
-                'firstType': 'expressionGroup',
-                'secondId': mapping_file_acc,
-                'secondType': 'geneTranscriptMapping'}]
-    resp = requests.post(url, headers=params.headers, json=payload)
-    if not resp.ok:
-        _err("Linking gene-transcription mapping '{}' to expression group '{}' failed"
-             "".format(mapping_file_acc, expression_acc),
-             response=resp, in_red=True)
-        sys.exit(1)
-    print("Successfully linked: [mapping_file_to_expression]")
-
-
-def check_mapping_file(acc, params):
-    """
-    Check if provided accession corresponds to an existing mapping file
-
-    Returns the same accession if it's fine, otherwise exits with error
-    """
-    if acc is None:
-        return None
-    url = ('{}/{}/reference-data/{}/xrefsets/{}/metadata'
-           ''.format(params.SERVER, COMMON_URL_PREFIX, params.APP_VERSION, acc))
-    resp = requests.get(url, headers=params.headers)
-    if resp.ok:
-        return acc
-    _err("mapping file with the accession '{}' is not found".format(acc),
-         in_red=True)
-    sys.exit(1)
-
-
 def _err(msg, response=None, in_red=False):
     ''' Print error message '''
     # PY3TODO
@@ -351,408 +165,36 @@ def _err(msg, response=None, in_red=False):
     print(msg, file=sys.stderr)
 
 
-def _check_job_error(response):
-    ''' Checks if import job error is actually a message about duplicate '''
-    # if a file had already been submitted, REST API returns 409 Conflict
-    # pylint: disable=no-member
-    if response.status_code != requests.codes.CONFLICT:
-        return None
-    r_data = _unpack_job_response(response)
-    job_id_match = FILE_FOUND_ERR_MSG_RE.search(r_data['error']['message'])
-    if job_id_match is None:
-        return None
-    job_id = int(job_id_match.groups()[0])
-    return job_id
-
-
-def _get_mdata_params(metadata_link, inline_metadata):
-    ''' Return dictionary of metadata parameters
-
-    If ``inline_metadata`` is True, parse provided CSV link and return its content
-    as a "subdictionary".
-    Otherwise, pass metadata link to ETL as-is
-    '''
-    if not inline_metadata:
-        return {"metadataLink": metadata_link}
-    metadata = fetch_and_parse_csv(metadata_link)
-    return {"data": metadata}
-
-
-def _select_source(links):
-    sources = set(_get_etl_source_from_url(link) for link in links)
-    if len(sources) != 1:
-        _err("Mixing URL schemes is not supported; provide source explicitly",
-             in_red=True)
-        sys.exit(1)
-    assert sources != set([None])
-    return sources.pop()
-
-
-# pylint: disable-next=too-many-arguments
-def _prepare_etl_payload(kind, metadata_link, template_id=None, data_link=None,
-                         prev_version=None, number_of_feature_attributes=None,
-                         data_class=None, measurement_separator=None, source=None):
-    ''' Prepare payload to be sent to ETL as parameters '''
-    payload = {}
-    if template_id is not None:
-        payload["templateId"] = template_id
-    inline_metadata = False
-    if metadata_link is not None:
-        inline_metadata = (kind == 'transcript-mapping')
-        md_params = _get_mdata_params(metadata_link, inline_metadata)
-        payload.update(md_params)
-    if data_link is not None:
-        payload["dataLink"] = data_link
-    if prev_version is not None:
-        payload["previousVersion"] = prev_version
-    if number_of_feature_attributes is not None:
-        payload["numberOfFeatureAttributes"] = number_of_feature_attributes
-    if data_class is not None:
-        payload["dataClass"] = data_class
-    if measurement_separator is not None:
-        payload["measurementSeparator"] = measurement_separator.lstrip()
-    if source is None:
-        # determine list of links eligible for source guesswork
-        source_links = [data_link]
-        if not inline_metadata:
-            source_links.append(metadata_link)
-        source = _select_source(filter(lambda l: l is not None, source_links))
-    payload["source"] = source
-    return payload
-
-
-# pylint: disable-next=too-many-arguments
-def _async_import(kind, metadata_link, params, data_link=None,
-                  prev_version=None, number_of_feature_attributes=None,
-                  data_class=None, measurement_separator=None):
-    ''' Import data using Job/ETL API
-
-    Returns ``job_info`` dictionary with all the submitted (and finished) job
-    information, and a ``file_exists`` boolean: ``True`` if file has been found
-    in ODM, and ``False`` if it has been uploaded anew.
-    '''
-    if metadata_link is None and kind in ('study', 'samples'):
-        _err("No metadata link is provided for {} import"
-             "".format(kind))
-        sys.exit(1)
-    if data_link is None and kind in ('expression', 'variant', 'flow-cytometry',
-                                      'transcript-mapping'):
-        _err("No data link is provided for {} import"
-             "".format(kind))
-        sys.exit(1)
-    url = "{}/{}/job/{}/import/{}/".format(
-        params.SERVER, COMMON_URL_PREFIX, params.APP_VERSION, kind.replace('_', '-'))
-    if params.ALLOW_DUPLICATES:
-        url += '?allow_dups=true'
-    template_id = params.TEMPLATE_ACCESSION_SUPPLIER()
-    payload = _prepare_etl_payload(kind, metadata_link, template_id, data_link,
-                                   prev_version, number_of_feature_attributes,
-                                   data_class, measurement_separator, params.ETL_SOURCE)
-
-    resp = requests.post(url, headers=params.headers, json=payload)
-    if resp.status_code == 200:
-        r_data = _unpack_job_response(resp)
-        job_id = int(r_data.get('jobExecId'))
-        file_exists = False
-    else:
-        job_id = _check_job_error(resp)
-        if job_id is None:
-            _err("Submitting job failed!", response=resp, in_red=True)
-            sys.exit(1)
-        file_exists = True
-    job_info = _get_finished_job_info(job_id, params)
-    return job_info, file_exists
-
-
-def _unpack_job_response(r):
-    # TODO: go through other unguarded `json.loads` calls and wrap them too
-    try:
-        return json.loads(r.text)
-    except json.decoder.JSONDecodeError:
-        _err("Unexpected response received from server "
-             "(cannot decode body as JSON)", response=r, in_red=True)
-        sys.exit(1)
-
-
-def _get_finished_job_info(job_id, params):
-    ''' Wait for job to finish and return result '''
-    job_url = "{}/{}/job/{}/{}".format(
-        params.SERVER, COMMON_URL_PREFIX, params.APP_VERSION, job_id)
-    info_url = job_url + "/info"
-    output_url = job_url + "/output"
-    total_tries = params.JOB_TIMEOUT // ETL_POLLING_INTERVAL
-    progress_reported = False
-    for attempt in range(total_tries):
-        status = requests.get(info_url, headers=params.headers)
-        status = _unpack_job_response(status).get(u'status')
-        if status not in (u'STARTED', u'STARTING', u'RUNNING'):
-            break
-        sleep(ETL_POLLING_INTERVAL)
-        # report "progress" after two minutes of waiting
-        if attempt * ETL_POLLING_INTERVAL > 120:
-            progress_reported = True
-            print("Waiting for job #{} to complete, {} minutes before timeout"
-                  "".format(job_id, (total_tries - attempt) * ETL_POLLING_INTERVAL // 60 + 1),
-                  end='\r', file=sys.stderr)
-    else:
-        # clear screen after redrawn messages
-        _err('')
-        _err("Job {} has been running for {} seconds with no result, exiting"
-             "".format(job_id, params.JOB_TIMEOUT))
-        sys.exit(1)
-    # clear screen after redrawn messages if they had been printed
-    if progress_reported:
-        _err('')
-    output_r = requests.get(output_url, headers=params.headers)
-    output = _unpack_job_response(output_r)
-    if status != u'COMPLETED':
-        _err("Job {} failed with status {}".format(job_id, status),
-             response=output_r, in_red=True)
-        sys.exit(1)
-    return output
+class ConsoleReporter(ImportReporter):
+    """
+    Prints messages of an import to the console. Messages of studies imported
+    at once are prefixed with the study name, and waiting messages are not shown.
+    """
 
+    def __init__(self, prefix='', show_waiting=True):
+        self.prefix = prefix
+        self.show_waiting = show_waiting
+        self.__waiting = False
 
-def add_mappings(data_link, params, metadata_link=None):
-    """ Upload gene-tx mapping file with optional metadata
-        for import xref-mappings we are using syncronous endpoint
-        https://genestack.atlassian.net/browse/ODM-7489
-    """
-    metadata = fetch_and_parse_csv(metadata_link) if metadata_link else None
-    url = ('{}/{}/reference-data/{}/xrefsets/'
-           ''.format(params.SERVER, COMMON_URL_PREFIX, params.APP_VERSION))
-    source = _get_etl_source_from_url(data_link).lower()
-    payload = {
-        "dataLink": data_link,
-        "dataSource": source,
-        "xrefSetType": "gene-transcript"
-    }
-
-    if metadata is not None:
-        payload["metadata"] = metadata
-
-    resp = requests.post(url, headers=params.headers, json=payload)
-    if resp.status_code != 200:
-        _err("Importing '{}' failed!".format(data_link),
-             response=resp, in_red=True)
-        sys.exit(1)
-    accession = json.loads(resp.text)['xrefSetId']
-    if accession is None:
-        _err("Unexpected response from the server while importing '{}'."
-             .format(data_link), response=resp, in_red=True)
-        sys.exit(1)
-    print("Mapping file {} was added successfully".format(accession))
-    return accession
-
-
-def add_study(params):
-    ''' Create new study or return existing one '''
-    if params.study_accession:
-        check_access_to_study(params)
-        return params.study_accession
-    job_info, study_exists = _async_import(
-        kind='study',
-        metadata_link=params.study_link,
-        params=params
-    )
-    accession = job_info.get(u'result', {}).get(u'accession')
-    if accession is None:
-        _err("Mandatory file: study metadata wasn't loaded. Uploading is stopped!")
-        sys.exit(1)
-    if study_exists:
-        # this error message is parsed by load.py script: do not change it
-        _err("'{}' has already been uploaded as study '{}'"
-             "".format(params.study_link, accession))
-        if params.FAIL_IF_FILE_EXISTS:
-            sys.exit(1)
-    else:
-        print("study " + accession + " was added successfully")
-    return accession
-
-
-def add_and_link_samples(params, study, sample_link):
-    job_info, samples_exist = _async_import('samples', metadata_link=sample_link,
-                                            params=params)
-    group_acc = job_info.get(u'result', {}).get(u'groupAccession')
-    if group_acc is None:
-        _err("Mandatory file: samples metadata wasn't loaded. "
-             "Without samples metadata file, linking of signals to samples are impossible. "
-             "Uploading of signals files are stopped!", in_red=True)
-        sys.exit(1)
-    if samples_exist:
-        _err("'{}' has already been uploaded as sample group '{}'"
-             "".format(sample_link, group_acc))
-        if params.FAIL_IF_FILE_EXISTS:
-            sys.exit(1)
-    else:
-        print("samples were added successfully (sample group accession is {})"
-              "".format(group_acc))
-    link_by_parent(what="samples_to_study",
-                   accession_from=group_acc,
-                   accession_to=study,
-                   params=params)
-    return group_acc
-
-
-def get_libs_preps_by_study(file_type, params, study):
-    link_word = {'libraries': 'library', 'preparations': 'preparation'}[file_type]
-    url = ('{}/{}/integrationCurator/{}/integration/link/{}/group/by/study/{}'
-           ''.format(params.SERVER, COMMON_URL_PREFIX, params.APP_VERSION, link_word, study))
-    response = requests.get(url, headers=params.headers)
-    if response.ok:
-        return json.loads(response.text)
-    if params.debug:
-        print(response, response.text)
-    _err("You don't have access permissions to study: {} or it doesn't exist!"
-         "".format(study), in_red=True)
-    sys.exit(1)
-
-
-def check_study_has_libs_preps(group_acc, samples_group, file_type, params, study):
-    libs_preps = get_libs_preps_by_study(file_type, params, study)
-    # example of libs_preps: [{"itemId":"GSF020175","metadata":{}}]
-    accessions = {item['itemId'] for item in libs_preps}
-    if group_acc not in accessions:
-        raise GroupLinkingError(what=file_type,
-                                accession_to=group_acc,
-                                accession_from=samples_group)
-
-
-def add_and_link_libs_preps(
-        samples_group,
-        metadata_link,
-        file_type,
-        params,
-        study,
-        failures
-):
-    job_info, exists = _async_import(file_type, metadata_link=metadata_link,
-                                     params=params)
-    group_acc = job_info.get(u'result', {}).get(u'groupAccession')
-    if exists:
-        _err("'{}' has already been uploaded as {} group '{}'"
-             "".format(metadata_link, file_type, group_acc))
-        if params.FAIL_IF_FILE_EXISTS:
-            sys.exit(1)
-    else:
-        print("{ft} were added successfully ({ft} group accession is {acc})"
-              "".format(ft=file_type, acc=group_acc))
-    link_by_parent(what="{}_to_samples".format(file_type),
-                   accession_from=group_acc,
-                   accession_to=samples_group,
-                   params=params)
-    try:
-        # TODO remove this check when https://genestack.atlassian.net/browse/ODM-7793 will be fixed
-        check_study_has_libs_preps(group_acc, samples_group, file_type, params, study)
-    except GroupLinkingError as ex:
-        _err("Linking {} ({} to {}) failed"
-             "".format(file_type, group_acc, samples_group), in_red=True)
-        if not params.IGNORE_LINKING_ERRORS:
-            sys.exit(1)
-        failures.append(ex)
-        return group_acc
-    print("Successfully linked: [{}_to_samples]".format(file_type))
-    return group_acc
-
-
-def add_signals(
-        file_signal,
-        file_metadata,
-        file_type,
-        number_of_feature_attributes,
-        data_class,
-        measurement_separator,
-        params):
-    data_link, prev_version = parse_file_signal(file_signal)
-    job_info, signals_exist = _async_import(file_type, metadata_link=file_metadata,
-                                            data_link=data_link,
-                                            prev_version=prev_version,
-                                            number_of_feature_attributes=number_of_feature_attributes,
-                                            data_class=data_class,
-                                            measurement_separator=measurement_separator,
-                                            params=params)
-    group_acc = job_info.get(u'result', {}).get(u'groupAccession')
-    if signals_exist:
-        signal_str = "'{}'".format(file_signal)
-        if file_metadata is not None:
-            signal_str = "'{} + '{}'".format(signal_str, file_metadata)
-        _err("{} {} have already been uploaded as signal group '{}'"
-             "".format(file_type, signal_str, group_acc))
-        if params.FAIL_IF_FILE_EXISTS:
-            sys.exit(1)
-    else:
-        print("{} data were added successfully (group accession is {})"
-              "".format(file_type.replace('-', ' '), group_acc))
-    return group_acc
-
-
-def link_by_parent(what, accession_to, accession_from, params):
-    ''' Link data using new group-centric API '''
-    ENDPOINT_DICT = {
-        'samples_to_study': 'sample/group/{sourceId}/to/study/{targetId}',
-        'libraries_to_samples': 'library/group/{sourceId}/to/sample/group/{targetId}',
-        'preparations_to_samples': 'preparation/group/{sourceId}/to/sample/group/{targetId}',
-        'expression_to_sample': 'expression/group/{sourceId}/to/sample/group/{targetId}',
-        'expression_to_libraries': 'expression/group/{sourceId}/to/library/group/{targetId}',
-        'expression_to_preparations': 'expression/group/{sourceId}/to/preparation/group/{targetId}',
-        'variant_to_sample': 'variant/group/{sourceId}/to/sample/group/{targetId}',
-        # API not yet implemented
-        # 'variant_to_libraries': 'variant/group/{sourceId}/to/library/group/{targetId}',
-        # 'variant_to_preparations': 'variant/group/{sourceId}/to/preparation/group/{targetId}',
-        'flow-cytometry_to_sample': 'flow-cytometry/group/{sourceId}/to/sample/group/{targetId}',
-        # API not yet implemented
-        # 'flow-cytometry_to_libraries':
-        #     'flow_cytometry/group/{sourceId}/to/library/group/{targetId}',
-        # 'flow-cytometry_to_preparations':
-        #     'flow_cytometry/group/{sourceId}/to/preparation/group/{targetId}',
-    }
-    url = '/'.join([params.SERVER, COMMON_URL_PREFIX,
-                    INTEGRATION_PREFIX.rstrip('/') % params.APP_VERSION, ENDPOINT_DICT[what]])
-    response = requests.post(url.format(sourceId=accession_from,
-                                        targetId=accession_to),
-                             headers=params.headers)
-    if response.ok:
-        print("Successfully linked: [{}]".format(what))
-        return
+    def info(self, message):
+        print(self.prefix + message)
 
-    what = what.replace('_', ' ')
-    _err("Linking {what} ({accession_from} to {accession_to}) failed"
-         "".format(**locals()), response=response, in_red=True)
-    raise GroupLinkingError(what=what,
-                            accession_to=accession_to,
-                            accession_from=accession_from)
+    def warning(self, message):
+        _err(self.prefix + message)
 
+    def error(self, error):
+        _err(self.prefix + error.message, response=error.response, in_red=True)
 
-def check_mapping_files_arguments(signal_args):
-    # check if there are no mappings and we can skip the checks
-    if not any(s.startswith("mapping-file") for s in signal_args):
-        return
-    if "expression" not in signal_args:
-        _err("mapping file is supported with expression matrices only",
-             in_red=True)
-        sys.exit(1)
-    mpf_prefix = 'mapping-'
-    mapping_args = collections.Counter(s[len(mpf_prefix):]
-                                       for s in signal_args
-                                       if s.startswith(mpf_prefix))
-    total_mpfiles = mapping_args['file'] + mapping_args['file-accession']
-    if total_mpfiles == 0:
-        # we checked that there's *something* starting with `mpf_prefix`,
-        # and that leaves only metadata
-        _err("the parameter '-mpf' for mapping file loading is missing",
-             in_red=True)
-        sys.exit(1)
-    if total_mpfiles > 1:
-        _err("Only one mapping file is expected, "
-             "check the value of parameters 'mpf' or 'mpfa'",
-             in_red=True)
-        sys.exit(1)
-    if mapping_args["file-metadata"] and mapping_args["file-accession"]:
-        _err("Cannot attach mapping metainfo to an existing mapping file",
-             in_red=True)
-        sys.exit(1)
-    if mapping_args["file_metadata"] > 1:
-        _err("Cannot attach multiple metadata sources to a mapping file",
-             in_red=True)
+    def waiting(self, message):
+        if not self.show_waiting:
+            return
+        if message is None:
+            if self.__waiting:
+                _err('')
+                self.__waiting = False
+            return
+        self.__waiting = True
+        print(message, end='\r', file=sys.stderr)
 
 
 class SaneArgumentParser(argparse.ArgumentParser):
@@ -766,19 +208,19 @@ class SaneArgumentParser(argparse.ArgumentParser):
 
     # pylint: disable-next=redefined-outer-name
     def parse_args(self, args=None, namespace=None):
-        if args is None:
-            # args default to the system args
-            args = []
-            prev = ""
-            for a in sys.argv[1:]:
-                # to bypass a bug in argparse library, add space to the front of the argument
-                if (prev == "-ms" or prev == "--measurement-separator") and a.startswith('-'):
-                    args.append(' ' + a)
-                elif a.startswith('--'):
-                    args.append(a.replace('_', '-'))
-                else:
-                    args.append(a)
-                prev = a
+        # args default to the system args
+        raw_args = sys.argv[1:] if args is None else args
+        args = []
+        prev = ""
+        for a in raw_args:
+            # to bypass a bug in argparse library, add space to the front of the argument
+            if (prev == "-ms" or prev == "--measurement-separator") and a.startswith('-'):
+                args.append(' ' + a)
+            elif a.startswith('--'):
+                args.append(a.replace('_', '-'))
+            else:
+                args.append(a)
+            prev = a
         return super(SaneArgumentParser, self).parse_args(args, namespace)
 
 
@@ -810,6 +252,17 @@ def prevent_redundant_parameters(mutually_exclusive, err_msg):
     return lambda *args, **kwargs: _SingletonAction(mutually_exclusive, err_msg, *args, **kwargs)
 
 
+def positive_int(value):
+    """ Argument type of positive numbers """
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number <= 0:
+        raise argparse.ArgumentTypeError("expected a positive number, got '{}'".format(value))
+    return number
+
+
 class Headers(dict):
     """Derives http-headers from arguments"""
 
@@ -850,36 +303,16 @@ class ParserAstState(object):
         self.current_node = None
 
     def has_libraries_or_preparations(self):
-        all_tags = self.get_all_tags()
-        return not all_tags.isdisjoint(LIB_PREP_TAGS)
+        return has_libraries_or_preparations(self.sample_node_list)
 
     def get_all_tags(self):
-        result = set()
-
-        def get_tags(node):
-            result.add(node['tag'])
-            for child_node in node.get('children', []):
-                get_tags(child_node)
-
-        for node in self.sample_node_list:
-            get_tags(node)
-        return result
+        return get_all_tags(self.sample_node_list)
 
     def has_consistent_data_model(self):
-        if not self.has_libraries_or_preparations():
-            return True
-        # in case libraries or preparations have been passed, all signals
-        # should be linked to them instead of samples
-        for sample_node in self.sample_node_list:
-            for child_node in sample_node.get('children', []):
-                if child_node['tag'] not in LIB_PREP_TAGS:
-                    return False
-        return True
+        return has_consistent_data_model(self.sample_node_list)
 
     def has_non_expression_signals(self):
-        all_tags = self.get_all_tags()
-        return not all_tags.issubset({'samples', 'libraries', 'preparations',
-                                      'expression', 'mapping-file'})
+        return has_non_expression_signals(self.sample_node_list)
 
 
 class BaseCustomAction(argparse.Action):
@@ -1047,366 +480,210 @@ def make_mapping_file_action(parser_state):
     return MappingFileAction
 
 
-def check_and_merge_mapping_file_nodes(signal_nodes):
-    non_mf_nodes_f, mf_nodes_f = partition(
-        lambda node: node['tag'].startswith('mapping-file'),
-        signal_nodes)
-    mf_nodes = list(mf_nodes_f)
-    if len(mf_nodes) == 0:
-        return signal_nodes
-
-    signal_args = []
-    for node in signal_nodes:
-        signal_args.append(node['tag'])
-        signal_args.append(node['value'])
-    check_mapping_files_arguments(signal_args)
-
-    new_mf_node = {'tag': 'mapping-file'}
-    for mf_node in mf_nodes:
-        if mf_node['tag'] == 'mapping-file-metadata':
-            new_mf_node['metadata'] = mf_node['value']
-        else:
-            new_mf_node['value'] = mf_node['value']
-    return list(non_mf_nodes_f) + [new_mf_node]
-
-
-def check_and_merge_mapping_file_in_sample_nodes(sample_nodes):
-    for sample_node in sample_nodes:
-        children = sample_node.get('children', [])
-        children_tags = {child['tag'] for child in children}
-        if children_tags.issubset(LIB_PREP_TAGS):
-            for lib_prep_node in children:
-                if 'children' not in lib_prep_node:
-                    continue
-                signal_nodes = lib_prep_node.get('children')
-                lib_prep_node['children'] = check_and_merge_mapping_file_nodes(signal_nodes)
-        else:
-            if 'children' in sample_node:
-                sample_node['children'] = check_and_merge_mapping_file_nodes(children)
-
-
-def add_signals_to_parent(parent_prep_group, parent_prep_file_type, signal_nodes, signal_cache,
-                          params, failures):
-    expression_accs = []
-    for node in signal_nodes:
-        file_type = node['tag']
-        url = node['value']
-        nfa = node['nfa'] if 'nfa' in node else None
-        data_class = node['dc'] if 'dc' in node else None
-        separator = node['ms'] if 'ms' in node else None
-        metadata = node.get('metadata', None)
-        if file_type in SIGNAL_TAGS:
-            signal_group = signal_cache.get(url, None)
-            if signal_group is None:
-                signal_group = add_signals(file_signal=url,
-                                           file_metadata=metadata,
-                                           file_type=file_type,
-                                           number_of_feature_attributes=nfa,
-                                           data_class=data_class,
-                                           measurement_separator=separator,
-                                           params=params)
-                signal_cache[url] = signal_group
-            if file_type == 'expression':
-                expression_accs.append(signal_group)
-            what = '{}_to_{}'.format(file_type, parent_prep_file_type)
-            try:
-                link_by_parent(what, parent_prep_group, signal_group, params)
-            except GroupLinkingError as ex:
-                if not params.IGNORE_LINKING_ERRORS:
-                    sys.exit(1)
-                failures.append(ex)
-                continue
-        elif file_type == 'mapping-file':
-            # mapping file is always the last node, if present
-            if is_acc(url):
-                map_f_acc = check_mapping_file(url, params)
-            else:
-                map_f_acc = add_mappings(url, params, metadata)
-            for expr_acc in expression_accs:
-                link_mappings(map_f_acc, expr_acc, params)
-
-
-def add_lib_prep(sample_group, nodes, link_cache, params, study, failures):
-    for node in nodes:
-        lib_prep_file_type = node['tag']
-        url = node['value']
-        lib_prep_group = link_cache.get(url, None)
-        if lib_prep_group is None:
-            lib_prep_group = add_and_link_libs_preps(
-                sample_group, url, lib_prep_file_type, params, study, failures
-            )
-            link_cache[url] = lib_prep_group
-        children = node.get('children', [])
-        add_signals_to_parent(
-            lib_prep_group, lib_prep_file_type, children,
-            link_cache, params, failures
-        )
-
-
-def existing_lib_prop(node, signal_cache, params, failures):
-    lib_prep_file_type = node['tag']
-    lib_prep_group = node['value']
-    children = node.get('children', [])
-    add_signals_to_parent(
-        lib_prep_group, lib_prep_file_type, children, signal_cache, params, failures
-    )
-
-
-def handle_lib_prep_case(parser_state, params, study, failures):
-    link_cache = {}
-    for sample_node in parser_state.sample_node_list:
-        value = sample_node['value']
-        libraries_and_preparations = sample_node.get('children', [])
-        if value == 'implicit':
-            assert len(libraries_and_preparations) == 1, \
-                'Internal error: expect only one subnode for implicit sample node'
-            sub_node = libraries_and_preparations[0]
-            existing_lib_prop(sub_node, link_cache, params, failures)
-            return
-
-        if is_acc(value):
-            # existing samples group, expect some libraries and preparations
-            if len(libraries_and_preparations) == 0:
-                print('samples argument {} is ignored'.format(value))
-                return
-            sample_group = value
-        else:
-            try:
-                sample_group = add_and_link_samples(params, study, sample_link=value)
-            except GroupLinkingError as ex:
-                if not params.IGNORE_LINKING_ERRORS:
-                    sys.exit(1)
-                failures.append(ex)
-                continue
-
-        add_lib_prep(
-            sample_group, libraries_and_preparations,
-            link_cache, params, study, failures
-        )
+def do_import(import_params):
+    importer = import_params.make_importer(ConsoleReporter())
+    try:
+        with import_params.client:
+            if import_params.dump_args_as_json:
+                print(json.dumps(importer.prepare(), indent=2))
+                sys.exit(0)
+            result = importer.run()
+    except StudyImportError as e:
+        _err(e.message, response=e.response, in_red=True)
+        sys.exit(1)
 
+    print(green_text(u"Execution is finished!"))
+    if not result.ok:
+        sys.exit(1)
+    return result.study
 
-def handle_samples_signals_case(parser_state, params, study, failures):
-    signal_cache = {}
-    for sample_node in parser_state.sample_node_list:
-        value = sample_node['value']
-        signals = sample_node.get('children', [])
 
-        if is_acc(value):
-            # existing samples group, expect some signals
-            if not signals:
-                _err('No signals provided to link, ignoring `--samples {}`'.format(value))
-                return
-            sample_group = value
+def load_manifest(path):
+    """
+    Load studies of a bulk import from a manifest file, the format is determined
+    by the extension:
+
+    - ``.json``, ``.yaml`` or ``.yml``: a list of studies, or a dictionary
+      with ``studies`` list (PyYAML is required to read YAML);
+    - ``.tsv``: a table with a header, a row per study.
+
+    A study has ``study`` (link to a study metadata file or accession of an existing study),
+    ``arguments`` (import arguments as in the command line, e.g.
+    ``-sm s3://bucket/samples.tsv -e s3://bucket/expression.gct``) and optional ``name``
+    used in messages and in the report. In JSON and YAML ``arguments`` may be a list,
+    or ``samples`` nodes (see :py:class:`odm_sdk.importer.StudyImporter`) may be given
+    instead of them.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in ('.json', '.yaml', '.yml', '.tsv'):
+        _err("Unknown manifest format '{}', expected .json, .yaml or .tsv"
+             "".format(extension), in_red=True)
+        sys.exit(1)
+    with open(path, newline='') as f:
+        if extension == '.json':
+            manifest = json.load(f)
+        elif extension == '.tsv':
+            manifest = list(csv.DictReader(f, delimiter='\t'))
         else:
             try:
-                sample_group = add_and_link_samples(params, study, sample_link=value)
-            except GroupLinkingError as ex:
-                if not params.IGNORE_LINKING_ERRORS:
-                    sys.exit(1)
-                failures.append(ex)
-                continue
-
-        add_signals_to_parent(
-            sample_group, 'sample', signals, signal_cache, params, failures
-        )
+                import yaml
+            except ImportError:
+                _err("PyYAML is not installed, it is required to read YAML manifests",
+                     in_red=True)
+                sys.exit(1)
+            manifest = yaml.safe_load(f)
+    if isinstance(manifest, dict):
+        manifest = manifest.get('studies')
+    if not isinstance(manifest, list) or not all(isinstance(e, dict) for e in manifest):
+        _err("Manifest '{}' should contain a list of studies".format(path), in_red=True)
+        sys.exit(1)
+    return manifest
 
 
-def check_for_repeated_links(link, nodes, links_cache):
-    links_cache[link] = 'study'
-    for node in nodes:
-        value = node['value']
-        tag = node['tag']
-        value = None if value == 'implicit' else value
-        if value is not None:
-            if value in links_cache:
-                _err('Duplicate link or accession: --{} {}'.format(tag, value), in_red=True)
-                sys.exit(1)
-            links_cache[value] = tag
-        meta = node.get('metainfo', None)
-        if meta is not None:
-            if meta in links_cache:
-                _err('Duplicate link or accession: --{} {}'.format(tag, meta), in_red=True)
-                sys.exit(1)
-            else:
-                links_cache[meta] = tag
-        children = node.get('children', [])
-        check_for_repeated_links(link, children, links_cache)
+NODE_TAGS = {'samples', 'mapping-file'} | LIB_PREP_TAGS | SIGNAL_TAGS
 
 
-def collect_all_nodes_by_tag(nodes, filter_tag_fun):
-    result = []
+def check_sample_nodes(nodes, where):
+    """ Exit if ``samples`` nodes of a manifest are not nodes with tags and values """
+    if not isinstance(nodes, list):
+        _err("{}: samples should be a list of nodes".format(where), in_red=True)
+        sys.exit(1)
     for node in nodes:
-        if filter_tag_fun(node['tag']):
-            result.append(node)
-        children = node.get('children', [])
-        result = result + collect_all_nodes_by_tag(children, filter_tag_fun)
-    return result
-
-
-def collect_all_mapping_file_nodes(nodes):
-    return collect_all_nodes_by_tag(
-        nodes,
-        lambda x: x.startswith('mapping-file')
-    )
-
-
-def add_all_signal_args_to_all_lib_preps(sample_nodes):
-    all_libs_preps = collect_all_nodes_by_tag(
-        sample_nodes,
-        lambda x: x in LIB_PREP_TAGS
-    )
-    all_signal_nodes = collect_all_nodes_by_tag(
-        sample_nodes,
-        lambda x: x in SIGNAL_TAGS
-    )
-    mapping_file_nodes = collect_all_mapping_file_nodes(sample_nodes)
-    for libs_preps_node in all_libs_preps:
-        libs_preps_node['children'] = copy.deepcopy(all_signal_nodes)
-    for sample_node in sample_nodes:
-        sample_node['children'] = copy.deepcopy(all_libs_preps)
-    if mapping_file_nodes:
-        sample_node = sample_nodes[0]
-        libs_preps_node = sample_node['children'][0]
-        libs_preps_node['children'] = all_signal_nodes + mapping_file_nodes
-
-
-def add_all_signal_args_to_all_samples(sample_nodes):
-    all_signal_nodes = collect_all_nodes_by_tag(
-        sample_nodes,
-        lambda x: x in SIGNAL_TAGS
-    )
-    for sample_node in sample_nodes:
-        children = sample_node.get('children', [])
-        non_signal_children = [node for node in children if node['tag'] not in SIGNAL_TAGS]
-        sample_node['children'] = all_signal_nodes + non_signal_children
-
-
-def check_signal_versions(study_acc, parent_accession, parent_tag, signals):
-    """ Perform basic validation of signal versioning arguments
-    Updating version is allowed when:
-    - study already exists
-    - samples already exist
-    - designated previous version of signal object appears only once in a
-      script call
-    """
-    prev_versions = set()
-    for signal_node in signals:
-        value = signal_node['value']
-        _, prev_version = parse_file_signal(value)
-        if prev_version is None:
-            continue
-        if study_acc is None:
-            _err("Previous versions cannot be specified when creating new studies, "
-                 "only for signal group objects of existing studies",
+        if not isinstance(node, dict) or not all(isinstance(node.get(key), str) and node[key]
+                                                 for key in ('tag', 'value')):
+            _err("{}: node {!r} should have 'tag' and 'value'".format(where, node),
                  in_red=True)
             sys.exit(1)
-        if parent_accession is None:
-            _err("Previous versions cannot be specified when creating new {0}, "
-                 "only for signal group objects of existing {0}".format(parent_tag),
-                 in_red=True)
-            sys.exit(1)
-        if prev_version in prev_versions:
-            _err("It is not possible to import a new version of an existing "
-                 "signal group object version ('{}') more than once "
-                 "in the same script call".format(prev_version),
-                 in_red=True)
+        if node['tag'] not in NODE_TAGS:
+            _err("{}: unknown tag '{}'".format(where, node['tag']), in_red=True)
             sys.exit(1)
-        prev_versions.add(prev_version)
-
+        check_sample_nodes(node.get('children', []), where)
 
-def check_signal_versions_libs_preps(sample_nodes, study_acc):
-    for sample_node in sample_nodes:
-        libs_preps = sample_node.get('children', [])
-        for libs_preps_node in libs_preps:
-            value = libs_preps_node['value']
-            parent_accession = value if is_acc(value) else None
-            parent_tag = libs_preps_node['tag']
-            signals = [node for node in libs_preps_node.get('children', [])
-                       if node['tag'] in SIGNAL_TAGS]
-            check_signal_versions(study_acc, parent_accession, parent_tag, signals)
 
-
-def check_signal_versions_samples(sample_nodes, study_acc):
-    for sample_node in sample_nodes:
-        value = sample_node['value']
-        parent_accession = value if is_acc(value) else None
-        parent_tag = sample_node['tag']
-        signals = [node for node in sample_node.get('children', []) if node['tag'] in SIGNAL_TAGS]
-        check_signal_versions(study_acc, parent_accession, parent_tag, signals)
-
-
-def do_import(import_params):
-    parser_args_state = import_params.parser_args_state
-    if not (import_params.SERVER.startswith("https://") or import_params.SERVER.startswith("http://")):
-        _err("The server url should start with 'http' or 'https'")
-        sys.exit(1)
-    if not (import_params.study_link or import_params.study_accession):
-        _err("No study link or accession was provided", in_red=True)
-        sys.exit(1)
-    if import_params.study_link and import_params.study_accession:
-        _err("You need to provide either study link or accession", in_red=True)
-        sys.exit(1)
-
-    check_for_repeated_links(
-        import_params.study_link,
-        parser_args_state.sample_node_list,
-        links_cache={}
-    )
-
-    # If the option LINK_SIGNALS_TO_ALL_SAMPLES is set, we try to modify
-    # the arguments in such a way as to conform to the behaviour, which is described in
-    # ODM-7826.
-    # The subsequent code actually works with repeated links for signal data
-
-    if import_params.LINK_SIGNALS_TO_ALL_SAMPLES:
-        if parser_args_state.has_libraries_or_preparations():
-            add_all_signal_args_to_all_lib_preps(parser_args_state.sample_node_list)
-        else:
-            add_all_signal_args_to_all_samples(parser_args_state.sample_node_list)
-
-    check_and_merge_mapping_file_in_sample_nodes(parser_args_state.sample_node_list)
-
-    mapping_files_number = len(collect_all_mapping_file_nodes(parser_args_state.sample_node_list))
-    if import_params.LINK_SIGNALS_TO_ALL_SAMPLES and mapping_files_number > 1:
-        _err('Only one mapping file is expected with link-all-to-all option', in_red=True)
-        sys.exit(1)
-
-    if (parser_args_state.has_libraries_or_preparations()
-            and parser_args_state.has_non_expression_signals()):
-        _err('the linkage between libraries/preparations and variants/flow-cytometry '
-             'is not supported', in_red=True)
+def parse_manifest_entry(args, manifest_path, number, entry):
+    """
+    Return name, command line arguments and parser state of a study of a manifest;
+    ``args`` are the arguments of the bulk import.
+    """
+    where = "{}, study #{}".format(manifest_path, number)
+    study = (entry.get('study') or '').strip()
+    if not study:
+        _err("{}: no study link or accession".format(where), in_red=True)
         sys.exit(1)
-
-    if not parser_args_state.has_consistent_data_model():
-        _err('inconsistent data model', in_red=True)
+    if entry.get('samples') and entry.get('arguments'):
+        _err("{}: provide either samples or arguments".format(where), in_red=True)
         sys.exit(1)
-
-    if parser_args_state.has_libraries_or_preparations():
-        check_signal_versions_libs_preps(
-            parser_args_state.sample_node_list,
-            import_params.study_accession
-        )
+    study_args = argparse.Namespace(**vars(args))
+    study_args.study_link = None if is_acc(study) else study
+    study_args.study_accession = study if is_acc(study) else None
+    parser_args_state = ParserAstState()
+    if entry.get('samples'):
+        check_sample_nodes(entry['samples'], where)
+        parser_args_state.sample_node_list = entry['samples']
     else:
-        check_signal_versions_samples(
-            parser_args_state.sample_node_list,
-            import_params.study_accession
-        )
-
-    if import_params.dump_args_as_json:
-        print(json.dumps(parser_args_state.sample_node_list, indent=2))
+        arguments = entry.get('arguments') or []
+        if isinstance(arguments, str):
+            arguments = shlex.split(arguments)
+        parser = SaneArgumentParser(prog=where, add_help=False)
+        add_data_arguments(parser, parser_args_state)
+        parser.parse_args([str(argument) for argument in arguments])
+    return entry.get('name') or study, study_args, parser_args_state
+
+
+def print_summary(outcomes):
+    imported = sum(1 for outcome in outcomes if outcome.ok)
+    print("Imported {} of {} studies".format(imported, len(outcomes)))
+    for outcome in outcomes:
+        if outcome.error is not None:
+            status, study, errors = 'FAILED', '', [outcome.error]
+        else:
+            status = 'OK' if outcome.result.ok else 'LINKING ERRORS'
+            study, errors = outcome.result.study, outcome.result.failures
+        print(u"\t".join([outcome.name, status, study] +
+                         [getattr(e, 'message', str(e)) for e in errors]))
+
+
+def make_report(outcomes):
+    """ Return JSON report of a bulk import """
+    report = []
+    for outcome in outcomes:
+        result = outcome.result
+        errors = [outcome.error] if outcome.error is not None else result.failures
+        report.append({
+            'name': outcome.name,
+            'ok': outcome.ok,
+            'study': result and result.study,
+            'groups': [{'kind': group.kind, 'link': group.link,
+                        'accession': group.accession, 'existed': group.existed}
+                       for group in (result.groups if result else [])],
+            'links': [list(link) for link in (result.links if result else [])],
+            'errors': [getattr(e, 'message', str(e)) for e in errors],
+        })
+    return report
+
+
+def do_bulk_import(args):
+    """
+    Import all studies of the manifest, up to ``args.MAX_STUDIES`` at once,
+    print summary and write report; exit with code 1 if any study has failed.
+    """
+    entries = [parse_manifest_entry(args, args.MANIFEST, number, entry)
+               for number, entry in enumerate(load_manifest(args.MANIFEST), 1)]
+    headers = Headers(args)
+    # the default template is requested once for all new studies
+    new_study_template_supplier = None
+    max_workers = args.MAX_WORKERS or DEFAULT_MAX_WORKERS
+    # all studies share the connections
+    client = RestClient(args.SERVER.rstrip('/'), headers, DEFAULT_RETRY_POLICY,
+                        pool_maxsize=get_pool_size(max_workers, args.MAX_STUDIES),
+                        debug=args.debug)
+    checkpoint = ImportCheckpoint(args.CHECKPOINT) if args.CHECKPOINT else None
+    importers = []
+    for name, study_args, parser_args_state in entries:
+        template_accession_supplier = None
+        if study_args.study_link:
+            if new_study_template_supplier is None:
+                new_study_template_supplier = TemplateAccessionSupplier(study_args, client)
+            template_accession_supplier = new_study_template_supplier
+        import_params = ImportParams.from_parsed_params(
+            study_args, parser_args_state, headers=headers,
+            template_accession_supplier=template_accession_supplier, client=client,
+            checkpoint=checkpoint)
+        reporter = ConsoleReporter(prefix=u"[{}] ".format(name), show_waiting=False)
+        importers.append((name, import_params.make_importer(reporter)))
+
+    # check all studies before importing any of them
+    prepared = []
+    for name, importer in importers:
+        try:
+            prepared.append({'name': name, 'samples': importer.prepare()})
+        except StudyImportError as e:
+            _err(u"[{}] {}".format(name, e.message), in_red=True)
+            sys.exit(1)
+    if args.dump_args_as_json:
+        print(json.dumps(prepared, indent=2))
         sys.exit(0)
 
-    study = add_study(params=import_params)
-    failures = []
-    if parser_args_state.has_libraries_or_preparations():
-        handle_lib_prep_case(parser_args_state, import_params, study, failures)
-    else:
-        handle_samples_signals_case(parser_args_state, import_params, study, failures)
+    finished = []
 
-    print(green_text(u"Execution is finished!"))
-    if failures:
+    def on_finished(outcome):
+        finished.append(outcome)
+        progress = u"[{}] ({}/{}) ".format(outcome.name, len(finished), len(importers))
+        if outcome.error is None:
+            print(green_text(progress + u"Execution is finished!"))
+        else:
+            _err(progress + getattr(outcome.error, 'message', str(outcome.error)),
+                 response=getattr(outcome.error, 'response', None), in_red=True)
+
+    with client:
+        outcomes = import_studies(importers, args.MAX_STUDIES, on_finished)
+    print_summary(outcomes)
+    if args.REPORT:
+        with open(args.REPORT, 'w') as f:
+            json.dump(make_report(outcomes), f, indent=2)
+    if not all(outcome.ok for outcome in outcomes):
         sys.exit(1)
-    return study
+    return outcomes
 
 
 class ImportParams:
@@ -1429,8 +706,14 @@ class ImportParams:
             link_signals_to_all_samples=False,
             ignore_linking_errors=False,
             job_timeout=ETL_WAITING_TIMEOUT,
+            max_workers=DEFAULT_MAX_WORKERS,
             debug=False,
             dump_args_as_json=False,
+            retry_policy=DEFAULT_RETRY_POLICY,
+            # client to share connections with other imports, a new one by default
+            client=None,
+            # checkpoint to skip the steps finished by a previous run
+            checkpoint=None,
             # provide dedicated links to entities
             # or parser_args_state, containing any of them
             # (used for command line call, wider functionality is supported)
@@ -1459,8 +742,10 @@ class ImportParams:
         self.LINK_SIGNALS_TO_ALL_SAMPLES = link_signals_to_all_samples
         self.IGNORE_LINKING_ERRORS = ignore_linking_errors
         self.JOB_TIMEOUT = job_timeout
+        self.MAX_WORKERS = max_workers
         self.debug = debug
         self.dump_args_as_json = dump_args_as_json
+        self.retry_policy = retry_policy
         if headers is not None:
             self.headers = headers
         elif token is not None:
@@ -1470,6 +755,12 @@ class ImportParams:
         else:
             _err("You should either provide headers or genestack api token")
             sys.exit(1)
+        if client is None:
+            client = RestClient(self.SERVER, self.headers, retry_policy,
+                                pool_maxsize=get_pool_size(max_workers or DEFAULT_MAX_WORKERS),
+                                debug=debug)
+        self.client = client
+        self.checkpoint = checkpoint
         if not parser_args_state:
             parser_args_state = ImportParams._fill_parser_from_args(
                 samples_link, libraries_link, preparations_link,
@@ -1479,6 +770,32 @@ class ImportParams:
             )
         self.parser_args_state = parser_args_state
 
+    def make_importer(self, reporter=None):
+        """
+        Return importer of the study described by the parameters.
+
+        :param reporter: receiver of progress messages
+        :type reporter: odm_sdk.importer.ImportReporter
+        :rtype: odm_sdk.importer.StudyImporter
+        """
+        return StudyImporter(
+            self.client,
+            study_link=self.study_link,
+            study_accession=self.study_accession,
+            sample_nodes=self.parser_args_state.sample_node_list,
+            app_version=self.APP_VERSION,
+            etl_source=self.ETL_SOURCE,
+            template_accession=self.TEMPLATE_ACCESSION_SUPPLIER,
+            allow_duplicates=self.ALLOW_DUPLICATES,
+            fail_if_file_exists=self.FAIL_IF_FILE_EXISTS,
+            link_signals_to_all_samples=self.LINK_SIGNALS_TO_ALL_SAMPLES,
+            ignore_linking_errors=self.IGNORE_LINKING_ERRORS,
+            job_timeout=self.JOB_TIMEOUT,
+            max_workers=self.MAX_WORKERS or DEFAULT_MAX_WORKERS,
+            reporter=reporter,
+            checkpoint=self.checkpoint
+        )
+
     @staticmethod
     def _fill_parser_from_args(
             samples_link,
@@ -1576,15 +893,23 @@ class ImportParams:
         return parser_args_state
 
     @classmethod
-    def from_parsed_params(cls, args, parser_args_state):
-        return cls(
+    def from_parsed_params(cls, args, parser_args_state, headers=None,
+                           template_accession_supplier=None, client=None, checkpoint=None):
+        """
+        Return parameters of the import described by the command line arguments.
+        Headers, template accession supplier, client and checkpoint are shared by the studies
+        of a bulk import, they are created from the arguments by default.
+        """
+        if checkpoint is None and args.CHECKPOINT:
+            checkpoint = ImportCheckpoint(args.CHECKPOINT)
+        import_params = cls(
             server=args.SERVER,
-            headers=Headers(args),
+            headers=headers or Headers(args),
             study_link=args.study_link,
             study_accession=args.study_accession,
             app_version=args.APP_VERSION,
             etl_source=args.ETL_SOURCE,
-            template_accession_supplier=TemplateAccessionSupplier(args),
+            template_accession_supplier=template_accession_supplier,
             allow_duplicates=args.ALLOW_DUPLICATES,
             number_of_feature_attributes=args.NUMBER_OF_FEATURE_ATTRIBUTES,
             data_class=args.DATA_CLASS,
@@ -1593,69 +918,22 @@ class ImportParams:
             link_signals_to_all_samples=args.LINK_SIGNALS_TO_ALL_SAMPLES,
             ignore_linking_errors=args.IGNORE_LINKING_ERRORS,
             job_timeout=args.JOB_TIMEOUT,
+            max_workers=args.MAX_WORKERS,
             debug=args.debug,
             dump_args_as_json=args.dump_args_as_json,
+            client=client,
+            checkpoint=checkpoint,
             parser_args_state=parser_args_state
         )
+        if template_accession_supplier is None:
+            # the default template is requested with the client of the import
+            import_params.TEMPLATE_ACCESSION_SUPPLIER = TemplateAccessionSupplier(
+                args, import_params.client)
+        return import_params
 
 
-def main():
-    parser_args_state = ParserAstState()
-    parser = SaneArgumentParser(description=__doc__,
-                                epilog="Old style options using underscores "
-                                       "(e.g., '--link_all_to_all') are still supported, "
-                                       "but considered obsolete",
-                                formatter_class=argparse.RawDescriptionHelpFormatter)
-    parser.add_argument("-t", "--token",
-                        action=prevent_redundant_parameters(("API_TOKEN", "ACCESS_TOKEN"),
-                                                        "only one token can be specified. "
-                                                        "Please choose the authentication method: "
-                                                        "through the Access Token or "
-                                                        "through the Genestack-API-token"),
-                        dest="API_TOKEN",
-                        nargs="?",
-                        help="API_TOKEN")
-    parser.add_argument("-at", "--access-token",
-                        action=prevent_redundant_parameters(("API_TOKEN", "ACCESS_TOKEN"),
-                                                        "only one token can be specified. "
-                                                        "Please choose the authentication method: "
-                                                        "through the Access Token or "
-                                                        "through the Genestack-API-token"),
-                        dest="ACCESS_TOKEN",
-                        nargs="?",
-                        help="ACCESS_TOKEN")
-    parser.add_argument("-H", "--host", "-srv", "--server",
-                        action=_StoreServerName,
-                        const="https://odm-demos.genestack.com/",
-                        default="https://odm-demos.genestack.com/",
-                        nargs="?",
-                        dest="SERVER",
-                        help="URL of the instance data is being loaded to")
-    parser.add_argument("-tmpl", "--template",
-                        action="store",
-                        const=None,
-                        default=None,
-                        nargs="?",
-                        dest="TEMPLATE_ACCESSION",
-                        help="Accession of the template, by default will use "
-                             "template marked as default.")
-    parser.add_argument("--debug",
-                        action="store",
-                        const=True,
-                        default=False,
-                        nargs="?",
-                        dest="debug",
-                        help="Enable debug mode.")
-    parser.add_argument("-s", "--study",
-                        action=prevent_redundant_parameters(('study_link', 'study_accession'),
-                            "provide exactly one study via a link or an existing study accession"),
-                        dest="study_link",
-                        help="link to study file")
-    parser.add_argument("-sa", "--study-accession",
-                        action=prevent_redundant_parameters(('study_link', 'study_accession'),
-                            "provide exactly one study via a link or an existing study accession"),
-                        dest="study_accession",
-                        help="accession of existing study")
+def add_data_arguments(parser, parser_args_state):
+    """ Add arguments describing samples and the data linked to them """
     parser.add_argument("-sm", "--samples",
                         action=make_samples_action(parser_args_state),
                         dest="data",
@@ -1663,12 +941,6 @@ def main():
                         nargs="?",
                         help="existing sample group accession "
                              "or link to file with sample data")
-    parser.add_argument("-la", "--link-attribute",
-                        # "Attribute to link data with sample source"
-                        # linking by group does not support custom linking attribute
-                        # it's left for compatibility reasons
-                        action=DeprecatedAction,
-                        help=argparse.SUPPRESS)
     parser.add_argument("-lb", "--libraries",
                         action=make_libraries_and_preparations_action(parser_args_state),
                         dest="data",
@@ -1756,6 +1028,72 @@ def main():
                         metavar="MAPPING_FILE_METADATA_LINK",
                         help="link to metadata file for this mapping file",
                         nargs="?")
+
+
+def main():
+    parser_args_state = ParserAstState()
+    parser = SaneArgumentParser(description=__doc__,
+                                epilog="Old style options using underscores "
+                                       "(e.g., '--link_all_to_all') are still supported, "
+                                       "but considered obsolete",
+                                formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-t", "--token",
+                        action=prevent_redundant_parameters(("API_TOKEN", "ACCESS_TOKEN"),
+                                                        "only one token can be specified. "
+                                                        "Please choose the authentication method: "
+                                                        "through the Access Token or "
+                                                        "through the Genestack-API-token"),
+                        dest="API_TOKEN",
+                        nargs="?",
+                        help="API_TOKEN")
+    parser.add_argument("-at", "--access-token",
+                        action=prevent_redundant_parameters(("API_TOKEN", "ACCESS_TOKEN"),
+                                                        "only one token can be specified. "
+                                                        "Please choose the authentication method: "
+                                                        "through the Access Token or "
+                                                        "through the Genestack-API-token"),
+                        dest="ACCESS_TOKEN",
+                        nargs="?",
+                        help="ACCESS_TOKEN")
+    parser.add_argument("-H", "--host", "-srv", "--server",
+                        action=_StoreServerName,
+                        const="https://odm-demos.genestack.com/",
+                        default="https://odm-demos.genestack.com/",
+                        nargs="?",
+                        dest="SERVER",
+                        help="URL of the instance data is being loaded to")
+    parser.add_argument("-tmpl", "--template",
+                        action="store",
+                        const=None,
+                        default=None,
+                        nargs="?",
+                        dest="TEMPLATE_ACCESSION",
+                        help="Accession of the template, by default will use "
+                             "template marked as default.")
+    parser.add_argument("--debug",
+                        action="store",
+                        const=True,
+                        default=False,
+                        nargs="?",
+                        dest="debug",
+                        help="Enable debug mode.")
+    parser.add_argument("-s", "--study",
+                        action=prevent_redundant_parameters(('study_link', 'study_accession'),
+                            "provide exactly one study via a link or an existing study accession"),
+                        dest="study_link",
+                        help="link to study file")
+    parser.add_argument("-sa", "--study-accession",
+                        action=prevent_redundant_parameters(('study_link', 'study_accession'),
+                            "provide exactly one study via a link or an existing study accession"),
+                        dest="study_accession",
+                        help="accession of existing study")
+    parser.add_argument("-la", "--link-attribute",
+                        # "Attribute to link data with sample source"
+                        # linking by group does not support custom linking attribute
+                        # it's left for compatibility reasons
+                        action=DeprecatedAction,
+                        help=argparse.SUPPRESS)
+    add_data_arguments(parser, parser_args_state)
     parser.add_argument("-av", "--app-version",
                         action="store",
                         default="default-released",
@@ -1768,6 +1106,10 @@ def main():
                         metavar="TIMEOUT-SECONDS", type=int, default=ETL_WAITING_TIMEOUT,
                         help="time to wait for import jobs to finish (in seconds), "
                              "defaults to %(default)s")
+    parser.add_argument("-w", "--max-workers", dest="MAX_WORKERS",
+                        metavar="NUMBER", type=positive_int, default=DEFAULT_MAX_WORKERS,
+                        help="maximum number of requests (job submissions, links) sent "
+                             "to the server at once, defaults to %(default)s")
     parser.add_argument("--import-source", dest="ETL_SOURCE", metavar="PROTOCOL",
                         choices=ETL_SOURCES,
                         help="protocol (source) for server to fetch data; valid choices are: {}\n"
@@ -1786,6 +1128,10 @@ def main():
                         default=False,
                         help="To allow the script to continue even if errors "
                              "linking study, samples and signal files occur")
+    parser.add_argument("--checkpoint", dest="CHECKPOINT", metavar="PATH",
+                        help="record imported files and created links in the file, "
+                             "so that a rerun of an interrupted import skips them "
+                             "without requests to the server")
     parser.add_argument('-J', '--dump-args-as-json',
                         action="store_true",
                         default=False,
@@ -1799,8 +1145,23 @@ def main():
                                 action='store_true',
                                 help=("exit if the file being imported already exists on the "
                                       "server (default is to re-use existing file)"))
+    bulk_args = parser.add_argument_group("bulk import")
+    bulk_args.add_argument("--manifest", dest="MANIFEST", metavar="PATH",
+                           help="import studies listed in a JSON, YAML or TSV manifest file, "
+                                "instead of a single study given by the arguments")
+    bulk_args.add_argument("--max-studies", dest="MAX_STUDIES", metavar="NUMBER",
+                           type=positive_int, default=DEFAULT_MAX_STUDIES,
+                           help="maximum number of studies of the manifest imported at once, "
+                                "defaults to %(default)s")
+    bulk_args.add_argument("--report", dest="REPORT", metavar="PATH",
+                           help="write JSON report on the studies of the manifest to the file")
     args = parser.parse_args()
 
+    if args.MANIFEST:
+        if args.study_link or args.study_accession or parser_args_state.sample_node_list:
+            parser.error("study and data arguments cannot be used with --manifest")
+        do_bulk_import(args)
+        return
     do_import(ImportParams.from_parsed_params(args, parser_args_state))
 
 
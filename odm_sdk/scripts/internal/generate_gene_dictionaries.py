@@ -12,6 +12,8 @@ import time
 from collections import defaultdict
 from subprocess import check_call
 
+from odm_sdk.retry import RetryPolicy
+
 # This script combines code from initialise_raw_gene_dictionary.py and gene_dictionary_creation.py,
 # previously located in unified repo. Look up their history there for reference.
 # It primarily adapts initialise_raw_gene_dictionary.py, excluding the use of raw file metadata.
@@ -157,23 +159,23 @@ def get_ensembl_organisms():
 
 def multiple_attempts(exception_to_raise, max_attempts=3, delay=3, backoff=1):
     """A decorator to retry a function call many times."""
+    retry_policy = RetryPolicy(max_attempts=max_attempts + 1, backoff_factor=delay,
+                               backoff_multiplier=backoff, max_backoff=None, jitter=False)
 
     def _multiple_attempts(function):
         def wrapper(*args, **kwargs):
             n_attempts = 0
-            next_attempt_delay = delay
             while True:
                 try:
                     return function(*args, **kwargs)
                 except Exception as e:
                     n_attempts += 1
-                    if n_attempts > max_attempts:
+                    if n_attempts >= retry_policy.max_attempts:
                         if exception_to_raise:
                             print("Received exception: %s" % e)
                             raise exception_to_raise
                         raise
-                    time.sleep(next_attempt_delay)
-                    next_attempt_delay *= backoff
+                    time.sleep(retry_policy.get_delay(n_attempts))
                     print("Retrying...")
 
         return wrapper
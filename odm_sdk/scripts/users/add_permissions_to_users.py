@@ -108,12 +108,24 @@ def main():
     non_existing_permissions = check_all_permissions_id_exists_in_odm(connection, users_for_updating)
     all_permissions_exist = len(non_existing_permissions) == 0
 
-    for user in users_for_updating:
-        add_permissions(connection, user["email"], user["permissions"])
+    with connection.batch() as batch:
+        scheduled = [(user["email"], batch.submit(add_permissions, connection, user["email"],
+                                                  user["permissions"]))
+                     for user in users_for_updating]
+
+    all_permissions_added = True
+    for email, future in scheduled:
+        if future.exception() is not None:
+            all_permissions_added = False
+            print(colored("Failed to add permissions to user %s: %s" % (email, future.exception()),
+                          RED))
 
-    if all_permissions_exist and all_users_exist:
+    if all_permissions_added and all_permissions_exist and all_users_exist:
         print(colored("Success", GREEN))
     else:
+        if not all_permissions_added:
+            print(colored("Some permissions have not been added, rerun this script with the same "
+                          "input file", RED))
         if not all_permissions_exist:
             print(colored("Permissions %s don't exist" % non_existing_permissions, RED))
         if not all_users_exist:
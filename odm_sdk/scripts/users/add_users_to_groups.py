@@ -33,19 +33,21 @@ def add_group_member(connection, group_accession, email):
         'addMemberToGroup', group_accession, email)
 
 
-def add_user_to_groups(connection, user, non_existing_groups,
+def add_user_to_groups(batch, connection, user, non_existing_groups,
                        existing_group_names_and_user_emails, group_names_and_accessions):
+    """Schedule adding of the user to groups, return list of pairs (group, future)."""
     email = user.get("email")
     groups = user.get("groups")
+    scheduled = []
     for group in groups:
         if group not in non_existing_groups:
             if email not in existing_group_names_and_user_emails[group]:
-                add_group_member(connection, group_names_and_accessions[group], email)
-                print(colored("Added user %s to group %s" % (email, group),
-                              GREEN))
+                scheduled.append((group, batch.submit(add_group_member, connection,
+                                                      group_names_and_accessions[group], email)))
             else:
                 print(colored("User %s already belongs to group %s" % (email, group),
                               BLUE))
+    return scheduled
 
 
 def read_data_for_adding_users(args, unique_group_names):
@@ -126,14 +128,29 @@ def main():
                                                  unique_group_names)
     all_groups_exist = len(non_existing_groups) == 0
 
-    for user in all_users_to_be_added:
-        if user['email'] not in non_existing_emails:
-            add_user_to_groups(connection, user, non_existing_groups,
-                               existing_group_names_and_user_emails, group_names_and_accessions)
+    scheduled = []
+    with connection.batch() as batch:
+        for user in all_users_to_be_added:
+            if user['email'] not in non_existing_emails:
+                scheduled += [(user['email'], group, future) for group, future in add_user_to_groups(
+                    batch, connection, user, non_existing_groups,
+                    existing_group_names_and_user_emails, group_names_and_accessions)]
+
+    all_members_added = True
+    for email, group, future in scheduled:
+        if future.exception() is None:
+            print(colored("Added user %s to group %s" % (email, group), GREEN))
+        else:
+            all_members_added = False
+            print(colored("Failed to add user %s to group %s: %s" % (email, group, future.exception()),
+                          RED))
 
-    if all_groups_exist and all_users_exist:
+    if all_members_added and all_groups_exist and all_users_exist:
         print(colored("Success", GREEN))
     else:
+        if not all_members_added:
+            print(colored("Some users have not been added, rerun this script with the same "
+                          "input file", RED))
         if not all_groups_exist:
             print(colored("Groups %s don't exist" % non_existing_groups, RED))
         if not all_users_exist:
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import sys
+import time
+
+from odm_sdk import Connection
+
+SESSION_CACHE_ENV = 'GENESTACK_SESSION_CACHE'
+DEFAULT_MAX_AGE = 24 * 60 * 60
+
+_SESSIONS_DIR = 'sessions'
+
+
+def is_session_cache_enabled():
+    """
+    Return ``True`` if the session cache is turned on by ``GENESTACK_SESSION_CACHE``
+    environment variable.
+
+    :rtype: bool
+    """
+    return os.environ.get(SESSION_CACHE_ENV, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _sha256(value):
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+class SessionCache(object):
+    """
+    Stores session cookies of logged in connections on disk, so that short-lived
+    processes of the same user can reuse one server session instead of logging in
+    and out every time.
+
+    Sessions are keyed by host and user alias (or a hash of the token for users without
+    an alias) and stored in the ``sessions`` subfolder of the settings folder, readable
+    only by the owner. A cached session is used until it is older than ``max_age``;
+    if the server rejects it earlier, the connection logs in again and updates the cache.
+    Connections restored from the cache do not sign out when they are garbage collected.
+    """
+
+    def __init__(self, folder=None, max_age=DEFAULT_MAX_AGE):
+        """
+        :param folder: folder to store sessions, by default
+                       ``sessions`` subfolder of the settings folder
+        :type folder: str
+        :param max_age: maximum age of a reused session, in seconds
+        :type max_age: float
+        """
+        if folder is None:
+            from odm_sdk.settings.config import config
+            folder = os.path.join(config.get_settings_folder(), _SESSIONS_DIR)
+        self.folder = folder
+        self.max_age = max_age
+
+    @staticmethod
+    def get_identity(user):
+        """
+        Return the part of the cache key identifying the user, or ``None`` if the user
+        cannot be identified before login.
+
+        :param user: user
+        :type user: odm_sdk.settings.User
+        :rtype: str
+        """
+        if user.alias:
+            return user.alias
+        secret = user.token or user.access_token
+        if secret:
+            return 'token:' + _sha256(secret)
+        return None
+
+    def __get_path(self, host, identity):
+        return os.path.join(self.folder, _sha256('%s\0%s' % (host, identity)) + '.json')
+
+    def load(self, host, identity, **connection_kwargs):
+        """
+        Return a connection with a cached session, or ``None`` if there is no valid session.
+
+        :param host: host of the user
+        :type host: str
+        :param identity: user identity, see :py:meth:`get_identity`
+        :type identity: str
+        :param connection_kwargs: arguments of :py:class:`~odm_sdk.Connection`
+        :rtype: odm_sdk.Connection
+        """
+        path = self.__get_path(host, identity)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('host') != host or entry.get('identity') != identity:
+            return None
+        if time.time() - entry.get('created', 0) > self.max_age:
+            self.remove(host, identity)
+            return None
+        now = time.time()
+        cookies = [c for c in entry.get('cookies', [])
+                   if c.get('expires') is None or c['expires'] > now]
+        if not cookies:
+            return None
+        connection = Connection(entry['server_url'], logout_on_delete=False, **connection_kwargs)
+        for cookie in cookies:
+            connection.session.cookies.set(
+                cookie['name'], cookie['value'], domain=cookie['domain'], path=cookie['path'],
+                secure=cookie['secure'], expires=cookie['expires'])
+        return connection
+
+    def save(self, host, identity, connection):
+        """
+        Store the session of a logged in connection. The connection will not sign out
+        when it is garbage collected.
+
+        :param host: host of the user
+        :type host: str
+        :param identity: user identity, see :py:meth:`get_identity`
+        :type identity: str
+        :param connection: logged in connection
+        :type connection: odm_sdk.Connection
+        :rtype: None
+        """
+        connection.logout_on_delete = False
+        if not connection.session.cookies:
+            return
+        entry = {
+            'host': host,
+            'identity': identity,
+            'server_url': connection.server_url,
+            'created': time.time(),
+            'cookies': [{'name': c.name, 'value': c.value, 'domain': c.domain, 'path': c.path,
+                         'secure': c.secure, 'expires': c.expires}
+                        for c in connection.session.cookies],
+        }
+        path = self.__get_path(host, identity)
+        tmp_path = '%s.%s.tmp' % (path, os.getpid())
+        try:
+            os.makedirs(self.folder, mode=0o700, exist_ok=True)
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+            # atomic, so that concurrent processes never read a partially written file
+            os.replace(tmp_path, path)
+        except OSError as e:
+            sys.stderr.write('Cannot save session to %s: %s\n' % (path, e))
+
+    def remove(self, host, identity):
+        """
+        Remove a cached session.
+
+        :param host: host of the user
+        :type host: str
+        :param identity: user identity, see :py:meth:`get_identity`
+        :type identity: str
+        :rtype: None
+        """
+        try:
+            os.remove(self.__get_path(host, identity))
+        except OSError:
+            pass
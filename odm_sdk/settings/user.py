@@ -91,22 +91,62 @@ class User(object):
         self.token = token
         self.access_token = access_token
 
-    def get_connection(self, interactive=True, debug=False, show_logs=False):
+    def get_connection(self, interactive=True, debug=False, show_logs=False, session_cache=None):
         """
         Return a logged-in connection for current user.
         If ``interactive`` is ``True`` and the password or email are unknown,
         they will be asked in interactive mode.
 
+        With the session cache, a session stored by a previous call (possibly in another
+        process) is reused instead of logging in, see
+        :py:class:`~odm_sdk.settings.session_cache.SessionCache`.
+
         :param interactive: ask email and/or password interactively.
         :type interactive: bool
         :param debug: print stack trace in case of exception
         :type debug: bool
         :param show_logs: print application logs (received from server)
         :type show_logs: bool
+        :param session_cache: ``True`` to use the default session cache, or a cache instance;
+                              by default the cache is used if ``GENESTACK_SESSION_CACHE``
+                              environment variable is set to ``1``
+        :type session_cache: bool|odm_sdk.settings.session_cache.SessionCache
         :return: logged connection
         :rtype: odm_sdk.Connection
         """
-        connection = Connection(_get_server_url(self.host), debug=debug, show_logs=show_logs)
+        from odm_sdk.settings.session_cache import SessionCache, is_session_cache_enabled
+
+        if session_cache is None:
+            session_cache = is_session_cache_enabled()
+        if session_cache is True:
+            session_cache = SessionCache()
+        identity = SessionCache.get_identity(self) if session_cache else None
+        if identity is None:
+            connection = Connection(_get_server_url(self.host), debug=debug, show_logs=show_logs)
+            self.__login(connection, interactive)
+            return connection
+
+        connection = session_cache.load(self.host, identity, debug=debug, show_logs=show_logs)
+        if connection is None:
+            connection = Connection(_get_server_url(self.host), debug=debug, show_logs=show_logs)
+            self.__login(connection, interactive)
+            if not self.__has_credentials():
+                # logged in anonymously
+                return connection
+            session_cache.save(self.host, identity, connection)
+
+        def reauthenticate():
+            connection.session.cookies.clear()
+            self.__login(connection, interactive=False)
+            session_cache.save(self.host, identity, connection)
+
+        connection.reauthenticate = reauthenticate
+        return connection
+
+    def __has_credentials(self):
+        return bool(self.token or self.access_token or (self.email and self.password))
+
+    def __login(self, connection, interactive):
         if self.token:
             connection.login_by_token(self.token)
         elif self.access_token:
@@ -117,7 +157,6 @@ class User(object):
             self.__interactive_login(connection)
         #else:
         #    raise GenestackException('Not enough user data to login')
-        return connection
 
     def __repr__(self):
         return "User('%s', alias='%s', host='%s', password='%s', token='%s')" % (
@@ -0,0 +1,52 @@
+import asyncio
+import unittest
+
+import requests_mock
+
+from odm_sdk import AsyncConnection, FilesUtil, GenestackServerException
+
+SERVER_URL = "https://dummy.genestack.com/frontend/endpoint"
+INVOKE_PATH = SERVER_URL + "/application/invoke"
+
+
+class AsyncConnectionTest(unittest.TestCase):
+
+    @requests_mock.Mocker()
+    def test_concurrent_invokes(self, m):
+        whoami = m.post(f"{INVOKE_PATH}/genestack/signin/whoami",
+                        json={"result": "user@genestack.com", "log": []})
+
+        async def whoami_many():
+            async with AsyncConnection(SERVER_URL, max_connections=4) as connection:
+                return await asyncio.gather(*(connection.whoami() for _ in range(10)))
+
+        self.assertEqual(["user@genestack.com"] * 10, asyncio.run(whoami_many()))
+        self.assertEqual(10, whoami.call_count)
+
+    @requests_mock.Mocker()
+    def test_server_error_is_raised(self, m):
+        m.post(f"{INVOKE_PATH}/genestack/app/fail", json={"error": "Boom", "result": None})
+
+        async def invoke():
+            async with AsyncConnection(SERVER_URL) as connection:
+                await connection.application("genestack/app").invoke("fail")
+
+        with self.assertRaises(GenestackServerException) as cm:
+            asyncio.run(invoke())
+        self.assertEqual("Boom", cm.exception.message)
+
+    @requests_mock.Mocker()
+    def test_application_class_methods_are_coroutines(self, m):
+        m.post(f"{INVOKE_PATH}/genestack/filesUtil/getFileByName",
+               json={"result": "GSF000001", "log": []})
+
+        async def find_file_by_name():
+            async with AsyncConnection(SERVER_URL) as connection:
+                files_util = connection.application(application_class=FilesUtil)
+                return await files_util.find_file_by_name("reads.fastq")
+
+        self.assertEqual("GSF000001", asyncio.run(find_file_by_name()))
+
+
+if __name__ == '__main__':
+    unittest.main()
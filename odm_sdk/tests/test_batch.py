@@ -0,0 +1,41 @@
+import unittest
+
+import requests_mock
+
+from odm_sdk import Connection, GenestackException, GenestackServerException
+
+SERVER_URL = "https://dummy.genestack.com/frontend/endpoint"
+INVOKE_PATH = SERVER_URL + "/application/invoke/genestack/groupsadmin-api"
+
+
+class BatchTest(unittest.TestCase):
+
+    @requests_mock.Mocker()
+    def test_errors_are_isolated_per_call(self, m):
+        def add_member(request, context):
+            group, email = request.json()
+            if email == "unknown@genestack.com":
+                return {"error": "User not found", "result": None, "log": []}
+            return {"result": group, "log": []}
+
+        m.post(f"{INVOKE_PATH}/addMemberToGroup", json=add_member)
+        connection = Connection(SERVER_URL)
+        emails = ["alice@genestack.com", "unknown@genestack.com", "bob@genestack.com"]
+        with connection.batch(max_in_flight=2) as batch:
+            futures = [batch.invoke("genestack/groupsadmin-api", "addMemberToGroup", "GSG1", email)
+                       for email in emails]
+
+        self.assertEqual("GSG1", futures[0].result())
+        with self.assertRaises(GenestackServerException):
+            futures[1].result()
+        self.assertEqual("GSG1", futures[2].result())
+        self.assertEqual(futures, batch.futures)
+
+    def test_batch_requires_context_manager(self):
+        batch = Connection(SERVER_URL).batch()
+        with self.assertRaises(GenestackException):
+            batch.invoke("genestack/groupsadmin-api", "getData")
+
+
+if __name__ == '__main__':
+    unittest.main()
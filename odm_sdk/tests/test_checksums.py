@@ -0,0 +1,124 @@
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+import zlib
+from unittest import mock
+
+import requests_mock
+
+from odm_sdk import Connection, GenestackException
+from odm_sdk.checksums import (HashingReader, compute_file_checksum, crc32_combine,
+                               get_checksum)
+from odm_sdk.chunked_upload import AimdConcurrency, ChunkedUpload
+from odm_sdk.multipart import FileRange
+from odm_sdk.retry import RetryPolicy
+from odm_sdk.tests.test_multipart import parse
+
+SERVER_URL = "https://dummy.genestack.com/frontend/endpoint"
+UPLOAD_PATH = SERVER_URL + "/application/uploadChunked/genestack/upload/unusedToken"
+DATA = bytes(range(256)) * 4
+
+
+class ChecksumsTest(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.write(fd, DATA)
+        os.close(fd)
+        self.application = Connection(SERVER_URL).application('genestack/upload')
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_crc32_combine(self):
+        for split in (0, 1, 100, 1023, 1024):
+            first, second = DATA[:split], DATA[split:]
+            self.assertEqual(zlib.crc32(DATA),
+                             crc32_combine(zlib.crc32(first), zlib.crc32(second), len(second)))
+
+    def test_hashing_reader(self):
+        fd = os.open(self.path, os.O_RDONLY)
+        self.addCleanup(os.close, fd)
+        reader = HashingReader(FileRange(fd, 0, len(DATA)), get_checksum('md5'))
+        reader.read(10)
+        with self.assertRaises(GenestackException):
+            reader.hexdigest()
+        reader.seek(0)
+        while reader.read(100):
+            pass
+        self.assertEqual(hashlib.md5(DATA).hexdigest(), reader.hexdigest())
+        self.assertEqual(hashlib.md5(DATA).hexdigest(), compute_file_checksum(self.path))
+
+    def test_unknown_checksum(self):
+        with self.assertRaises(GenestackException):
+            get_checksum('sha3')
+
+    @requests_mock.Mocker()
+    def test_chunks_are_sent_with_checksums(self, m):
+        def upload(request, context):
+            parts = parse(request.headers['Content-Type'], request.body.read())
+            self.assertEqual(b'crc32', parts['resumableChecksumAlgorithm'])
+            checksum = '%08x' % zlib.crc32(parts['file'])
+            self.assertEqual(checksum.encode(), parts['resumableChunkChecksum'])
+            last = parts['resumableChunkNumber'] == b'4'
+            return {"lastChunkUploaded": last, "result": "GSF000001",
+                    "chunkChecksum": checksum}
+
+        m.get(UPLOAD_PATH, status_code=204)
+        m.post(UPLOAD_PATH, json=upload)
+        chunked_upload = ChunkedUpload(self.application, self.path, chunk_size=256,
+                                       checksum='crc32')
+        self.assertEqual("GSF000001", chunked_upload.upload())
+        self.assertEqual('%08x' % zlib.crc32(DATA), chunked_upload.file_checksum)
+
+    @requests_mock.Mocker()
+    def test_checksum_mismatch_is_retried(self, m):
+        def corrupted_upload(request, context):
+            request.body.read()
+            return {"lastChunkUploaded": False, "chunkChecksum": "00000000"}
+
+        m.get(UPLOAD_PATH, status_code=204)
+        upload = m.post(UPLOAD_PATH, json=corrupted_upload)
+        chunked_upload = ChunkedUpload(self.application, self.path, checksum='crc32',
+                                       retry_policy=RetryPolicy(max_attempts=3, backoff_factor=0))
+        chunked_upload.concurrency = AimdConcurrency(initial=1, maximum=1)
+        with self.assertRaisesRegex(GenestackException, 'Checksum mismatch'):
+            chunked_upload.upload()
+        self.assertEqual(3, upload.call_count)
+
+    @requests_mock.Mocker()
+    def test_checksum_mismatch_of_last_chunk_fails(self, m):
+        def corrupted_upload(request, context):
+            request.body.read()
+            return {"lastChunkUploaded": True, "result": "GSF000001",
+                    "chunkChecksum": "00000000"}
+
+        m.get(UPLOAD_PATH, status_code=204)
+        upload = m.post(UPLOAD_PATH, json=corrupted_upload)
+        chunked_upload = ChunkedUpload(self.application, self.path, checksum='crc32',
+                                       retry_policy=RetryPolicy(max_attempts=3, backoff_factor=0))
+        with self.assertRaisesRegex(GenestackException, 'Checksum mismatch'):
+            chunked_upload.upload()
+        # the file has been assembled by the server, sending the chunk again does not help
+        self.assertEqual(1, upload.call_count)
+
+    @requests_mock.Mocker()
+    def test_missing_server_checksum_is_reported(self, m):
+        def upload(request, context):
+            last = parse(request.headers['Content-Type'],
+                         request.body.read())['resumableChunkNumber'] == b'4'
+            return {"lastChunkUploaded": last, "result": "GSF000001"}
+
+        m.get(UPLOAD_PATH, status_code=204)
+        m.post(UPLOAD_PATH, json=upload)
+        chunked_upload = ChunkedUpload(self.application, self.path, chunk_size=256,
+                                       checksum='crc32')
+        with mock.patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            self.assertEqual("GSF000001", chunked_upload.upload())
+        self.assertEqual(1, stderr.getvalue().count('are not verified'))
+
+
+if __name__ == '__main__':
+    unittest.main()
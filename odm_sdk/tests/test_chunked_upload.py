@@ -0,0 +1,160 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import requests_mock
+
+from odm_sdk import Connection, GenestackException, RetryPolicy
+from odm_sdk.chunked_upload import AimdConcurrency, ChunkedUpload, choose_chunk_size
+from odm_sdk.upload_journal import UploadJournal
+
+SERVER_URL = "https://dummy.genestack.com/frontend/endpoint"
+UPLOAD_PATH = SERVER_URL + "/application/uploadChunked/genestack/upload/unusedToken"
+MB = 1024 * 1024
+
+
+class ChunkedUploadTest(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.write(fd, b'x' * 1000)
+        os.close(fd)
+        self.application = Connection(SERVER_URL).application('genestack/upload')
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_last_chunk_takes_remainder(self):
+        upload = ChunkedUpload(self.application, self.path, chunk_size=300)
+        self.assertEqual(3, upload.chunk_count)
+        self.assertEqual([300, 300, 400], [chunk.size for chunk in upload.iterator])
+
+    def test_choose_chunk_size(self):
+        self.assertEqual(5 * MB, choose_chunk_size(1000))
+        self.assertEqual(11 * MB, choose_chunk_size(10 * 1024 * MB))
+        self.assertEqual(64 * MB, choose_chunk_size(100 * 1024 * MB))
+
+    @requests_mock.Mocker()
+    def test_adaptive_upload(self, m):
+        m.get(UPLOAD_PATH, status_code=204)
+        responses = [{'json': {"lastChunkUploaded": False}}] * 9
+        responses.append({'json': {"lastChunkUploaded": True, "result": "GSF000001"}})
+        upload = m.post(UPLOAD_PATH, responses)
+        chunked_upload = ChunkedUpload(self.application, self.path, chunk_size=100, adaptive=True)
+        chunked_upload.concurrency = AimdConcurrency(initial=1, maximum=1)
+        self.assertEqual("GSF000001", chunked_upload.upload())
+        self.assertEqual(10, upload.call_count)
+
+    @requests_mock.Mocker()
+    def test_progress_is_reported_by_calling_thread(self, m):
+        m.get(UPLOAD_PATH, status_code=204)
+        m.post(UPLOAD_PATH, [{'json': {"lastChunkUploaded": False}}] * 9 +
+               [{'json': {"lastChunkUploaded": True, "result": "GSF000001"}}])
+        chunked_upload = ChunkedUpload(self.application, self.path, chunk_size=100,
+                                       adaptive=True, max_threads=32)
+        chunked_upload.concurrency = AimdConcurrency(initial=32, maximum=32)
+        threads = set()
+        sizes = []
+
+        def progress(name, size, total):
+            threads.add(threading.get_ident())
+            sizes.append(size)
+
+        chunked_upload.progress = progress
+        self.assertEqual("GSF000001", chunked_upload.upload())
+        self.assertEqual({threading.get_ident()}, threads)
+        self.assertEqual(1000, sum(sizes))
+
+    @requests_mock.Mocker()
+    def test_cancel_stops_retry_delay(self, m):
+        m.get(UPLOAD_PATH, status_code=204)
+        post = m.post(UPLOAD_PATH, status_code=503)
+        upload = ChunkedUpload(self.application, self.path, chunk_size=1000,
+                               retry_policy=RetryPolicy(backoff_factor=30))
+        chunk = upload.next_chunk()
+        results = []
+        upload.open()
+        self.addCleanup(upload.close)
+        worker = threading.Thread(target=lambda: results.append(upload.send_chunk(chunk)))
+        worker.start()
+        while not post.called:
+            time.sleep(0.01)
+        upload.cancel()
+        worker.join(5)
+        self.assertFalse(worker.is_alive())
+        self.assertEqual([None], [result.error for result in results])
+
+    @requests_mock.Mocker()
+    def test_upload_is_resumed_from_journal(self, m):
+        journal_folder = tempfile.TemporaryDirectory()
+        self.addCleanup(journal_folder.cleanup)
+        journal = UploadJournal(os.path.join(journal_folder.name, 'uploads.sqlite'))
+        self.addCleanup(journal.close)
+        check = m.get(UPLOAD_PATH, status_code=204)
+        m.post(UPLOAD_PATH, [{'json': {"lastChunkUploaded": False}},
+                             {'status_code': 400, 'json': {"error": "Boom"}}])
+        upload = ChunkedUpload(self.application, self.path, chunk_size=250, journal=journal)
+        upload.concurrency = AimdConcurrency(initial=1, maximum=1)
+        with self.assertRaises(GenestackException):
+            upload.upload()
+        self.assertEqual(2, check.call_count)
+
+        m.post(UPLOAD_PATH, [{'json': {"lastChunkUploaded": False}}] * 2 +
+               [{'json': {"lastChunkUploaded": True, "result": "GSF000001"}}])
+        resumed = ChunkedUpload(self.application, self.path, chunk_size=250, journal=journal)
+        resumed.concurrency = AimdConcurrency(initial=1, maximum=1)
+        self.assertEqual(250, resumed.completed_size)
+        self.assertEqual("GSF000001", resumed.upload())
+        checked_chunks = [request.qs['resumablechunknumber'] for request in check.request_history]
+        self.assertEqual([['1'], ['2'], ['2'], ['3'], ['4']], checked_chunks)
+        launch_times = {request.qs['launchtime'][0] for request in check.request_history}
+        self.assertEqual(1, len(launch_times))
+
+    @requests_mock.Mocker()
+    def test_default_journal_is_closed(self, m):
+        journal_folder = tempfile.TemporaryDirectory()
+        self.addCleanup(journal_folder.cleanup)
+        journal = UploadJournal(os.path.join(journal_folder.name, 'uploads.sqlite'))
+        m.get(UPLOAD_PATH, status_code=204)
+        m.post(UPLOAD_PATH, [{'json': {"lastChunkUploaded": False}},
+                             {'status_code': 400, 'json': {"error": "Boom"}}])
+        with mock.patch('odm_sdk.chunked_upload.UploadJournal', return_value=journal), \
+                mock.patch.object(journal, 'close', wraps=journal.close) as close:
+            upload = ChunkedUpload(self.application, self.path, chunk_size=250, journal=True)
+            upload.concurrency = AimdConcurrency(initial=1, maximum=1)
+            with self.assertRaises(GenestackException):
+                upload.upload()
+        close.assert_called_once_with()
+
+
+class AimdConcurrencyTest(unittest.TestCase):
+
+    def test_failure_halves_limit(self):
+        concurrency = AimdConcurrency(initial=8, maximum=16)
+        concurrency.on_failure()
+        self.assertEqual(4, concurrency.limit)
+        for _ in range(5):
+            concurrency.on_failure()
+        self.assertEqual(1, concurrency.limit)
+
+    def test_limit_grows_with_throughput(self):
+        concurrency = AimdConcurrency(initial=2, maximum=3)
+        for _ in range(2):
+            concurrency.on_success(MB, 0.1)
+        self.assertEqual(3, concurrency.limit)
+        for _ in range(3):
+            concurrency.on_success(MB, 0.1)
+        self.assertEqual(3, concurrency.limit)
+
+    def test_slow_chunk_decreases_limit(self):
+        concurrency = AimdConcurrency(initial=8, maximum=16)
+        concurrency.on_success(MB, 0.1)
+        concurrency.on_success(MB, 1)
+        self.assertEqual(4, concurrency.limit)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import gzip
+import json
+import unittest
+
+import requests_mock
+
+from odm_sdk import Connection, GenestackServerException
+
+SERVER_URL = "https://dummy.genestack.com/frontend/endpoint"
+
+
+class ConnectionPoolTest(unittest.TestCase):
+
+    def test_pool_options_are_applied(self):
+        connection = Connection(SERVER_URL, pool_maxsize=32, pool_block=True, keep_alive=False)
+        for session in (connection.session, connection._get_session):
+            adapter = session.get_adapter(SERVER_URL)
+            self.assertEqual(32, adapter._pool_maxsize)
+            self.assertTrue(adapter._pool_block)
+            self.assertEqual('close', session.headers['Connection'])
+
+    @requests_mock.Mocker()
+    def test_get_request_shares_session_cookies(self, m):
+        m.get(f"{SERVER_URL}/application/uploadChunked/genestack/upload/unusedToken", text="")
+        connection = Connection(SERVER_URL)
+        connection.session.cookies.set('JSESSIONID', 'session-id')
+        connection.get_request('/application/uploadChunked/genestack/upload/unusedToken',
+                               params={'resumableChunkNumber': 1}, follow=False)
+        self.assertEqual('JSESSIONID=session-id', m.last_request.headers['Cookie'])
+
+
+class StreamingInvokeTest(unittest.TestCase):
+
+    @requests_mock.Mocker()
+    def test_invoke_stream(self, m):
+        m.post(f"{SERVER_URL}/application/invoke/genestack/filesUtil/collectMetainfos",
+               json={"result": [{"genestack:name": "a"}, {"genestack:name": "b"}], "log": []})
+        application = Connection(SERVER_URL).application('genestack/filesUtil')
+        self.assertEqual([{"genestack:name": "a"}, {"genestack:name": "b"}],
+                         list(application.invoke_stream('collectMetainfos', ['GSF1', 'GSF2'])))
+
+    @requests_mock.Mocker()
+    def test_invoke_stream_raises_server_error(self, m):
+        m.post(f"{SERVER_URL}/application/invoke/genestack/filesUtil/collectMetainfos",
+               json={"result": None, "error": "Boom", "log": []})
+        application = Connection(SERVER_URL).application('genestack/filesUtil')
+        with self.assertRaises(GenestackServerException):
+            list(application.invoke_stream('collectMetainfos', ['GSF1']))
+
+
+class CompressionTest(unittest.TestCase):
+
+    INVOKE_PATH = f"{SERVER_URL}/application/invoke/genestack/filesUtil/linkFiles"
+
+    @requests_mock.Mocker()
+    def test_large_body_is_compressed(self, m):
+        link = m.post(self.INVOKE_PATH, json={"result": None, "log": []})
+        connection = Connection(SERVER_URL, compression='gzip', compression_threshold=1024)
+        children = {'GSF%06d' % i: 'GSF000000' for i in range(1000)}
+        connection.application('genestack/filesUtil').invoke('linkFiles', children)
+        request = link.last_request
+        self.assertEqual('gzip', request.headers['Content-Encoding'])
+        self.assertEqual([children], json.loads(gzip.decompress(request.body)))
+
+    @requests_mock.Mocker()
+    def test_small_body_is_not_compressed(self, m):
+        link = m.post(self.INVOKE_PATH, json={"result": None, "log": []})
+        connection = Connection(SERVER_URL, compression='gzip', compression_threshold=1024)
+        connection.application('genestack/filesUtil').invoke('linkFiles', {'GSF1': 'GSF2'})
+        self.assertNotIn('Content-Encoding', link.last_request.headers)
+
+    @requests_mock.Mocker()
+    def test_unsupported_compression_is_turned_off(self, m):
+        link = m.post(self.INVOKE_PATH, [
+            {'status_code': 415},
+            {'json': {"result": None, "log": []}},
+            {'json': {"result": None, "log": []}},
+        ])
+        connection = Connection(SERVER_URL, compression='gzip', compression_threshold=0)
+        application = connection.application('genestack/filesUtil')
+        application.invoke('linkFiles', {'GSF1': 'GSF2'})
+        application.invoke('linkFiles', {'GSF1': 'GSF2'})
+        self.assertEqual(3, link.call_count)
+        self.assertEqual([{'GSF1': 'GSF2'}], json.loads(link.request_history[1].body))
+        self.assertNotIn('Content-Encoding', link.last_request.headers)
+        self.assertIsNone(connection.compressor)
+
+
+if __name__ == '__main__':
+    unittest.main()
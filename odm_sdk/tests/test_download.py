@@ -0,0 +1,114 @@
+import hashlib
+import os
+import re
+import tempfile
+import time
+import unittest
+
+import requests_mock
+
+from odm_sdk import Connection, GenestackException, RetryPolicy
+
+SERVER_URL = "https://dummy.genestack.com/frontend/endpoint"
+FILE_PATH = "/files/reads.fastq"
+DATA = bytes(range(256)) * 40
+
+
+class DownloadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        self.destination = os.path.join(self.folder.name, 'reads.fastq')
+        self.connection = Connection(SERVER_URL)
+        self.requested = []
+        self.truncate = set()
+        self.fail = set()
+        self.unavailable = set()
+
+    def serve(self, request, context):
+        start, end = map(int, re.match(r'bytes=(\d+)-(\d+)', request.headers['Range']).groups())
+        self.assertEqual('identity', request.headers['Accept-Encoding'])
+        self.requested.append(start)
+        if start in self.fail:
+            context.status_code = 404
+            return b''
+        if start in self.unavailable:
+            context.status_code = 503
+            return b''
+        end = min(end, len(DATA) - 1)
+        context.status_code = 206
+        context.headers['Content-Range'] = 'bytes %s-%s/%s' % (start, end, len(DATA))
+        context.headers['ETag'] = '"v1"'
+        body = DATA[start:end + 1]
+        if start in self.truncate:
+            self.truncate.remove(start)
+            return body[:len(body) // 2]
+        return body
+
+    def download(self, **kwargs):
+        kwargs.setdefault('part_size', 1000)
+        kwargs.setdefault('retry_policy', RetryPolicy(backoff_factor=0))
+        return self.connection.download_file(FILE_PATH, self.destination, show_progress=False,
+                                             **kwargs)
+
+    def read(self):
+        with open(self.destination, 'rb') as f:
+            return f.read()
+
+    @requests_mock.Mocker()
+    def test_parallel_download(self, m):
+        m.get(SERVER_URL + FILE_PATH, content=self.serve)
+        self.download(checksum=hashlib.md5(DATA).hexdigest())
+        self.assertEqual(DATA, self.read())
+        self.assertEqual(['reads.fastq'], os.listdir(self.folder.name))
+        self.assertEqual(11 + 1, len(self.requested))
+
+    @requests_mock.Mocker()
+    def test_interrupted_part_is_continued(self, m):
+        m.get(SERVER_URL + FILE_PATH, content=self.serve)
+        self.truncate.add(2000)
+        self.download()
+        self.assertEqual(DATA, self.read())
+        self.assertIn(2500, self.requested)
+
+    @requests_mock.Mocker()
+    def test_download_is_resumed(self, m):
+        m.get(SERVER_URL + FILE_PATH, content=self.serve)
+        self.fail.add(5000)
+        with self.assertRaises(GenestackException):
+            self.download(max_workers=1)
+        self.assertTrue(os.path.exists(self.destination + '.part.json'))
+
+        self.fail.clear()
+        del self.requested[:]
+        self.download(max_workers=1)
+        self.assertEqual(DATA, self.read())
+        self.assertEqual([0, 5000, 6000, 7000, 8000, 9000, 10000], self.requested)
+
+    @requests_mock.Mocker()
+    def test_failure_stops_retry_delays(self, m):
+        m.get(SERVER_URL + FILE_PATH, content=self.serve)
+        self.unavailable.add(2000)
+        self.fail.add(3000)
+        started = time.monotonic()
+        with self.assertRaises(GenestackException):
+            self.download(max_workers=2, retry_policy=RetryPolicy(backoff_factor=30))
+        self.assertLess(time.monotonic() - started, 10)
+
+    @requests_mock.Mocker()
+    def test_checksum_mismatch(self, m):
+        m.get(SERVER_URL + FILE_PATH, content=self.serve)
+        with self.assertRaisesRegex(GenestackException, 'Checksum mismatch'):
+            self.download(checksum='0' * 32)
+        self.assertEqual([], os.listdir(self.folder.name))
+
+    @requests_mock.Mocker()
+    def test_server_without_ranges(self, m):
+        m.get(SERVER_URL + FILE_PATH, content=DATA)
+        self.download()
+        self.assertEqual(DATA, self.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,20 @@
+import argparse
+import json
+import os
+import re
 import sys
+import tempfile
 import unittest
 from contextlib import contextmanager
 from io import StringIO
+from unittest import mock
 
 import requests_mock
 
-from odm_sdk.scripts.import_ODM_data import ImportParams, do_import
+from odm_sdk import RetryPolicy
+from odm_sdk.rest_client import RestClient
+from odm_sdk.scripts.import_ODM_data import (ImportParams, do_import, load_manifest, main,
+                                             parse_manifest_entry)
 
 JOB_API_PATH = "frontend/rs/genestack/job/default-released"
 INTEGRATION_LINK_PATH = "frontend/rs/genestack/integrationCurator/default-released/integration/link"
@@ -91,6 +100,28 @@ class ImportTest(unittest.TestCase):
         error_text = err.getvalue().strip()
         self.assertEqual('Please provide template accession when using Access Token', error_text)
 
+    @requests_mock.Mocker()
+    def test_default_template_is_requested_with_client(self, m):
+        srv = "https://dummy.genestack.com"
+        invoke_path = f"{srv}/frontend/endpoint/application/invoke/genestack"
+        m.post(f"{invoke_path}/signin/authenticateByApiToken",
+               json={"result": {"authenticated": True}})
+        templates = m.post(f"{invoke_path}/study-metainfotemplateeditor/listTemplates", [
+            {"status_code": 503},
+            {"json": {"result": [{"accession": "GSF000002"},
+                                 {"accession": "GSF000003", "isDefault": True}]}}])
+        args = _MockArgs({
+            "API_TOKEN": "aToken",
+            "SERVER": srv,
+            "study_link": "https://provided.link"
+        })
+        client = RestClient(srv, {"Genestack-API-Token": "aToken"},
+                            RetryPolicy(backoff_factor=0))
+        import_params = ImportParams.from_parsed_params(args, None, client=client)
+        self.assertEqual("GSF000003", import_params.TEMPLATE_ACCESSION_SUPPLIER())
+        self.assertEqual(2, templates.call_count)
+        self.assertEqual("aToken", templates.last_request.headers["Genestack-API-Token"])
+
     def test_ImportParams_constructed_with_token(self):
         ip = ImportParams(server="https://dummy",
                           token="aToken",
@@ -181,6 +212,171 @@ class ImportTest(unittest.TestCase):
                          linking_error_message)
         self.assertIn("504 Gateway Time-out", linking_server_response)
 
+    @requests_mock.Mocker()
+    def test_independent_jobs_are_tracked_together(self, m):
+        srv = "https://dummy.genestack.com"
+        m.get(f"{srv}/frontend/rs/genestack/studyUser/default-released/studies/GSF000001")
+        m.post(f"{srv}/{JOB_API_PATH}/import/samples/", json={"jobExecId": 2})
+        m.post(f"{srv}/{JOB_API_PATH}/import/expression/", [{"json": {"jobExecId": 3}},
+                                                             {"json": {"jobExecId": 4}}])
+        for job_id in (2, 3, 4):
+            m.get(f"{srv}/{JOB_API_PATH}/{job_id}/info", json={"status": "COMPLETED"})
+            m.get(f"{srv}/{JOB_API_PATH}/{job_id}/output",
+                  json={"result": {"groupAccession": f"GSF00000{job_id}"}})
+        # the first expression import is the slowest one
+        m.get(f"{srv}/{JOB_API_PATH}/3/info", [{"json": {"status": "RUNNING"}},
+                                                {"json": {"status": "COMPLETED"}}])
+        m.post(f"{srv}/{INTEGRATION_LINK_PATH}/sample/group/GSF000002/to/study/GSF000001")
+        signal_links = m.post(re.compile(f"{INTEGRATION_LINK_PATH}/expression/"))
+
+        parser_state = ImportParams._fill_parser_from_args(
+            "s3://bucket/samples.tsv", None, None, "s3://bucket/e1.gct",
+            None, None, None, None, None)
+        parser_state.sample_node_list[0]['children'].append(
+            {'tag': 'expression', 'value': 's3://bucket/e2.gct'})
+        with captured_output() as (out, err):
+            study = do_import(ImportParams(
+                server=srv,
+                headers={"Genestack-API-Token": "aToken"},
+                study_accession="GSF000001",
+                parser_args_state=parser_state
+            ))
+        self.assertEqual("GSF000001", study)
+        urls = [request.method + " " + request.path for request in m.request_history]
+        samples_output = urls.index(f"GET /{JOB_API_PATH}/2/output")
+        expression_imports = [index for index, url in enumerate(urls)
+                              if url.endswith("/import/expression/")]
+        # signals are imported after the samples, and both jobs are submitted at once
+        self.assertEqual(2, len(expression_imports))
+        self.assertLess(samples_output, min(expression_imports))
+        first_poll = min(index for index, url in enumerate(urls)
+                         if re.search("/[34]/info$", url))
+        self.assertLess(max(expression_imports), first_poll)
+        # the slow job is polled again after the server did not hold the request
+        self.assertEqual(2, urls.count(f"GET /{JOB_API_PATH}/3/info"))
+        for job_id in (2, 3, 4):
+            self.assertEqual(1, urls.count(f"GET /{JOB_API_PATH}/{job_id}/output"))
+        self.assertEqual(2, signal_links.call_count)
+        self.assertIn("Execution is finished!", out.getvalue())
+
+    @requests_mock.Mocker()
+    def test_steps_depending_on_failed_link_are_skipped(self, m):
+        srv = "https://dummy.genestack.com"
+        m.get(f"{srv}/frontend/rs/genestack/studyUser/default-released/studies/GSF000001")
+        m.post(f"{srv}/{JOB_API_PATH}/import/samples/", json={"jobExecId": 2})
+        m.post(f"{srv}/{JOB_API_PATH}/import/expression/", [{"json": {"jobExecId": 3}},
+                                                             {"json": {"jobExecId": 4}}])
+        for job_id in (2, 3, 4):
+            m.get(f"{srv}/{JOB_API_PATH}/{job_id}/info", json={"status": "COMPLETED"})
+            m.get(f"{srv}/{JOB_API_PATH}/{job_id}/output",
+                  json={"result": {"groupAccession": f"GSF00000{job_id}"}})
+        m.post(f"{srv}/{INTEGRATION_LINK_PATH}/sample/group/GSF000002/to/study/GSF000001",
+               status_code=500)
+        signal_links = m.post(re.compile(f"{INTEGRATION_LINK_PATH}/expression/"))
+
+        parser_state = ImportParams._fill_parser_from_args(
+            "s3://bucket/samples.tsv", None, None, "s3://bucket/e1.gct",
+            None, None, None, None, None)
+        parser_state.sample_node_list[0]['children'].append(
+            {'tag': 'expression', 'value': 's3://bucket/e2.gct'})
+        with self.assertRaises(SystemExit) as cm, captured_output() as (out, err):
+            do_import(ImportParams(
+                server=srv,
+                headers={"Genestack-API-Token": "aToken"},
+                study_accession="GSF000001",
+                ignore_linking_errors=True,
+                parser_args_state=parser_state
+            ))
+        self.assertEqual(1, cm.exception.code)
+        self.assertIn("Linking samples to study (GSF000002 to GSF000001) failed", err.getvalue())
+        self.assertIn("Execution is finished!", out.getvalue())
+        # signals are imported, but not linked to the samples which are not linked
+        self.assertEqual(0, signal_links.call_count)
+        imports = [r.url.rsplit('/', 2)[1] for r in m.request_history if '/import/' in r.url]
+        self.assertEqual(['expression', 'expression', 'samples'], sorted(imports))
+
+    @requests_mock.Mocker()
+    def test_manifest_import(self, m):
+        srv = "https://dummy.genestack.com"
+
+        def submit_samples(request, context):
+            # s3://bucket/samples-N.tsv is imported by job 1N
+            return {"jobExecId": 10 + int(request.json()["metadataLink"][-5])}
+
+        m.get(re.compile(f"{srv}/frontend/rs/genestack/studyUser/"))
+        m.post(f"{srv}/{JOB_API_PATH}/import/samples/", json=submit_samples)
+        for job_id in (11, 12):
+            m.get(f"{srv}/{JOB_API_PATH}/{job_id}/info", json={"status": "COMPLETED"})
+            m.get(f"{srv}/{JOB_API_PATH}/{job_id}/output",
+                  json={"result": {"groupAccession": f"GSF0000{job_id}"}})
+        m.post(f"{srv}/{INTEGRATION_LINK_PATH}/sample/group/GSF000011/to/study/GSF000001")
+        m.post(f"{srv}/{INTEGRATION_LINK_PATH}/sample/group/GSF000012/to/study/GSF000002",
+               status_code=500)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest = os.path.join(tmp, "studies.tsv")
+            with open(manifest, "w") as f:
+                f.write("name\tstudy\targuments\n"
+                        "first\tGSF000001\t-sm s3://bucket/samples-1.tsv\n"
+                        "second\tGSF000002\t--samples s3://bucket/samples-2.tsv\n")
+            report_path = os.path.join(tmp, "report.json")
+            argv = ["odm-import-data", "--server", srv, "--token", "aToken",
+                    "--manifest", manifest, "--max-studies", "2", "--report", report_path]
+            with self.assertRaises(SystemExit) as cm, captured_output() as (out, err), \
+                    mock.patch.object(sys, "argv", argv):
+                main()
+            with open(report_path) as f:
+                report = json.load(f)
+
+        self.assertEqual(1, cm.exception.code)
+        summary = out.getvalue().split("Imported 1 of 2 studies\n")[1].splitlines()
+        self.assertEqual(["first\tOK\tGSF000001",
+                          "second\tFAILED\t\tLinking samples to study "
+                          "(GSF000012 to GSF000002) failed"], summary)
+        self.assertIn("[second] (", err.getvalue())
+        self.assertEqual(["first", "second"], [study["name"] for study in report])
+        self.assertEqual([True, False], [study["ok"] for study in report])
+        self.assertEqual([{"kind": "samples", "link": "s3://bucket/samples-1.tsv",
+                           "accession": "GSF000011", "existed": False}],
+                         report[0]["groups"])
+
+    def test_load_manifest(self):
+        studies = [{"study": "s3://bucket/study.tsv", "arguments": ["-sm", "s3://bucket/s.tsv"]}]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "studies.json")
+            with open(path, "w") as f:
+                json.dump({"studies": studies}, f)
+            self.assertEqual(studies, load_manifest(path))
+            path = os.path.join(tmp, "studies.csv")
+            open(path, "w").close()
+            with self.assertRaises(SystemExit), captured_output() as (out, err):
+                load_manifest(path)
+            self.assertIn("Unknown manifest format '.csv'", err.getvalue())
+
+    def test_invalid_manifest_samples(self):
+        args = argparse.Namespace()
+        for samples, message in (([{"tag": "samples"}], "should have 'tag' and 'value'"),
+                                 ([{"tag": "sample", "value": "s3://bucket/s.tsv"}],
+                                  "unknown tag 'sample'"),
+                                 ([{"tag": "samples", "value": "s3://bucket/s.tsv",
+                                    "children": [{"value": "s3://bucket/e.gct"}]}],
+                                  "should have 'tag' and 'value'")):
+            entry = {"study": "GSF000001", "samples": samples}
+            with self.assertRaises(SystemExit), captured_output() as (out, err):
+                parse_manifest_entry(args, "studies.json", 1, entry)
+            self.assertIn("studies.json, study #1: ", err.getvalue())
+            self.assertIn(message, err.getvalue())
+
+    def test_number_of_workers_should_be_positive(self):
+        for argument in ("--max-workers", "--max-studies"):
+            argv = ["odm-import-data", "--server", "https://dummy", "--token", "aToken",
+                    argument, "0"]
+            with self.assertRaises(SystemExit) as cm, captured_output() as (out, err), \
+                    mock.patch.object(sys, "argv", argv):
+                main()
+            self.assertEqual(2, cm.exception.code)
+            self.assertIn("expected a positive number, got '0'", err.getvalue())
+
 
 class _MockArgs(dict):
     def __getattr__(self, item):
@@ -0,0 +1,203 @@
+import os
+import re
+import tempfile
+import unittest
+from unittest import mock
+
+import requests_mock
+
+from odm_sdk.import_checkpoint import ImportCheckpoint
+from odm_sdk.importer import (GroupLinkingError, ImportReporter, InvalidImportError, JobError,
+                              JobTracker, LongPollJobWaiter, StudyImporter)
+from odm_sdk.rest_client import RestClient
+from odm_sdk.retry import NO_RETRY
+
+SERVER = "https://dummy.genestack.com"
+JOB_API_PATH = SERVER + "/frontend/rs/genestack/job/default-released"
+INTEGRATION_LINK_PATH = (SERVER + "/frontend/rs/genestack/integrationCurator/default-released"
+                                  "/integration/link")
+
+SAMPLE_NODES = [{'tag': 'samples', 'value': 's3://bucket/samples.tsv', 'children': [
+    {'tag': 'expression', 'value': 's3://bucket/expression.gct'}]}]
+
+
+def mock_import_jobs(m):
+    jobs = {"study": (1, {"accession": "GSF000001"}),
+            "samples": (2, {"groupAccession": "GSF000002"}),
+            "expression": (3, {"groupAccession": "GSF000003"})}
+    for kind, (job_id, result) in jobs.items():
+        m.post(f"{JOB_API_PATH}/import/{kind}/", json={"jobExecId": job_id})
+        m.get(f"{JOB_API_PATH}/{job_id}/info", json={"status": "COMPLETED"})
+        m.get(f"{JOB_API_PATH}/{job_id}/output", json={"result": result})
+
+
+class StudyImporterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = RestClient(SERVER, {"Genestack-API-Token": "aToken"}, NO_RETRY)
+        self.reporter = mock.Mock(spec=ImportReporter)
+
+    def importer(self, **kwargs):
+        kwargs.setdefault('study_link', 's3://bucket/study.tsv')
+        kwargs.setdefault('sample_nodes', SAMPLE_NODES)
+        return StudyImporter(self.client, template_accession='GSF000100',
+                             reporter=self.reporter, **kwargs)
+
+    def test_invalid_arguments_are_raised(self):
+        importer = self.importer(study_accession='GSF000001')
+        with self.assertRaises(InvalidImportError) as cm:
+            importer.run()
+        self.assertEqual('You need to provide either study link or accession',
+                         cm.exception.message)
+
+    def test_prepare_does_not_change_nodes(self):
+        importer = self.importer(link_signals_to_all_samples=True, sample_nodes=[
+            {'tag': 'samples', 'value': 's3://bucket/s1.tsv'},
+            {'tag': 'samples', 'value': 's3://bucket/s2.tsv', 'children': [
+                {'tag': 'expression', 'value': 's3://bucket/expression.gct'}]}])
+        nodes = importer.prepare()
+        self.assertEqual([1, 1], [len(node['children']) for node in nodes])
+        self.assertNotIn('children', importer.sample_nodes[0])
+
+    @requests_mock.Mocker()
+    def test_result(self, m):
+        mock_import_jobs(m)
+        m.post(f"{INTEGRATION_LINK_PATH}/sample/group/GSF000002/to/study/GSF000001")
+        m.post(f"{INTEGRATION_LINK_PATH}/expression/group/GSF000003/to/sample/group/GSF000002")
+
+        result = self.importer().run()
+        self.assertTrue(result.ok)
+        self.assertEqual("GSF000001", result.study)
+        self.assertEqual([('study', 'GSF000001'), ('samples', 'GSF000002'),
+                          ('expression', 'GSF000003')],
+                         [(group.kind, group.accession) for group in result.groups])
+        self.assertFalse(any(group.existed for group in result.groups))
+        self.assertEqual([('samples_to_study', 'GSF000002', 'GSF000001'),
+                          ('expression_to_sample', 'GSF000003', 'GSF000002')],
+                         result.links)
+        self.reporter.info.assert_any_call("study GSF000001 was added successfully")
+
+    @requests_mock.Mocker()
+    def test_linking_error(self, m):
+        mock_import_jobs(m)
+        m.post(f"{INTEGRATION_LINK_PATH}/sample/group/GSF000002/to/study/GSF000001",
+               status_code=504, text="Gateway Time-out")
+
+        with self.assertRaises(GroupLinkingError) as cm:
+            self.importer().run()
+        self.assertEqual("Linking samples to study (GSF000002 to GSF000001) failed",
+                         cm.exception.message)
+        self.assertEqual(504, cm.exception.response.status_code)
+
+    @requests_mock.Mocker()
+    def test_ignored_linking_error_is_a_failure(self, m):
+        mock_import_jobs(m)
+        m.post(f"{INTEGRATION_LINK_PATH}/sample/group/GSF000002/to/study/GSF000001",
+               status_code=504)
+
+        result = self.importer(ignore_linking_errors=True).run()
+        self.assertFalse(result.ok)
+        self.assertEqual("GSF000001", result.study)
+        self.assertEqual(1, len(result.failures))
+        self.assertIsInstance(result.failures[0], GroupLinkingError)
+        self.reporter.error.assert_called_once_with(result.failures[0])
+        self.assertEqual([], result.links)
+
+    @requests_mock.Mocker()
+    def test_failed_job(self, m):
+        mock_import_jobs(m)
+        m.get(f"{JOB_API_PATH}/1/info", json={"status": "FAILED"})
+
+        with self.assertRaises(JobError) as cm:
+            self.importer().run()
+        self.assertEqual(1, cm.exception.job_id)
+        self.assertEqual("Job 1 failed with status FAILED", cm.exception.message)
+        # data is not imported into a failed study
+        self.assertEqual(["study"], [r.path.split('/')[-2] for r in m.request_history
+                                     if r.method == "POST"])
+
+    @requests_mock.Mocker()
+    def test_rerun_with_checkpoint(self, m):
+        mock_import_jobs(m)
+        m.post(f"{INTEGRATION_LINK_PATH}/sample/group/GSF000002/to/study/GSF000001")
+        expression_url = (f"{INTEGRATION_LINK_PATH}"
+                          f"/expression/group/GSF000003/to/sample/group/GSF000002")
+        m.post(expression_url, status_code=504)
+
+        with tempfile.TemporaryDirectory() as tmp, \
+                ImportCheckpoint(os.path.join(tmp, 'checkpoint.sqlite')) as checkpoint:
+            with self.assertRaises(GroupLinkingError):
+                self.importer(checkpoint=checkpoint).run()
+
+            # the rerun only links the expression
+            m.reset_mock()
+            m.post(expression_url)
+            result = self.importer(checkpoint=checkpoint).run()
+            self.assertEqual(["POST " + expression_url],
+                             [r.method + " " + r.url for r in m.request_history])
+            self.assertEqual("GSF000001", result.study)
+            self.assertEqual(['GSF000001', 'GSF000002', 'GSF000003'],
+                             [group.accession for group in result.groups])
+            self.assertEqual(2, len(result.links))
+
+            # nothing is left to do
+            m.reset_mock()
+            self.importer(checkpoint=checkpoint).run()
+            self.assertEqual(0, m.call_count)
+
+    @requests_mock.Mocker()
+    def test_long_polling(self, m):
+        mock_import_jobs(m)
+        # the output is returned with the info of a finished job
+        outputs = {1: {"accession": "GSF000001"}, 2: {"groupAccession": "GSF000002"},
+                   3: {"groupAccession": "GSF000003"}}
+        for job_id, output in outputs.items():
+            m.get(f"{JOB_API_PATH}/{job_id}/info",
+                  json={"status": "COMPLETED", "result": output})
+        m.post(re.compile(INTEGRATION_LINK_PATH))
+
+        waiter = LongPollJobWaiter(self.client, 'default-released')
+        tracker = JobTracker(self.client, 'default-released', waiter=waiter)
+        for job_id in outputs:
+            tracker.track(job_id, lambda output: None)
+        tracker.run()
+        tracker.close()
+        self.assertTrue(waiter.long_poll)
+        info_requests = [r for r in m.request_history if r.path.endswith('/info')]
+        self.assertEqual(3, len(info_requests))
+        self.assertEqual([['10']] * 3, [r.qs['wait'] for r in info_requests])
+        self.assertFalse(any(r.path.endswith('/output') for r in m.request_history))
+
+    @requests_mock.Mocker()
+    def test_long_polls_are_limited(self, m):
+        for job_id in (1, 2, 3):
+            m.get(f"{JOB_API_PATH}/{job_id}/info",
+                  json={"status": "COMPLETED", "result": {"jobId": job_id}})
+        waiter = LongPollJobWaiter(self.client, 'default-released')
+        tracker = JobTracker(self.client, 'default-released', waiter=waiter, max_long_polls=1)
+        finished = []
+        for job_id in (1, 2, 3):
+            tracker.track(job_id, lambda output: finished.append(output['result']['jobId']))
+        tracker.run()
+        tracker.close()
+        # the other jobs are polled, and wait for the first one to be handled
+        self.assertEqual({'/1/info': ['10'], '/2/info': None, '/3/info': None},
+                         {r.path[-7:]: r.qs.get('wait') for r in m.request_history})
+        self.assertEqual([1, 2, 3], finished)
+
+    @requests_mock.Mocker()
+    def test_long_polling_fallback(self, m):
+        mock_import_jobs(m)
+        m.get(f"{JOB_API_PATH}/1/info", [{"json": {"status": "RUNNING"}},
+                                          {"json": {"status": "COMPLETED"}}])
+        waiter = LongPollJobWaiter(self.client, 'default-released')
+        self.assertEqual(('RUNNING', None), waiter.fetch(1, wait=10))
+        # the server has not held the request, poll without waiting
+        self.assertFalse(waiter.long_poll)
+        self.assertEqual(('COMPLETED', {"result": {"accession": "GSF000001"}}),
+                         waiter.fetch(1, wait=10))
+        self.assertNotIn('wait', m.last_request.qs)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import gzip
+import json
+import unittest
+
+import requests_mock
+
+from odm_sdk import Connection, GenestackServerException
+from odm_sdk.instrumentation import MetricsCollector, RequestHook
+from odm_sdk.retry import RetryPolicy
+
+SERVER_URL = "https://dummy.genestack.com/frontend/endpoint"
+INVOKE_PATH = SERVER_URL + "/application/invoke"
+
+
+class RecordingHook(RequestHook):
+
+    def __init__(self):
+        self.events = []
+
+    def before_request(self, info):
+        self.events.append(('before', info.application_id, info.method))
+
+    def after_request(self, info):
+        self.events.append(('after', info.application_id, info.method, info.error))
+
+
+class InstrumentationTest(unittest.TestCase):
+
+    def make_connection(self, *hooks):
+        return Connection(SERVER_URL, hooks=hooks,
+                          retry_policy=RetryPolicy(backoff_factor=0, jitter=False))
+
+    @requests_mock.Mocker()
+    def test_hooks_are_called_around_invoke(self, m):
+        m.post(f"{INVOKE_PATH}/genestack/filesUtil/linkFile",
+               json={"result": None, "log": [], "elapsedMicroseconds": 1500})
+        hook = RecordingHook()
+        connection = self.make_connection(hook)
+        connection.application('genestack/filesUtil').invoke('linkFile', 'GSF1', 'GSF2')
+        self.assertEqual([('before', 'genestack/filesUtil', 'linkFile'),
+                          ('after', 'genestack/filesUtil', 'linkFile', None)], hook.events)
+
+    @requests_mock.Mocker()
+    def test_metrics(self, m):
+        m.post(f"{INVOKE_PATH}/genestack/filesUtil/linkFile", [
+            {'status_code': 503},
+            {'json': {"result": None, "log": [], "elapsedMicroseconds": 1500}},
+        ])
+        m.post(f"{INVOKE_PATH}/genestack/shareUtil/shareFiles",
+               json={"result": None, "error": "Boom", "log": []})
+        metrics = MetricsCollector()
+        connection = self.make_connection(metrics)
+        connection.application('genestack/filesUtil').invoke('linkFile', 'GSF1', 'GSF2')
+        with self.assertRaises(GenestackServerException):
+            connection.application('genestack/shareUtil').invoke('shareFiles', ['GSF1'])
+
+        stats = {(s.application_id, s.method): s for s in metrics.get_stats()}
+        link_stats = stats['genestack/filesUtil', 'linkFile']
+        self.assertEqual(1, link_stats.count)
+        self.assertEqual(1, link_stats.retries)
+        self.assertEqual(0, link_stats.errors)
+        self.assertEqual(len(connection.codec.dumps(('GSF1', 'GSF2'))), link_stats.bytes_sent)
+        self.assertGreater(link_stats.bytes_received, 0)
+        self.assertEqual(0.0015, link_stats.server_latency.sum)
+        self.assertEqual(1, stats['genestack/shareUtil', 'shareFiles'].errors)
+
+        exported = metrics.to_prometheus()
+        self.assertIn('odm_sdk_request_retries_total'
+                      '{application="genestack/filesUtil",method="linkFile"} 1', exported)
+        self.assertIn('odm_sdk_server_duration_seconds_bucket'
+                      '{application="genestack/filesUtil",method="linkFile",le="0.005"} 1',
+                      exported)
+
+    @requests_mock.Mocker()
+    def test_streaming_request_is_finished_after_iteration(self, m):
+        m.post(f"{INVOKE_PATH}/genestack/filesUtil/collectMetainfos",
+               json={"result": [1, 2, 3], "log": []})
+        hook = RecordingHook()
+        connection = self.make_connection(hook)
+        items = connection.application('genestack/filesUtil').invoke_stream('collectMetainfos')
+        self.assertEqual([1, 2, 3], list(items))
+        self.assertEqual(2, len(hook.events))
+
+    @requests_mock.Mocker()
+    def test_compressed_bytes_are_counted(self, m):
+        body = json.dumps({"result": ["GSF%06d" % i for i in range(1000)], "log": []})
+        compressed = gzip.compress(body.encode())
+        for method in ('getFiles', 'streamFiles'):
+            m.post(f"{INVOKE_PATH}/genestack/filesUtil/{method}", content=compressed,
+                   headers={'Content-Encoding': 'gzip'})
+        metrics = MetricsCollector()
+        application = self.make_connection(metrics).application('genestack/filesUtil')
+        self.assertEqual(1000, len(application.invoke('getFiles')))
+        self.assertEqual(1000, len(list(application.invoke_stream('streamFiles'))))
+        stats = {s.method: s for s in metrics.get_stats()}
+        self.assertEqual(len(compressed), stats['getFiles'].bytes_received)
+        self.assertEqual(len(compressed), stats['streamFiles'].bytes_received)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import json
+import unittest
+
+import requests_mock
+
+from odm_sdk import Connection, GenestackException, Metainfo, StringValue
+from odm_sdk.json_codec import JsonCodec, OrjsonCodec, UjsonCodec, get_codec
+
+SERVER_URL = "https://dummy.genestack.com/frontend/endpoint"
+
+
+def _available_codecs():
+    codecs = []
+    for codec_class in (JsonCodec, OrjsonCodec, UjsonCodec):
+        try:
+            codecs.append(codec_class())
+        except ImportError:
+            pass
+    return codecs
+
+
+class JsonCodecTest(unittest.TestCase):
+
+    def test_metainfo_serialization(self):
+        metainfo = Metainfo()
+        metainfo.add_value(Metainfo.NAME, StringValue('Sample'))
+        params = ('GSF000001', metainfo, {'extra'})
+        expected = ['GSF000001', {Metainfo.NAME: [{'type': 'string', 'value': 'Sample'}]},
+                    ['extra']]
+        for codec in _available_codecs():
+            with self.subTest(codec=codec.name):
+                self.assertEqual(expected, json.loads(codec.dumps(params)))
+                self.assertEqual(expected, codec.loads(json.dumps(expected).encode()))
+
+    def test_objects_supported_by_standard_json(self):
+        params = [{1: 'a', None: 'b'}, 2 ** 70]
+        for codec in _available_codecs():
+            with self.subTest(codec=codec.name):
+                self.assertEqual(json.loads(json.dumps(params)),
+                                 json.loads(codec.dumps(params)))
+
+    def test_unknown_codec(self):
+        with self.assertRaises(GenestackException):
+            get_codec('simplejson')
+
+    @requests_mock.Mocker()
+    def test_connection_uses_codec(self, m):
+        m.post(f"{SERVER_URL}/application/invoke/genestack/filesUtil/getFileByName",
+               json={"result": "GSF000001", "log": []})
+        for codec in _available_codecs():
+            with self.subTest(codec=codec.name):
+                connection = Connection(SERVER_URL, codec=codec)
+                application = connection.application('genestack/filesUtil')
+                self.assertEqual('GSF000001', application.invoke('getFileByName', 'Ünïcode'))
+                self.assertEqual(['Ünïcode'], json.loads(m.last_request.body))
+
+
+if __name__ == '__main__':
+    unittest.main()
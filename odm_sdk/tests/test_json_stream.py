@@ -0,0 +1,57 @@
+import json
+import unittest
+from unittest import mock
+
+from odm_sdk import json_stream
+from odm_sdk.json_stream import iter_json_array_field
+
+
+def _split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class JsonStreamTest(unittest.TestCase):
+
+    def test_array_is_decoded_by_elements(self):
+        content = {"log": [{"message": "ok"}],
+                   "result": [{"accession": "GSF1", "name": "Ünïcode"}, 12345, 1.5e3, None, "x"],
+                   "elapsedMicroseconds": 42}
+        data = json.dumps(content, ensure_ascii=False).encode('utf-8')
+        for size in (1, 2, 7, len(data)):
+            other_fields = {}
+            items = list(iter_json_array_field(_split(data, size), 'result', other_fields))
+            self.assertEqual(content['result'], items)
+            self.assertEqual({"log": content["log"], "elapsedMicroseconds": 42}, other_fields)
+
+    def test_items_are_yielded_before_the_end_of_content(self):
+        chunks = iter([b'{"result": [1, ', b'2, ', b'3]}'])
+        items = iter_json_array_field(chunks, 'result', {})
+        self.assertEqual(1, next(items))
+        self.assertEqual([b'2, ', b'3]}'], list(chunks))
+
+    def test_large_element_is_not_decoded_for_each_chunk(self):
+        element = {"values": list(range(100000))}
+        data = json.dumps({"result": [element, 1]}).encode('utf-8')
+        decoder = mock.Mock(wraps=json_stream._DECODER)
+        with mock.patch.object(json_stream, '_DECODER', decoder):
+            items = list(iter_json_array_field(_split(data, 1024), 'result', {}))
+        self.assertEqual([element, 1], items)
+        # hundreds of chunks, but the pending value is at least doubled before each retry
+        self.assertLess(decoder.raw_decode.call_count, 20)
+
+    def test_non_array_field(self):
+        other_fields = {}
+        items = list(iter_json_array_field([b'{"error": "Boom", "result": null}'], 'result',
+                                           other_fields))
+        self.assertEqual([], items)
+        self.assertEqual({"error": "Boom", "result": None}, other_fields)
+
+    def test_invalid_content(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array_field([b'{"result": [1, 2'], 'result', {}))
+        with self.assertRaises(ValueError):
+            list(iter_json_array_field([b'<html>'], 'result', {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
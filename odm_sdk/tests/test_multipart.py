@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+from email.parser import BytesParser
+
+import requests_mock
+
+from odm_sdk import Connection
+from odm_sdk.multipart import FileRange, MultipartEncoder
+
+SERVER_URL = "https://dummy.genestack.com/frontend/endpoint"
+UPLOAD_PATH = SERVER_URL + "/application/uploadChunked/genestack/upload/unusedToken"
+
+
+def parse(content_type, body):
+    message = BytesParser().parsebytes(b'Content-Type: ' + content_type.encode() + b'\r\n\r\n'
+                                       + body)
+    return {part.get_param('name', header='Content-Disposition'): part.get_payload(decode=True)
+            for part in message.get_payload()}
+
+
+class MultipartTest(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.write(fd, bytes(range(256)) * 100)
+        os.close(fd)
+        self.fd = os.open(self.path, os.O_RDONLY)
+
+    def tearDown(self):
+        os.close(self.fd)
+        os.remove(self.path)
+
+    def test_file_range(self):
+        file_range = FileRange(self.fd, 300, 1000)
+        self.assertEqual(1000, len(file_range))
+        self.assertEqual(bytes(range(44, 54)), file_range.read(10))
+        self.assertEqual(990, len(file_range.read()))
+        self.assertEqual(b'', file_range.read(10))
+        file_range.seek(0)
+        self.assertEqual(bytes(range(44, 46)), file_range.read(2))
+
+    def test_encoder_is_read_in_pieces(self):
+        encoder = MultipartEncoder({'resumableChunkNumber': 2},
+                                   {'file': FileRange(self.fd, 256, 5000)})
+        for _ in range(2):
+            encoder.seek(0)
+            pieces = iter(lambda: encoder.read(777), b'')
+            body = b''.join(pieces)
+            self.assertEqual(len(encoder), len(body))
+            parts = parse(encoder.content_type, body)
+            self.assertEqual(b'2', parts['resumableChunkNumber'])
+            self.assertEqual((bytes(range(256)) * 20)[:5000], parts['file'])
+
+    @requests_mock.Mocker()
+    def test_chunked_upload_streams_file(self, m):
+        received = {}
+
+        def upload(request, context):
+            self.assertIsInstance(request.body, MultipartEncoder)
+            received.update(parse(request.headers['Content-Type'], request.body.read()))
+            return {"lastChunkUploaded": True, "result": "GSF000001"}
+
+        m.get(UPLOAD_PATH, status_code=204)
+        m.post(UPLOAD_PATH, json=upload)
+        application = Connection(SERVER_URL).application('genestack/upload')
+        self.assertEqual("GSF000001", application.upload_chunked_file(self.path))
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), received['file'])
+
+
+if __name__ == '__main__':
+    unittest.main()
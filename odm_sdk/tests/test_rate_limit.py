@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import requests_mock
+
+from odm_sdk import Connection, GenestackException
+from odm_sdk import rate_limit
+from odm_sdk.rate_limit import TokenBucket, set_global_rate_limit, throttle
+
+SERVER_URL = "https://dummy.genestack.com/frontend/endpoint"
+UPLOAD_PATH = SERVER_URL + "/application/uploadChunked/genestack/upload/unusedToken"
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 100.0
+        patcher = mock.patch('odm_sdk.rate_limit.time.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_is_not_delayed(self):
+        bucket = TokenBucket(1000)
+        self.assertEqual(0, bucket.reserve(1000))
+        self.assertAlmostEqual(0.5, bucket.reserve(500))
+
+    def test_waiting_threads_are_served_in_order(self):
+        bucket = TokenBucket(1000, burst=0)
+        self.assertAlmostEqual(1, bucket.reserve(1000))
+        self.assertAlmostEqual(2, bucket.reserve(1000))
+        self.now += 2
+        self.assertAlmostEqual(1, bucket.reserve(1000))
+
+    def test_rate_should_be_positive(self):
+        with self.assertRaises(GenestackException):
+            TokenBucket(0)
+
+    def test_global_limit_is_shared(self):
+        self.addCleanup(set_global_rate_limit, None)
+        set_global_rate_limit(1000, burst=0)
+        own = TokenBucket(4000, burst=0)
+        with mock.patch('odm_sdk.rate_limit.time.sleep') as sleep:
+            throttle(1000, own)
+            throttle(1000)
+        self.assertEqual([mock.call(1.0), mock.call(2.0)], sleep.call_args_list)
+        self.assertAlmostEqual(0.5, own.reserve(1000))
+
+    @requests_mock.Mocker()
+    def test_chunked_upload_is_throttled(self, m):
+        fd, path = tempfile.mkstemp()
+        os.write(fd, b'x' * 1000)
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+
+        def upload(request, context):
+            request.body.read()
+            return {"lastChunkUploaded": True, "result": "GSF000001"}
+
+        m.get(UPLOAD_PATH, status_code=204)
+        m.post(UPLOAD_PATH, json=upload)
+        application = Connection(SERVER_URL).application('genestack/upload')
+        with mock.patch.object(rate_limit.TokenBucket, 'reserve', return_value=0) as reserve:
+            self.assertEqual("GSF000001",
+                             application.upload_chunked_file(path, rate_limit=100))
+        self.assertEqual(1000, sum(args[0] for args, _ in reserve.call_args_list))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+import requests_mock
+
+from odm_sdk import GenestackResponseError, RetryPolicy
+from odm_sdk.rest_client import RestClient
+
+SERVER_URL = "https://dummy.genestack.com/"
+REST_URL = "https://dummy.genestack.com/frontend/rs/genestack/"
+
+
+class RestClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = RestClient(SERVER_URL, {"Genestack-API-Token": "aToken"},
+                                 retry_policy=RetryPolicy(backoff_factor=0))
+        self.addCleanup(self.client.close)
+
+    def test_url(self):
+        self.assertEqual(REST_URL + "job/default-released/1/info",
+                         self.client.url("/job/default-released/1/info"))
+        self.assertEqual("https://other.host/path", self.client.url("https://other.host/path"))
+
+    @requests_mock.Mocker()
+    def test_requests_are_authenticated(self, m):
+        m.get(REST_URL + "job/default-released/1/info", json={"status": "RUNNING"})
+        m.post(REST_URL + "integrationCurator/default-released/links", status_code=404)
+        self.assertEqual({"status": "RUNNING"},
+                         self.client.request_json('GET', "job/default-released/1/info"))
+        self.assertEqual(404, self.client.post("integrationCurator/default-released/links",
+                                               json=[]).status_code)
+        for request in m.request_history:
+            self.assertEqual("aToken", request.headers["Genestack-API-Token"])
+
+    @requests_mock.Mocker()
+    def test_transient_failures_are_retried(self, m):
+        info = m.get(REST_URL + "job/default-released/1/info",
+                     [{"status_code": 503}, {"json": {"status": "COMPLETED"}}])
+        self.assertEqual(200, self.client.get("job/default-released/1/info").status_code)
+        self.assertEqual(2, info.call_count)
+
+    @requests_mock.Mocker()
+    def test_request_json_raises_on_errors(self, m):
+        m.get(REST_URL + "studyUser/default-released/studies/GSF1", status_code=403)
+        m.get(REST_URL + "studyUser/default-released/studies/GSF2", text="<html>")
+        with self.assertRaisesRegex(GenestackResponseError, "status code 403"):
+            self.client.request_json('GET', "studyUser/default-released/studies/GSF1")
+        with self.assertRaisesRegex(GenestackResponseError, "cannot decode"):
+            self.client.request_json('GET', "studyUser/default-released/studies/GSF2")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+import requests
+import requests_mock
+
+from odm_sdk import Connection, GenestackResponseError, RetryPolicy
+
+SERVER_URL = "https://dummy.genestack.com/frontend/endpoint"
+
+
+def _response(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return response
+
+
+class RetryPolicyTest(unittest.TestCase):
+
+    def test_idempotency_aware_classification(self):
+        policy = RetryPolicy()
+        self.assertTrue(policy.should_retry(1, 'GET', response=_response(502)))
+        self.assertFalse(policy.should_retry(1, 'POST', response=_response(502)))
+        self.assertTrue(policy.should_retry(1, 'POST', response=_response(503)))
+        self.assertTrue(policy.should_retry(1, 'POST', response=_response(502), idempotent=True))
+        self.assertFalse(policy.should_retry(1, 'GET', response=_response(404)))
+        self.assertFalse(policy.should_retry(5, 'GET', response=_response(503)))
+        self.assertTrue(policy.should_retry(1, 'GET', error=requests.ConnectionError()))
+        self.assertFalse(policy.should_retry(1, 'POST', error=requests.ReadTimeout()))
+        self.assertTrue(policy.should_retry(1, 'POST', error=requests.ConnectTimeout()))
+
+    def test_exponential_backoff_and_retry_after(self):
+        policy = RetryPolicy(backoff_factor=1, max_backoff=5, jitter=False)
+        self.assertEqual([1, 2, 4, 5], [policy.get_delay(attempt) for attempt in range(1, 5)])
+        self.assertEqual(3, policy.get_delay(1, _response(503, {'Retry-After': '3'})))
+        self.assertEqual(5, policy.get_delay(1, _response(503, {'Retry-After': '120'})))
+
+    @requests_mock.Mocker()
+    def test_perform_request_retries_unprocessed_requests(self, m):
+        path = "/application/invoke/genestack/signin/whoami"
+        m.post(SERVER_URL + path, [{"status_code": 503},
+                                   {"json": {"result": "user@genestack.com", "log": []}}])
+        connection = Connection(SERVER_URL, retry_policy=RetryPolicy(backoff_factor=0))
+        self.assertEqual("user@genestack.com", connection.whoami())
+
+        m.post(SERVER_URL + path, [{"status_code": 502}, {"json": {"result": None, "log": []}}])
+        with self.assertRaises(GenestackResponseError):
+            connection.whoami()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import stat
+import tempfile
+import unittest
+
+import requests_mock
+
+from odm_sdk import Connection
+from odm_sdk.settings import User
+from odm_sdk.settings.session_cache import SessionCache
+
+HOST = "https://dummy.genestack.com/frontend"
+SIGNIN_PATH = HOST + "/endpoint/application/invoke/genestack/signin"
+
+
+class SessionCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.cache = SessionCache(os.path.join(self.folder.name, 'sessions'))
+        self.user = User(email='user@genestack.com', alias='user', host=HOST, password='pwd')
+        # session stored by another process
+        connection = Connection(HOST + '/endpoint')
+        connection.session.cookies.set('JSESSIONID', 'session-id')
+        self.cache.save(HOST, 'user', connection)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def mock_authenticate(self, m):
+        return m.post(f"{SIGNIN_PATH}/authenticate",
+                      json={"result": {"authenticated": True}, "log": []})
+
+    @requests_mock.Mocker()
+    def test_session_is_reused(self, m):
+        authenticate = self.mock_authenticate(m)
+        sign_out = m.post(f"{SIGNIN_PATH}/signOut", json={"result": None, "log": []})
+        whoami = m.post(f"{SIGNIN_PATH}/whoami", json={"result": "user@genestack.com", "log": []})
+
+        connection = self.user.get_connection(session_cache=self.cache)
+        self.assertEqual("user@genestack.com", connection.whoami())
+        del connection
+
+        self.assertEqual(0, authenticate.call_count)
+        self.assertEqual('JSESSIONID=session-id', whoami.last_request.headers['Cookie'])
+        self.assertEqual(0, sign_out.call_count)
+        [name] = os.listdir(self.cache.folder)
+        mode = os.stat(os.path.join(self.cache.folder, name)).st_mode
+        self.assertEqual(0o600, stat.S_IMODE(mode))
+
+    @requests_mock.Mocker()
+    def test_expired_session_is_renewed(self, m):
+        authenticate = self.mock_authenticate(m)
+        whoami = m.post(f"{SIGNIN_PATH}/whoami", [
+            {'status_code': 401},
+            {'json': {"result": "user@genestack.com", "log": []}},
+        ])
+        connection = self.user.get_connection(session_cache=self.cache)
+        self.assertEqual("user@genestack.com", connection.whoami())
+        self.assertEqual(1, authenticate.call_count)
+        self.assertEqual(2, whoami.call_count)
+
+    @requests_mock.Mocker()
+    def test_old_session_is_not_reused(self, m):
+        authenticate = self.mock_authenticate(m)
+        self.cache.max_age = -1
+        self.user.get_connection(session_cache=self.cache)
+        self.assertEqual(1, authenticate.call_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
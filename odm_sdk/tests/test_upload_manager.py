@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from concurrent.futures import wait
+from unittest import mock
+
+import requests
+import requests_mock
+
+from odm_sdk import Connection
+from odm_sdk.upload_journal import UploadJournal
+from odm_sdk.upload_sources import LocalFileSource
+
+SERVER_URL = "https://dummy.genestack.com/frontend/endpoint"
+UPLOAD_PATH = SERVER_URL + "/application/uploadChunked/genestack/upload/unusedToken"
+
+
+class UploadManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.paths = []
+        for name, size in (('small.fastq', 10), ('large.fastq', 1000), ('broken.fastq', 100)):
+            path = os.path.join(self.folder, name)
+            with open(path, 'wb') as f:
+                f.write(b'x' * size)
+            self.paths.append(path)
+        self.application = Connection(SERVER_URL).application('genestack/upload')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    @requests_mock.Mocker()
+    def test_files_are_uploaded_largest_first(self, m):
+        uploaded = []
+
+        def upload(request, context):
+            body = request.body.read().decode('utf-8', 'replace')
+            name = [n for n in ('small', 'large', 'broken') if '%s.fastq' % n in body][0]
+            uploaded.append(name)
+            if name == 'broken':
+                context.status_code = 400
+                return {"error": "Boom"}
+            return {"lastChunkUploaded": True, "result": name}
+
+        m.get(UPLOAD_PATH, status_code=204)
+        m.post(UPLOAD_PATH, json=upload)
+        unreachable = "https://storage.example.com/bucket/reads.fastq"
+        m.get(unreachable, exc=requests.ConnectionError)
+        missing = os.path.join(self.folder, 'missing.fastq')
+        results = self.application.upload_chunked_files(self.paths + [missing, unreachable],
+                                                        max_workers=1, show_progress=False)
+
+        self.assertEqual(['large', 'broken', 'small'], uploaded)
+        self.assertEqual(['small', 'large', None, None, None], [r.result for r in results])
+        self.assertEqual([True, True, False, False, False], [r.succeeded for r in results])
+        self.assertIn('Boom', str(results[2].error))
+
+    @requests_mock.Mocker()
+    def test_interrupted_upload_closes_sources(self, m):
+        m.get(UPLOAD_PATH, status_code=204)
+        m.post(UPLOAD_PATH, json={"lastChunkUploaded": True, "result": "GSF000001"})
+        sources = [LocalFileSource(path) for path in self.paths]
+        interrupted = []
+
+        def interrupting_wait(*args, **kwargs):
+            if not interrupted:
+                interrupted.append(True)
+                raise KeyboardInterrupt()
+            return wait(*args, **kwargs)
+
+        with mock.patch('odm_sdk.upload_manager.wait', interrupting_wait), \
+                self.assertRaises(KeyboardInterrupt):
+            self.application.upload_chunked_files(sources, show_progress=False)
+        # sources are closed when the running chunks are finished
+        deadline = time.monotonic() + 5
+        while any(source.fd is not None for source in sources) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual([None] * 3, [source.fd for source in sources])
+
+    @requests_mock.Mocker()
+    def test_default_journal_is_closed(self, m):
+        m.get(UPLOAD_PATH, status_code=204)
+        m.post(UPLOAD_PATH, json={"lastChunkUploaded": True, "result": "GSF000001"})
+        journal = UploadJournal(os.path.join(self.folder, 'uploads.sqlite'))
+        with mock.patch('odm_sdk.upload_journal.UploadJournal', return_value=journal), \
+                mock.patch.object(journal, 'close', wraps=journal.close) as close:
+            results = self.application.upload_chunked_files(self.paths, journal=True,
+                                                            show_progress=False)
+        self.assertEqual([True] * 3, [r.succeeded for r in results])
+        close.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import io
+import re
+import threading
+import time
+import unittest
+
+import requests_mock
+
+from odm_sdk import Connection, GenestackException, RetryPolicy
+from odm_sdk.chunked_upload import AimdConcurrency, ChunkedUpload
+from odm_sdk.upload_sources import (FileObjectSource, HttpSource, IterableSource,
+                                    get_upload_source)
+from odm_sdk.tests.test_multipart import parse
+
+SERVER_URL = "https://dummy.genestack.com/frontend/endpoint"
+UPLOAD_PATH = SERVER_URL + "/application/uploadChunked/genestack/upload/unusedToken"
+SOURCE_URL = "https://storage.example.com/bucket/reads.fastq?signature=abc"
+DATA = bytes(range(256)) * 4
+
+
+class UploadSourcesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.application = Connection(SERVER_URL).application('genestack/upload')
+        self.received = {}
+
+    def mock_upload(self, m):
+        def upload(request, context):
+            parts = parse(request.headers['Content-Type'], request.body.read())
+            number = int(parts['resumableChunkNumber'])
+            self.received[number] = parts['file']
+            self.assertEqual(str(len(DATA)).encode(), parts['resumableTotalSize'])
+            last = sum(map(len, self.received.values())) == len(DATA)
+            return {"lastChunkUploaded": last, "result": "GSF000001"}
+
+        m.get(UPLOAD_PATH, status_code=204)
+        m.post(UPLOAD_PATH, json=upload)
+
+    def uploaded_data(self):
+        return b''.join(self.received[number] for number in sorted(self.received))
+
+    @requests_mock.Mocker()
+    def test_iterable(self, m):
+        self.mock_upload(m)
+        pieces = (DATA[i:i + 100] for i in range(0, len(DATA), 100))
+        upload = ChunkedUpload(self.application, pieces, chunk_size=256, name='reads.fastq',
+                               size=len(DATA))
+        self.assertEqual("GSF000001", upload.upload())
+        self.assertEqual(DATA, self.uploaded_data())
+
+    def mock_slow_upload(self, m, pieces_read):
+        lock = threading.Lock()
+        uploaded = []
+        buffered = []
+
+        def upload(request, context):
+            with lock:
+                # chunks read from the source, but not uploaded yet
+                buffered.append(pieces_read[0] - len(uploaded))
+            time.sleep(0.05)
+            with lock:
+                uploaded.append(request)
+                last = len(uploaded) == len(DATA) // 64
+            return {"lastChunkUploaded": last, "result": "GSF000001"}
+
+        m.get(UPLOAD_PATH, status_code=204)
+        m.post(UPLOAD_PATH, json=upload)
+        return buffered
+
+    def iterate_pieces(self, pieces_read):
+        for i in range(0, len(DATA), 64):
+            pieces_read[0] += 1
+            yield DATA[i:i + 64]
+
+    @requests_mock.Mocker()
+    def test_iterable_is_not_read_in_advance(self, m):
+        pieces_read = [0]
+        buffered = self.mock_slow_upload(m, pieces_read)
+        upload = ChunkedUpload(self.application, self.iterate_pieces(pieces_read),
+                               chunk_size=64, name='reads.fastq', size=len(DATA), adaptive=True)
+        upload.concurrency = AimdConcurrency(initial=2, maximum=2)
+        self.assertEqual("GSF000001", upload.upload())
+        self.assertLessEqual(max(buffered), 2)
+
+    @requests_mock.Mocker()
+    def test_iterable_is_not_read_in_advance_by_upload_manager(self, m):
+        pieces_read = [0]
+        buffered = self.mock_slow_upload(m, pieces_read)
+        source = IterableSource(self.iterate_pieces(pieces_read), len(DATA), 'reads.fastq')
+        results = self.application.upload_chunked_files([source], chunk_size=64,
+                                                        max_workers=2, show_progress=False)
+        self.assertEqual(["GSF000001"], [result.result for result in results])
+        self.assertLessEqual(max(buffered), 2)
+
+    @requests_mock.Mocker()
+    def test_file_object(self, m):
+        self.mock_upload(m)
+        upload = ChunkedUpload(self.application, io.BytesIO(DATA), chunk_size=256,
+                               name='reads.fastq')
+        self.assertEqual("GSF000001", upload.upload())
+        self.assertEqual(DATA, self.uploaded_data())
+
+    @requests_mock.Mocker()
+    def test_http(self, m):
+        def serve(request, context):
+            start, end = map(int, re.match(r'bytes=(\d+)-(\d+)',
+                                           request.headers['Range']).groups())
+            context.status_code = 206
+            context.headers['Content-Range'] = 'bytes %s-%s/%s' % (start, end, len(DATA))
+            context.headers['ETag'] = '"v1"'
+            return DATA[start:end + 1]
+
+        self.mock_upload(m)
+        m.get(SOURCE_URL, content=serve)
+        source = get_upload_source(SOURCE_URL)
+        self.assertIsInstance(source, HttpSource)
+        self.assertEqual('reads.fastq', source.name)
+        upload = ChunkedUpload(self.application, source, chunk_size=256)
+        self.assertEqual("GSF000001", upload.upload())
+        self.assertEqual(DATA, self.uploaded_data())
+
+    @requests_mock.Mocker()
+    def test_http_transient_error_is_retried(self, m):
+        def serve(request, context):
+            start, end = map(int, re.match(r'bytes=(\d+)-(\d+)',
+                                           request.headers['Range']).groups())
+            context.status_code = 206
+            context.headers['Content-Range'] = 'bytes %s-%s/%s' % (start, end, len(DATA))
+            return DATA[start:end + 1]
+
+        self.mock_upload(m)
+        m.get(SOURCE_URL, [{'content': serve}, {'status_code': 503, 'text': 'SlowDown'},
+                           {'content': serve}])
+        source = HttpSource(SOURCE_URL, retry_policy=RetryPolicy(backoff_factor=0))
+        upload = ChunkedUpload(self.application, source, chunk_size=len(DATA))
+        self.assertEqual("GSF000001", upload.upload())
+        self.assertEqual(DATA, self.uploaded_data())
+
+    def test_sequential_source_requires_size(self):
+        with self.assertRaises(GenestackException):
+            get_upload_source(iter([DATA]), name='reads.fastq')
+        self.assertIsInstance(get_upload_source(io.BytesIO(DATA), name='reads.fastq'),
+                              FileObjectSource)
+
+    def test_iterable_is_read_in_order(self):
+        source = IterableSource([DATA[:10], DATA[10:]], len(DATA), 'reads.fastq')
+        self.assertEqual(DATA[:300], source.get_range(0, 300).read())
+        with self.assertRaises(GenestackException):
+            source.get_range(600, 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_MAX_AGE = 7 * 24 * 60 * 60
+
+_JOURNAL_FILE_NAME = 'uploads.sqlite'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    id INTEGER PRIMARY KEY,
+    server_url TEXT NOT NULL,
+    upload_url TEXT NOT NULL,
+    token TEXT NOT NULL,
+    path TEXT NOT NULL,
+    total_size INTEGER NOT NULL,
+    chunk_size INTEGER NOT NULL,
+    chunk_count INTEGER NOT NULL,
+    launch_time INTEGER NOT NULL,
+    started REAL NOT NULL,
+    UNIQUE (server_url, upload_url, token, chunk_size)
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    upload_id INTEGER NOT NULL REFERENCES uploads (id) ON DELETE CASCADE,
+    number INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    checksum TEXT,
+    response TEXT,
+    uploaded REAL NOT NULL,
+    PRIMARY KEY (upload_id, number)
+);
+"""
+
+
+class JournalUpload(object):
+    """
+    State of an upload restored from the journal.
+
+    :ivar id: ID of the upload in the journal
+    :ivar launch_time: launch time of the first session of the upload, it is sent
+                       with every chunk, so the server recognizes a resumed upload
+    :ivar completed_chunks: dictionary of numbers and sizes of the uploaded chunks
+    :ivar checksums: dictionary of numbers and checksums of the uploaded chunks,
+                     in ``<algorithm>:<hexdigest>`` format, for chunks with known checksums
+    """
+
+    def __init__(self, upload_id, launch_time, completed_chunks, checksums=None):
+        self.id = upload_id
+        self.launch_time = launch_time
+        self.completed_chunks = completed_chunks
+        self.checksums = checksums or {}
+
+    @property
+    def completed_size(self):
+        return sum(self.completed_chunks.values())
+
+
+class UploadJournal(object):
+    """
+    Records uploaded chunks of files in a SQLite database, so that an interrupted upload
+    (e.g. when the process has been killed) is resumed from the first missing chunk
+    without checking every chunk on the server.
+
+    An upload is identified by server, application, file token (name, size and
+    modification time) and chunk size, so a modified file is uploaded from the beginning.
+    Uploads older than ``max_age`` are forgotten, because the server does not keep
+    incomplete uploads forever. The journal can be shared by threads and processes.
+    """
+
+    def __init__(self, path=None, max_age=DEFAULT_MAX_AGE):
+        """
+        :param path: path to the database file, by default ``uploads.sqlite``
+                     in the settings folder
+        :type path: str
+        :param max_age: time in seconds after which an incomplete upload is forgotten
+        :type max_age: float
+        """
+        if path is None:
+            from odm_sdk.settings.config import config
+            folder = config.get_settings_folder()
+            os.makedirs(folder, mode=0o700, exist_ok=True)
+            path = os.path.join(folder, _JOURNAL_FILE_NAME)
+        self.path = path
+        self.max_age = max_age
+        self.__lock = threading.Lock()
+        self.__db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self.__lock, self.__db:
+            self.__db.execute('PRAGMA foreign_keys = ON')
+            self.__db.executescript(_SCHEMA)
+
+    def close(self):
+        with self.__lock:
+            self.__db.close()
+
+    def start(self, server_url, upload_url, token, path, total_size, chunk_size, chunk_count,
+              launch_time):
+        """
+        Register an upload or restore the state of an interrupted one.
+        ``path`` is recorded for information: an absolute path of a local file or an URL.
+
+        :return: state of the upload
+        :rtype: JournalUpload
+        """
+        with self.__lock, self.__db:
+            self.__db.execute('DELETE FROM uploads WHERE started < ?',
+                              (time.time() - self.max_age,))
+            row = self.__db.execute(
+                'SELECT id, launch_time, chunk_count FROM uploads WHERE server_url = ? '
+                'AND upload_url = ? AND token = ? AND chunk_size = ?',
+                (server_url, upload_url, token, chunk_size)).fetchone()
+            if row is not None:
+                upload_id, stored_launch_time, stored_chunk_count = row
+                if stored_chunk_count == chunk_count:
+                    rows = self.__db.execute(
+                        'SELECT number, size, checksum FROM chunks WHERE upload_id = ?',
+                        (upload_id,)).fetchall()
+                    return JournalUpload(upload_id, stored_launch_time,
+                                         {number: size for number, size, _ in rows},
+                                         {number: checksum for number, _, checksum in rows
+                                          if checksum})
+                self.__db.execute('DELETE FROM uploads WHERE id = ?', (upload_id,))
+            cursor = self.__db.execute(
+                'INSERT INTO uploads (server_url, upload_url, token, path, total_size, '
+                'chunk_size, chunk_count, launch_time, started) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (server_url, upload_url, token, path, total_size, chunk_size,
+                 chunk_count, launch_time, time.time()))
+            return JournalUpload(cursor.lastrowid, launch_time, {})
+
+    def record_chunk(self, upload_id, number, size, checksum=None, response=None):
+        """
+        Record a chunk confirmed by the server.
+
+        :param upload_id: ID of the upload
+        :type upload_id: int
+        :param number: chunk number, starting from 1
+        :type number: int
+        :param size: chunk size
+        :type size: int
+        :param checksum: checksum of the chunk data in ``<algorithm>:<hexdigest>`` format
+        :type checksum: str
+        :param response: response of the server
+        :type response: str
+        :rtype: None
+        """
+        with self.__lock, self.__db:
+            self.__db.execute(
+                'INSERT OR REPLACE INTO chunks (upload_id, number, size, checksum, response, '
+                'uploaded) VALUES (?, ?, ?, ?, ?, ?)',
+                (upload_id, number, size, checksum, response, time.time()))
+
+    def finish(self, upload_id):
+        """
+        Forget a completed upload.
+
+        :param upload_id: ID of the upload
+        :type upload_id: int
+        :rtype: None
+        """
+        with self.__lock, self.__db:
+            self.__db.execute('DELETE FROM uploads WHERE id = ?', (upload_id,))
@@ -0,0 +1,261 @@
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import Thread
+
+from requests.exceptions import RequestException
+
+from odm_sdk import GenestackException
+from odm_sdk.chunked_upload import ChunkedUpload, ChunkResult
+from odm_sdk.rate_limit import get_bucket
+from odm_sdk.utils import isatty
+
+DEFAULT_MAX_WORKERS = 8
+
+
+class UploadResult(object):
+    """
+    Outcome of uploading one file by :py:class:`UploadManager`.
+
+    :ivar path: path to the file
+    :ivar result: result of the application for the uploaded file
+    :ivar error: exception if the upload has failed, ``None`` otherwise
+    :ivar checksum: checksum of the whole file, if it is known
+                    (see :py:attr:`~odm_sdk.chunked_upload.ChunkedUpload.file_checksum`)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.result = None
+        self.error = None
+        self.checksum = None
+
+    @property
+    def succeeded(self):
+        return self.error is None
+
+    def __repr__(self):
+        if self.succeeded:
+            return 'UploadResult(%r, result=%r)' % (self.path, self.result)
+        return 'UploadResult(%r, error=%r)' % (self.path, self.error)
+
+
+class _FileState(object):
+    """
+    Upload of one file, the number of its scheduled chunks which are not processed yet,
+    and whether all its chunks have been scheduled.
+    """
+
+    def __init__(self, upload):
+        self.upload = upload
+        self.pending_chunks = 0
+        self.scheduled = False
+
+
+class UploadManager(object):
+    """
+    Uploads many files with one pool of workers.
+
+    Chunks of all files are scheduled to at most ``max_workers`` concurrent uploads,
+    largest files first, so that small files neither start their own threads nor wait
+    for each other, and a large file does not remain alone at the end.
+    A failed file does not affect the others: each file gets its own
+    :py:class:`UploadResult`::
+
+        manager = UploadManager(importer, max_workers=16)
+        for result in manager.upload(paths):
+            if not result.succeeded:
+                print('%s: %s' % (result.path, result.error))
+
+    Aggregate progress is reported to stderr, and is available in :py:attr:`uploaded_size`
+    and :py:attr:`total_size` while the upload runs in another thread.
+    """
+
+    def __init__(self, application, max_workers=DEFAULT_MAX_WORKERS, chunk_size=None,
+                 retry_policy=None, adaptive=False, journal=None, checksum=None,
+                 rate_limit=None, show_progress=True):
+        """
+        :param application: application receiving the files
+        :type application: odm_sdk.Application
+        :param max_workers: maximum number of chunks uploaded at the same time
+        :type max_workers: int
+        :param chunk_size: chunk size, see :py:class:`~odm_sdk.chunked_upload.ChunkedUpload`
+        :type chunk_size: int
+        :param retry_policy: policy of retrying chunks, the one of the connection by default
+        :type retry_policy: odm_sdk.RetryPolicy
+        :param adaptive: choose chunk size by the file size
+                         (see :py:func:`~odm_sdk.chunked_upload.choose_chunk_size`)
+        :type adaptive: bool
+        :param journal: journal of uploaded chunks to resume interrupted uploads,
+                        ``True`` for the default one
+        :type journal: bool|odm_sdk.upload_journal.UploadJournal
+        :param checksum: name of checksum algorithm to verify chunks,
+                         see :py:class:`~odm_sdk.chunked_upload.ChunkedUpload`
+        :type checksum: str
+        :param rate_limit: maximum total rate of the uploads in bytes per second,
+                           see :py:class:`~odm_sdk.rate_limit.TokenBucket`
+        :type rate_limit: float|odm_sdk.rate_limit.TokenBucket
+        :param show_progress: report aggregate progress to stderr
+        :type show_progress: bool
+        """
+        if max_workers <= 0:
+            raise GenestackException('Number of workers should be positive')
+        self.application = application
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.retry_policy = retry_policy
+        self.adaptive = adaptive
+        self.journal = journal
+        self.checksum = checksum
+        # one bucket for all files
+        self.bucket = get_bucket(rate_limit)
+        self.show_progress = show_progress
+        self.uploaded_size = 0
+        self.total_size = 0
+        self.__progress = None
+
+    def __update_progress(self, size):
+        self.uploaded_size += size
+        if self.__progress is not None:
+            self.__progress('%s files' % self.__file_count, size, self.total_size)
+
+    @staticmethod
+    def __send_chunk(upload, chunk):
+        if upload.finished:
+            return ChunkResult(chunk)
+        try:
+            upload.open()
+        except OSError as e:
+            return ChunkResult(chunk, error=str(e))
+        return upload.send_chunk(chunk)
+
+    @staticmethod
+    def __handle_result(state, result):
+        state.upload.handle_result(result)
+        state.pending_chunks -= 1
+        if state.scheduled and not state.pending_chunks:
+            state.upload.close()
+
+    @staticmethod
+    def __iterate_chunks(states):
+        for state in states:
+            while True:
+                chunk = state.upload.next_chunk()
+                if chunk is None:
+                    break
+                state.pending_chunks += 1
+                yield state, chunk
+            state.scheduled = True
+            if not state.pending_chunks:
+                state.upload.close()
+
+    @staticmethod
+    def __close_after(futures, states):
+        wait(futures)
+        for state in states:
+            state.upload.close()
+
+    def upload(self, paths):
+        """
+        Upload files.
+
+        :param paths: paths to the files or other sources of data
+                      (see :py:func:`~odm_sdk.upload_sources.get_upload_source`)
+        :type paths: list[str|odm_sdk.upload_sources.UploadSource]
+        :return: results in the order of ``paths``
+        :rtype: list[UploadResult]
+        """
+        journal = self.journal
+        if journal is True:
+            from odm_sdk.upload_journal import UploadJournal
+            journal = UploadJournal()
+        try:
+            return self.__upload(paths, journal)
+        finally:
+            # the journal is written only by this thread
+            if journal is not self.journal:
+                journal.close()
+
+    def __upload(self, paths, journal):
+        results = [UploadResult(path) for path in paths]
+        started = []
+        for result in results:
+            try:
+                upload = ChunkedUpload(self.application, result.path, chunk_size=self.chunk_size,
+                                       retry_policy=self.retry_policy, adaptive=self.adaptive,
+                                       journal=journal, checksum=self.checksum,
+                                       rate_limit=self.bucket)
+            except (OSError, RequestException, GenestackException) as e:
+                # e.g. a missing file or a URL which cannot be probed
+                result.error = e
+                continue
+            upload.progress = lambda name, size, total: self.__update_progress(size)
+            started.append((result, _FileState(upload)))
+        states = [state for _, state in started]
+
+        self.__file_count = len(states)
+        self.uploaded_size = 0
+        self.total_size = sum(state.upload.total_size for state in states)
+        if self.show_progress:
+            from odm_sdk.connection import DottedProgress, TTYProgress
+            self.__progress = TTYProgress() if isatty() else DottedProgress(40)
+        resumed_size = sum(state.upload.completed_size for state in states)
+        if resumed_size:
+            sys.stderr.write('Resuming upload: %s of %s bytes remaining\n' % (
+                self.total_size - resumed_size, self.total_size))
+            self.__update_progress(resumed_size)
+
+        # largest files first: the pool takes tasks in the order of submission
+        ordered = sorted(states, key=lambda s: s.upload.total_size, reverse=True)
+        chunks = self.__iterate_chunks(ordered)
+        executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                      thread_name_prefix='odm-sdk-upload')
+        # outcomes of chunks are handled here, workers do not share state
+        futures = {}
+        # chunks of sequential sources are read into memory when they are scheduled,
+        # so only as many of them are scheduled as can be sent at once
+        buffered_chunks = 0
+        try:
+            while True:
+                # chunks are scheduled as workers become free, so that chunks
+                # of sequential sources are not read into memory in advance
+                while (len(futures) < 2 * self.max_workers and
+                       buffered_chunks < self.max_workers):
+                    scheduled = next(chunks, None)
+                    if scheduled is None:
+                        break
+                    state, chunk = scheduled
+                    future = executor.submit(self.__send_chunk, state.upload, chunk)
+                    futures[future] = state
+                    if chunk.content is not None:
+                        buffered_chunks += 1
+                if not futures:
+                    break
+                # wait with a timeout to handle KeyboardInterrupt promptly
+                done, _ = wait(futures, timeout=1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    if result.chunk.content is not None:
+                        buffered_chunks -= 1
+                    self.__handle_result(futures.pop(future), result)
+        except (KeyboardInterrupt, SystemExit):
+            for state in states:
+                state.upload.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+            # workers may still be sending data, they stop after their current request
+            running = [future for future in futures if not future.done()]
+            Thread(target=self.__close_after, args=(running, states), daemon=True).start()
+            raise
+        executor.shutdown()
+
+        for result, state in started:
+            try:
+                result.result = state.upload.get_result()
+            except GenestackException as e:
+                result.error = e
+                continue
+            try:
+                result.checksum = state.upload.file_checksum
+            except (OSError, RequestException, GenestackException) as e:
+                # the file is uploaded, only its checksum is unknown
+                sys.stderr.write('Fail to compute checksum of %s: %s\n' % (result.path, e))
+        return results
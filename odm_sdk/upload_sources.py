@@ -0,0 +1,394 @@
+import os
+import re
+import threading
+import uuid
+from datetime import datetime
+
+import requests
+from requests.exceptions import ConnectionError
+from urllib3.exceptions import HTTPError
+
+from odm_sdk import GenestackException
+from odm_sdk.multipart import FileRange
+from odm_sdk.retry import RETRY_STATUSES
+
+READ_SIZE = 1024 * 1024
+
+_CONTENT_RANGE = re.compile(r'bytes\s+(\d+)-(\d+)/(\d+)')
+
+
+def _sanitize(value):
+    return re.sub('[^A-z0-9_-]', '_', value)
+
+
+class UploadSource(object):
+    """
+    Data of an uploaded file.
+
+    Random access sources provide any byte range at any time, so chunks are read
+    by many workers at once and can be sent again. Chunks of sequential sources are read
+    in order when they are scheduled, and kept in memory until they are uploaded.
+
+    :ivar name: file name on the server
+    :ivar path: path or URL shown in messages and recorded in the upload journal
+    :ivar size: size of the data
+    :ivar random_access: whether ranges can be read in any order
+    """
+
+    random_access = True
+
+    def __init__(self, name, path, size):
+        self.name = name
+        self.path = path
+        self.size = size
+
+    @property
+    def version(self):
+        """
+        Part of the upload identifier which changes when the data changes, so that
+        chunks of another version are not taken for uploaded ones. The data of a source
+        without versions cannot be recognized, it gets a unique identifier.
+
+        :rtype: str
+        """
+        return uuid.uuid4().hex
+
+    def open(self):
+        """
+        Prepare the source for reading, if it is not prepared yet.
+        """
+
+    def close(self):
+        """
+        Release resources of the source.
+        """
+
+    def get_range(self, offset, size):
+        """
+        Return sized file-like object reading a range of the data.
+
+        :param offset: position of the range
+        :type offset: int
+        :param size: size of the range
+        :type size: int
+        """
+        raise NotImplementedError()
+
+
+class LocalFileSource(UploadSource):
+    """
+    Local file, it is read with positional reads by all workers from one descriptor.
+    """
+
+    def __init__(self, path):
+        super(LocalFileSource, self).__init__(os.path.basename(path), path,
+                                              os.path.getsize(path))
+        self.modified = datetime.fromtimestamp(os.path.getmtime(path))
+        self.fd = None
+        self.__lock = threading.Lock()
+
+    @property
+    def version(self):
+        # TODO change according to javascript token
+        return self.modified.strftime('%a_%b_%d_%Y_%H_%M_%S')
+
+    def open(self):
+        with self.__lock:
+            if self.fd is None:
+                self.fd = os.open(self.path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+
+    def close(self):
+        with self.__lock:
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
+
+    def get_range(self, offset, size):
+        return FileRange(self.fd, offset, size)
+
+
+class _SourceRange(object):
+    """
+    Base of sized file-like ranges which can only be rewound to the beginning.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._position = 0
+
+    def __len__(self):
+        return self.size
+
+    def tell(self):
+        return self._position
+
+    def seek(self, position, whence=os.SEEK_SET):
+        if position != 0 or whence != os.SEEK_SET:
+            raise ValueError('Range can only be rewound to the beginning')
+        self._position = 0
+        return 0
+
+    def read(self, size=-1):
+        remaining = self.size - self._position
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        if size == 0:
+            return b''
+        data = self._read(size)
+        if not data:
+            raise EOFError('Source is shorter than expected')
+        self._position += len(data)
+        return data
+
+    def _read(self, size):
+        raise NotImplementedError()
+
+
+class _MemoryRange(_SourceRange):
+
+    def __init__(self, data):
+        super(_MemoryRange, self).__init__(len(data))
+        self.__data = data
+
+    def _read(self, size):
+        return self.__data[self._position:self._position + size]
+
+
+class _FileObjectRange(_SourceRange):
+
+    def __init__(self, source, offset, size):
+        super(_FileObjectRange, self).__init__(size)
+        self.__source = source
+        self.__offset = offset
+
+    def _read(self, size):
+        return self.__source.read_at(self.__offset + self._position, size)
+
+
+class FileObjectSource(UploadSource):
+    """
+    Seekable binary file-like object, e.g. an open file or a file of a FUSE mount
+    of an object storage. Reads of workers are serialized, because they share
+    the position of the object.
+    """
+
+    def __init__(self, fileobj, name=None, size=None):
+        """
+        :param fileobj: binary file-like object with ``read`` and ``seek`` methods
+        :param name: file name, the name of the object by default
+        :type name: str
+        :param size: size of the data, up to the end of the object by default
+        :type size: int
+        """
+        path = getattr(fileobj, 'name', None)
+        if not isinstance(path, str):
+            path = None
+        if name is None:
+            if path is None:
+                raise GenestackException('File name should be specified for %r' % fileobj)
+            name = os.path.basename(path)
+        if size is None:
+            size = fileobj.seek(0, os.SEEK_END)
+        super(FileObjectSource, self).__init__(name, path or name, size)
+        self.fileobj = fileobj
+        self.__lock = threading.Lock()
+
+    def read_at(self, offset, size):
+        with self.__lock:
+            self.fileobj.seek(offset)
+            return self.fileobj.read(size)
+
+    def get_range(self, offset, size):
+        return _FileObjectRange(self, offset, size)
+
+
+class IterableSource(UploadSource):
+    """
+    Data produced by an iterable of bytes, e.g. a generator or a pipe.
+    The size of the data should be known in advance.
+    """
+
+    random_access = False
+
+    def __init__(self, iterable, size, name):
+        """
+        :param iterable: iterable of bytes
+        :param size: total size of the data
+        :type size: int
+        :param name: file name
+        :type name: str
+        """
+        super(IterableSource, self).__init__(name, name, size)
+        self.__iterator = iter(iterable)
+        self.__buffer = b''
+        self.__position = 0
+        self.__lock = threading.Lock()
+
+    def get_range(self, offset, size):
+        with self.__lock:
+            if offset != self.__position:
+                raise GenestackException('Data of %s is requested out of order: %s instead of %s'
+                                         % (self.name, offset, self.__position))
+            pieces = [self.__buffer]
+            received = len(self.__buffer)
+            while received < size:
+                try:
+                    piece = next(self.__iterator)
+                except StopIteration:
+                    raise GenestackException('Data of %s ended at %s bytes, expected %s' % (
+                        self.name, offset + received, self.size))
+                pieces.append(piece)
+                received += len(piece)
+            data = b''.join(pieces)
+            self.__buffer = data[size:]
+            self.__position += size
+            return _MemoryRange(data[:size])
+
+
+class _HttpRange(_SourceRange):
+
+    def __init__(self, source, offset, size):
+        super(_HttpRange, self).__init__(size)
+        self.__source = source
+        self.__offset = offset
+        self.__response = None
+
+    def seek(self, position, whence=os.SEEK_SET):
+        self.__close()
+        return super(_HttpRange, self).seek(position, whence)
+
+    def __close(self):
+        if self.__response is not None:
+            self.__response.close()
+            self.__response = None
+
+    def _read(self, size):
+        if self.__response is None:
+            self.__response = self.__source.request_range(self.__offset + self._position,
+                                                          self.__offset + self.size - 1)
+        try:
+            data = self.__response.raw.read(size)
+        except HTTPError as e:
+            self.__close()
+            # connection errors are retried by the upload
+            raise ConnectionError(e)
+        if self._position + len(data) == self.size:
+            self.__close()
+        return data
+
+
+class HttpSource(UploadSource):
+    """
+    File on an HTTP server supporting range requests, e.g. a presigned URL of
+    an object storage. Chunks are streamed from the server to Genestack
+    without staging the file on a local disk.
+    """
+
+    def __init__(self, url, name=None, session=None, headers=None, retry_policy=None):
+        """
+        :param url: URL of the file
+        :type url: str
+        :param name: file name, the last segment of the URL path by default
+        :type name: str
+        :param session: session to send requests with, a new one by default
+        :type session: requests.Session
+        :param headers: additional headers of requests, e.g. authorization
+        :type headers: dict
+        :param retry_policy: policy whose ``retry_statuses`` are transient errors of
+                             the server, a range rejected with them is requested again
+                             by the upload
+        :type retry_policy: odm_sdk.RetryPolicy
+        """
+        if name is None:
+            name = os.path.basename(requests.utils.urlparse(url).path) or 'file'
+        self.url = url
+        self.session = session or requests.Session()
+        self.headers = dict(headers or {})
+        self.retry_statuses = (retry_policy.retry_statuses if retry_policy is not None
+                               else RETRY_STATUSES)
+        self.validator = None
+        super(HttpSource, self).__init__(name, url, self.__probe())
+
+    def __probe(self):
+        response = self.session.get(self.url, headers=dict(self.headers, Range='bytes=0-0'),
+                                    stream=True)
+        response.close()
+        if response.status_code == 416:
+            # empty file
+            return 0
+        match = _CONTENT_RANGE.match(response.headers.get('Content-Range', ''))
+        if response.status_code != 206 or match is None:
+            raise GenestackException('Server does not support range requests for %s: '
+                                     'got response with status code: %s' % (
+                                         self.url, response.status_code))
+        validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+        if validator is not None and not validator.startswith('W/'):
+            self.validator = validator
+        return int(match.group(3))
+
+    @property
+    def version(self):
+        if self.validator is None:
+            return super(HttpSource, self).version
+        return _sanitize(self.validator)
+
+    def request_range(self, start, end):
+        """
+        Request a range of the file.
+
+        :return: streamed response, it should be closed by the caller
+        :rtype: requests.Response
+        :raises requests.ConnectionError: if the server has responded with a transient
+                                          error (e.g. 503), the upload retries the chunk
+        """
+        headers = dict(self.headers, Range='bytes=%s-%s' % (start, end))
+        headers['Accept-Encoding'] = 'identity'
+        if self.validator is not None:
+            headers['If-Range'] = self.validator
+        response = self.session.get(self.url, headers=headers, stream=True)
+        if response.status_code != 206:
+            response.close()
+            if response.status_code == 200:
+                raise GenestackException('File %s has been changed during upload' % self.url)
+            if response.status_code in self.retry_statuses:
+                raise ConnectionError('Fail to read %s: got response with status code: %s' % (
+                    self.url, response.status_code), response=response)
+            raise GenestackException('Fail to read %s: got response with status code: %s' % (
+                self.url, response.status_code))
+        return response
+
+    def get_range(self, offset, size):
+        return _HttpRange(self, offset, size)
+
+
+def get_upload_source(source, name=None, size=None, retry_policy=None):
+    """
+    Return upload source for:
+
+        - a local path,
+        - an ``http://`` or ``https://`` URL of a server supporting range requests,
+        - a binary file-like object,
+        - an iterable of bytes, ``name`` and ``size`` are required,
+        - an :py:class:`UploadSource`.
+
+    Non-seekable file-like objects (e.g. pipes) are read sequentially,
+    ``name`` and ``size`` are required for them. ``retry_policy`` is passed to
+    :py:class:`HttpSource`.
+
+    :rtype: UploadSource
+    """
+    if isinstance(source, UploadSource):
+        return source
+    if isinstance(source, str):
+        if re.match('https?://', source):
+            return HttpSource(source, name=name, retry_policy=retry_policy)
+        return LocalFileSource(source)
+    if hasattr(source, 'read'):
+        seekable = getattr(source, 'seekable', lambda: hasattr(source, 'seek'))()
+        if seekable:
+            return FileObjectSource(source, name=name, size=size)
+        fileobj = source
+        source = iter(lambda: fileobj.read(READ_SIZE), b'')
+    if size is None or name is None:
+        raise GenestackException('Name and size should be specified for a sequential source')
+    return IterableSource(source, size, name)